@@ -0,0 +1,140 @@
+"""
+Benchmark da amostragem de animação: laço antigo por canal (busca linear + glm) vs
+clipes empacotados (searchsorted + interpolação em array, animation.PackedClip).
+Não abre janela nem usa OpenGL, mede só a pose dos nós (sem hierarquia/paleta);
+"amostragem" é só o PackedClip.sample, sem copiar os valores para o Skeleton.
+
+Uso (na raiz do projeto):
+    python bench_animacao.py
+    python bench_animacao.py --modelo assets/models/idle.glb --frames 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import glm
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from animation import PackedClip
+from model_data import parse_glb, unpack_clips
+from skeleton import Skeleton
+
+
+class LegacyNode:
+    """ Pose de um nó como no Node antigo (objetos glm). """
+
+    def __init__(self):
+        self.translation = glm.vec3(0.0)
+        self.rotation = glm.quat(1.0, 0.0, 0.0, 0.0)
+        self.scale = glm.vec3(1.0)
+
+
+def load_clips(path):
+    """ Mesma leitura de animações do Model.load_glb (direto do .glb, sem o cache). """
+    arrays = parse_glb(path)
+    clips = unpack_clips(arrays)
+    for anim in clips:
+        anim['packed'] = PackedClip(anim)
+    return clips, len(arrays["node_parents"])
+
+
+def apply_legacy(nodes, anim, current_time):
+    """ Cópia fiel do laço antigo de Model.update_animation. """
+    for channel in anim['channels']:
+        node = nodes[channel['node_idx']]
+        times = channel['times']
+        values = channel['values']
+        path = channel['path']
+
+        k = 0
+        for i in range(len(times) - 1):
+            if current_time >= times[i] and current_time <= times[i+1]:
+                k = i
+                break
+
+        k1 = min(k + 1, len(times) - 1)
+        dt = times[k1] - times[k]
+        factor = (current_time - times[k]) / dt if dt > 0 else 0.0
+
+        if path == 'translation':
+            idx = k * 3
+            v0 = glm.vec3(values[idx], values[idx+1], values[idx+2])
+            idx = k1 * 3
+            v1 = glm.vec3(values[idx], values[idx+1], values[idx+2])
+            node.translation = glm.mix(v0, v1, factor)
+        elif path == 'rotation':
+            idx = k * 4
+            q0 = glm.quat(values[idx+3], values[idx], values[idx+1], values[idx+2])
+            idx = k1 * 4
+            q1 = glm.quat(values[idx+3], values[idx], values[idx+1], values[idx+2])
+            node.rotation = glm.slerp(q0, q1, factor)
+        elif path == 'scale':
+            idx = k * 3
+            v0 = glm.vec3(values[idx], values[idx+1], values[idx+2])
+            idx = k1 * 3
+            v1 = glm.vec3(values[idx], values[idx+1], values[idx+2])
+            node.scale = glm.mix(v0, v1, factor)
+
+
+def pose_of(nodes):
+    """ (N, 10) com translação, rotação (x, y, z, w) e escala de cada nó. """
+    return np.array([[*n.translation, n.rotation.x, n.rotation.y, n.rotation.z, n.rotation.w, *n.scale]
+                     for n in nodes])
+
+
+def skeleton_pose(skeleton):
+    """ Mesmo formato do pose_of, na ordem dos nós do glTF. """
+    index = skeleton.remap
+    return np.hstack((skeleton.translations[index], skeleton.rotations[index], skeleton.scales[index]))
+
+
+def measure(label, func, clips, frames):
+    channels = 0
+    t0 = time.perf_counter()
+    for anim in clips:
+        for f in range(frames):
+            func(anim, anim['duration'] * f / max(frames - 1, 1))
+        channels += len(anim['channels']) * frames
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<12} tempo: {elapsed:8.3f} s   {channels / elapsed:12,.0f} canais/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da amostragem de animação.")
+    parser.add_argument("--modelo", default="assets/models/boss.glb")
+    parser.add_argument("--frames", type=int, default=500, help="Amostras por clipe (espalhadas na duração)")
+    args = parser.parse_args()
+
+    clips, node_count = load_clips(args.modelo)
+    total = sum(len(anim['channels']) for anim in clips)
+    print(f"Modelo: {args.modelo} ({len(clips)} clipes, {total} canais, {node_count} nós)")
+    if not clips:
+        return
+
+    legacy_nodes = [LegacyNode() for _ in range(node_count)]
+    skeleton = Skeleton(np.full(node_count, -1))
+    measure("amostragem", lambda anim, t: anim['packed'].sample(t), clips, args.frames)
+    new_t = measure("empacotado", lambda anim, t: skeleton.apply_clip(anim['packed'], t), clips, args.frames)
+    old_t = measure("antigo", lambda anim, t: apply_legacy(legacy_nodes, anim, t), clips, args.frames)
+
+    # Mesma pose nos dois caminhos (em instantes aleatórios de cada clipe)
+    rng = np.random.default_rng(0)
+    max_diff = 0.0
+    for anim in clips:
+        for t in rng.uniform(0.0, anim['duration'], 20):
+            apply_legacy(legacy_nodes, anim, t)
+            skeleton.apply_clip(anim['packed'], t)
+            a, b = pose_of(legacy_nodes), skeleton_pose(skeleton)
+            # q e -q são a mesma rotação
+            sign = np.where((a[:, 3:7] * b[:, 3:7]).sum(axis=1, keepdims=True) < 0, -1.0, 1.0)
+            b[:, 3:7] *= sign
+            max_diff = max(max_diff, float(np.abs(a - b).max()))
+    print(f"Maior diferença na pose: {max_diff:.2e}")
+    print(f"Ganho: {old_t / new_t:.1f}x mais canais por segundo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark da geração do terreno: caminho antigo (listas + glm.vec3) vs vetorizado (NumPy).
+Não abre janela nem usa OpenGL, mede só a montagem dos arrays do VBO/EBO.
+
+Uso (na raiz do projeto):
+    python bench_terrain.py
+    python bench_terrain.py --tamanho 256   # reduz o heightmap para testar rápido
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import glm
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+import settings
+from terrain_mesh import build_terrain_mesh
+
+
+def build_legacy(image):
+    """ Cópia fiel do laço antigo de Terrain.generate_terrain (sem a parte de GPU). """
+    width, depth = image.size
+    pixels = image.load()
+    heights = [[0.0 for _ in range(depth)] for _ in range(width)]
+    vertices_pos = []
+    normals = []
+    indices = []
+    interleaved_data = []
+
+    start_x = -settings.TERRAIN_SIZE / 2.0
+    start_z = -settings.TERRAIN_SIZE / 2.0
+    step_x = settings.TERRAIN_SIZE / float(width - 1)
+    step_z = settings.TERRAIN_SIZE / float(depth - 1)
+
+    for i in range(depth):
+        for j in range(width):
+            x = start_x + (j * step_x)
+            z = start_z + (i * step_z)
+            y = (pixels[j, i] / 255.0) * settings.MAX_TERRAIN_HEIGHT
+            heights[j][i] = y
+            vertices_pos.append(glm.vec3(x, y, z))
+
+    def get_height_safe(j, i):
+        j_safe = max(0, min(j, width - 1))
+        i_safe = max(0, min(i, depth - 1))
+        return heights[j_safe][i_safe]
+
+    for i in range(depth):
+        for j in range(width):
+            height_l = get_height_safe(j - 1, i)
+            height_r = get_height_safe(j + 1, i)
+            height_t = get_height_safe(j, i - 1)
+            height_b = get_height_safe(j, i + 1)
+            normal = glm.vec3(height_l - height_r, 2.0, height_t - height_b)
+            normals.append(glm.normalize(normal))
+
+    for i in range(depth - 1):
+        for j in range(width - 1):
+            top_left = (i * width) + j
+            top_right = top_left + 1
+            bottom_left = ((i + 1) * width) + j
+            bottom_right = bottom_left + 1
+            indices.extend([top_left, bottom_left, top_right])
+            indices.extend([top_right, bottom_left, bottom_right])
+
+    for i in range(len(vertices_pos)):
+        interleaved_data.extend([vertices_pos[i].x, vertices_pos[i].y, vertices_pos[i].z])
+        interleaved_data.extend([normals[i].x, normals[i].y, normals[i].z])
+
+    return np.array(interleaved_data, dtype=np.float32), np.array(indices, dtype=np.uint32)
+
+
+def build_vectorized(image):
+    heights = np.asarray(image, dtype=np.float32) * np.float32(settings.MAX_TERRAIN_HEIGHT / 255.0)
+    return build_terrain_mesh(heights)
+
+
+def measure(label, func, image):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func(image)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} tempo: {elapsed:8.3f} s   pico de memória: {peak / (1024 * 1024):8.1f} MiB")
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da montagem da malha do terreno.")
+    parser.add_argument("--heightmap", default="assets/textures/heightmap.jpg")
+    parser.add_argument("--tamanho", type=int, default=0,
+                        help="Redimensiona o heightmap para NxN antes de medir (0 = original)")
+    parser.add_argument("--sem-antigo", action="store_true",
+                        help="Mede só o caminho vetorizado (o antigo leva vários segundos em 1024²)")
+    args = parser.parse_args()
+
+    image = Image.open(args.heightmap).convert('L')
+    if args.tamanho > 0:
+        image = image.resize((args.tamanho, args.tamanho), Image.BILINEAR)
+    print(f"Heightmap: {args.heightmap} ({image.size[0]}x{image.size[1]})")
+
+    (new_v, new_i), new_t, new_peak = measure("vetorizado", build_vectorized, image)
+
+    if args.sem_antigo:
+        return
+
+    (old_v, old_i), old_t, old_peak = measure("antigo", build_legacy, image)
+
+    same_indices = np.array_equal(old_i, new_i)
+    max_diff = float(np.abs(old_v - new_v).max())
+    print(f"Índices idênticos: {same_indices}   maior diferença nos vértices: {max_diff:.2e}")
+    print(f"Ganho: {old_t / new_t:.1f}x mais rápido, {old_peak / max(new_peak, 1):.1f}x menos memória no pico")
+
+
+if __name__ == "__main__":
+    main()
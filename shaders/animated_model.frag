@@ -1,6 +1,7 @@
 #version 410 core
 
-out vec4 FragColor;
+layout (location = 0) out vec4 FragColor;
+layout (location = 1) out vec4 out_normal; // Normal do mundo para o contorno em tela (settings.OUTLINE_MODE)
 
 in vec3 v_frag_pos;
 in vec3 v_normal;
@@ -13,9 +14,15 @@ uniform vec3 u_ambient_color;
 uniform sampler2D u_shadow_map;
 uniform vec3 u_sky_color;  // COR DO CÉU PARA FOG
 
+#if defined(TEXTURE_ARRAY)
+// Texturas de todos os personagens numa textura array (material_array.py): cada malha diz a camada
+uniform sampler2DArray u_texture_layers;
+uniform int u_texture_layer; // -1 = sem textura
+#else
 // Textura enviada pelo Python
 uniform sampler2D u_texture_diffuse;
 uniform int u_has_texture; // 1 = Sim, 0 = Não
+#endif
 
 float calculate_shadow(vec4 frag_pos_light_space, vec3 N, vec3 L) {
     vec3 proj_coords = frag_pos_light_space.xyz / frag_pos_light_space.w;
@@ -31,9 +38,15 @@ void main()
 {
     // 1. COR DO BONECO (Textura ou Cor Padrão)
     vec4 objectColor;
+#if defined(TEXTURE_ARRAY)
+    if (u_texture_layer >= 0) {
+        objectColor = texture(u_texture_layers, vec3(v_tex_coords, float(u_texture_layer)));
+    } else {
+#else
     if (u_has_texture == 1) {
         objectColor = texture(u_texture_diffuse, v_tex_coords);
     } else {
+#endif
         objectColor = vec4(0.7, 0.7, 0.7, 1.0); // Cinza padrão se falhar a imagem
     }
     
@@ -61,4 +74,5 @@ void main()
 
     // 4. SAÍDA FINAL
     FragColor = vec4(color_with_fog, 1.0);
+    out_normal = vec4(N * 0.5 + 0.5, 1.0);
 }
\ No newline at end of file
@@ -8,13 +8,43 @@ layout (location = 2) in vec2 aTexCoords;
 layout (location = 3) in vec4 aBoneIDs; 
 layout (location = 4) in vec4 aWeights;
 
+#if defined(INSTANCED)
+// Matriz de cada personagem (uma por instância, divisor 1): ocupa 5, 6, 7 e 8
+layout (location = 5) in mat4 aInstanceModel;
+#else
 uniform mat4 model;
+#endif
 uniform mat4 view;
 uniform mat4 projection;
 uniform mat4 u_light_space_matrix;
 
 const int MAX_BONES = 100;
-uniform mat4 u_finalBones[MAX_BONES];
+
+// Textura de ossos (animation_bake.py): uma linha por amostra, 4 texels (colunas) por osso.
+// Por instância: primeira linha do clipe, nº de linhas, fase (0..1) e ciclos por segundo
+// (poses calculadas na CPU usam uma linha fixa por personagem: 1 linha, ritmo 0)
+layout (location = 9) in vec4 aAnimation;
+uniform sampler2D u_bone_texture;
+uniform float u_time;
+
+mat4 baked_bone(int id, int row)
+{
+    return mat4(texelFetch(u_bone_texture, ivec2(id * 4 + 0, row), 0),
+                texelFetch(u_bone_texture, ivec2(id * 4 + 1, row), 0),
+                texelFetch(u_bone_texture, ivec2(id * 4 + 2, row), 0),
+                texelFetch(u_bone_texture, ivec2(id * 4 + 3, row), 0));
+}
+
+// Matriz de skinning do osso 'id' (amostras da textura interpoladas)
+mat4 bone_matrix(int id)
+{
+    float position = fract(u_time * aAnimation.w + aAnimation.z) * (aAnimation.y - 1.0);
+    int frame = int(position);
+    int first = int(aAnimation.x);
+    int next = min(frame + 1, int(aAnimation.y) - 1);
+    float blend = position - float(frame);
+    return baked_bone(id, first + frame) * (1.0 - blend) + baked_bone(id, first + next) * blend;
+}
 
 out vec3 v_frag_pos;
 out vec3 v_normal;
@@ -34,22 +64,22 @@ void main()
 
     // Osso 1
     if (id0 >= 0 && id0 < MAX_BONES) { 
-        BoneTransform += u_finalBones[id0] * aWeights.x; 
+        BoneTransform += bone_matrix(id0) * aWeights.x; 
         totalWeight += aWeights.x; 
     }
     // Osso 2
     if (id1 >= 0 && id1 < MAX_BONES) { 
-        BoneTransform += u_finalBones[id1] * aWeights.y; 
+        BoneTransform += bone_matrix(id1) * aWeights.y; 
         totalWeight += aWeights.y; 
     }
     // Osso 3
     if (id2 >= 0 && id2 < MAX_BONES) { 
-        BoneTransform += u_finalBones[id2] * aWeights.z; 
+        BoneTransform += bone_matrix(id2) * aWeights.z; 
         totalWeight += aWeights.z; 
     }
     // Osso 4
     if (id3 >= 0 && id3 < MAX_BONES) { 
-        BoneTransform += u_finalBones[id3] * aWeights.w; 
+        BoneTransform += bone_matrix(id3) * aWeights.w; 
         totalWeight += aWeights.w; 
     }
 
@@ -61,6 +91,10 @@ void main()
     vec4 animatedPos = BoneTransform * vec4(aPos, 1.0);
     vec4 animatedNormal = BoneTransform * vec4(aNormal, 0.0);
 
+#if defined(INSTANCED)
+    mat4 model = aInstanceModel;
+#endif
+
     v_frag_pos = vec3(model * animatedPos);
     v_normal = normalize(mat3(transpose(inverse(model))) * vec3(animatedNormal));
     v_tex_coords = aTexCoords;
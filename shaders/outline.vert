@@ -2,13 +2,24 @@
 layout (location = 0) in vec3 aPos;
 layout (location = 2) in vec3 aNormal; // Precisa das normais para expandir
 
+#if defined(INSTANCED)
+layout (location = 3) in mat4 aInstanceModel; // Variante instanciada (vegetação)
+#else
 uniform mat4 model;
+#endif
 uniform mat4 view;
 uniform mat4 projection;
 uniform float u_thickness; // Espessura da linha (ex: 0.05)
 
 void main() {
+#if defined(INSTANCED)
+    // Expande já no mundo, para a espessura não mudar com a escala de cada instância
+    vec3 world_normal = normalize(mat3(transpose(inverse(aInstanceModel))) * aNormal);
+    vec4 world_pos = aInstanceModel * vec4(aPos, 1.0);
+    gl_Position = projection * view * vec4(world_pos.xyz + world_normal * u_thickness, 1.0);
+#else
     // Expande o vértice na direção da normal
     vec3 pos = aPos + aNormal * u_thickness;
     gl_Position = projection * view * model * vec4(pos, 1.0);
-}
\ No newline at end of file
+#endif
+}
@@ -0,0 +1,60 @@
+#version 330 core
+// Contorno em espaço de tela: bordas onde a profundidade ou a normal mudam de repente
+out vec4 out_color;
+
+in vec2 v_uv;
+
+uniform sampler2D u_color;   // Cena já iluminada
+uniform sampler2D u_normal;  // Normal do mundo (xyz * 0.5 + 0.5), alpha 1 onde há normal
+uniform sampler2D u_depth;
+
+uniform float u_near;
+uniform float u_far;
+uniform float u_thickness;         // Pixels
+uniform float u_depth_threshold;   // Desvio relativo da profundidade (fora de um plano)
+uniform float u_normal_threshold;  // 1 - cos(ângulo) entre normais vizinhas
+uniform vec3 u_outline_color;
+
+float linear_depth(vec2 uv)
+{
+    float z = texture(u_depth, uv).r * 2.0 - 1.0;
+    return (2.0 * u_near * u_far) / (u_far + u_near - z * (u_far - u_near));
+}
+
+// Diferença de normal entre dois pixels (0 se algum não tem normal)
+float normal_edge(vec4 a, vec4 b)
+{
+    if (a.a < 0.5 || b.a < 0.5) return 0.0;
+    return 1.0 - dot(a.xyz * 2.0 - 1.0, b.xyz * 2.0 - 1.0);
+}
+
+void main()
+{
+    vec2 texel = u_thickness / vec2(textureSize(u_color, 0));
+    vec2 dx = vec2(texel.x, 0.0);
+    vec2 dy = vec2(0.0, texel.y);
+
+    // Profundidade: segunda derivada (uma rampa lisa, como o chão visto de lado, dá zero)
+    float center = linear_depth(v_uv);
+    float left = linear_depth(v_uv - dx);
+    float right = linear_depth(v_uv + dx);
+    float down = linear_depth(v_uv - dy);
+    float up = linear_depth(v_uv + dy);
+    float depth_change = max(abs(left + right - 2.0 * center), abs(down + up - 2.0 * center)) / center;
+
+    // Normais: vincos e quinas entre superfícies
+    vec4 n = texture(u_normal, v_uv);
+    float normal_change = max(max(normal_edge(n, texture(u_normal, v_uv + dx)),
+                                  normal_edge(n, texture(u_normal, v_uv - dx))),
+                              max(normal_edge(n, texture(u_normal, v_uv + dy)),
+                                  normal_edge(n, texture(u_normal, v_uv - dy))));
+
+    float edge = max(step(u_depth_threshold, depth_change), step(u_normal_threshold, normal_change));
+    // Some junto com o fog (longe as bordas viram ruído)
+    edge *= 1.0 - smoothstep(80.0, 280.0, center);
+
+    vec3 scene = texture(u_color, v_uv).rgb;
+    out_color = vec4(mix(scene, u_outline_color, edge), 1.0);
+    // Mantém a profundidade da cena para o que for desenhado depois (sol, etc.)
+    gl_FragDepth = texture(u_depth, v_uv).r;
+}
@@ -0,0 +1,10 @@
+#version 330 core
+// Triângulo que cobre a tela inteira (sem VBO: posição sai do gl_VertexID)
+out vec2 v_uv;
+
+void main()
+{
+    vec2 corner = vec2((gl_VertexID << 1) & 2, gl_VertexID & 2);
+    v_uv = corner;
+    gl_Position = vec4(corner * 2.0 - 1.0, 0.0, 1.0);
+}
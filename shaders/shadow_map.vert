@@ -2,9 +2,60 @@
 layout (location = 0) in vec3 in_position;
 
 uniform mat4 lightSpaceMatrix; // Matriz da "Câmera do Sol"
+
+#if defined(SKINNED)
+// Variante dos personagens: ossos (mesmos atributos do animated_model.vert) e matriz por instância
+layout (location = 3) in vec4 in_bone_ids;
+layout (location = 4) in vec4 in_weights;
+layout (location = 5) in mat4 in_instance_model;
+
+const int MAX_BONES = 100;
+
+// Mesma busca do animated_model.vert (pose de cada instância na textura de ossos)
+layout (location = 9) in vec4 in_animation;
+uniform sampler2D u_bone_texture;
+uniform float u_time;
+
+mat4 baked_bone(int id, int row)
+{
+    return mat4(texelFetch(u_bone_texture, ivec2(id * 4 + 0, row), 0),
+                texelFetch(u_bone_texture, ivec2(id * 4 + 1, row), 0),
+                texelFetch(u_bone_texture, ivec2(id * 4 + 2, row), 0),
+                texelFetch(u_bone_texture, ivec2(id * 4 + 3, row), 0));
+}
+
+mat4 bone_matrix(int id)
+{
+    float position = fract(u_time * in_animation.w + in_animation.z) * (in_animation.y - 1.0);
+    int frame = int(position);
+    int first = int(in_animation.x);
+    int next = min(frame + 1, int(in_animation.y) - 1);
+    float blend = position - float(frame);
+    return baked_bone(id, first + frame) * (1.0 - blend) + baked_bone(id, first + next) * blend;
+}
+#elif defined(INSTANCED)
+layout (location = 3) in mat4 in_instance_model; // Variante instanciada (vegetação)
+#else
 uniform mat4 model;
+#endif
 
 void main()
 {
+#if defined(SKINNED)
+    mat4 bone_transform = mat4(0.0);
+    float total_weight = 0.0;
+    for (int i = 0; i < 4; i++) {
+        int id = int(in_bone_ids[i]);
+        if (id >= 0 && id < MAX_BONES) {
+            bone_transform += bone_matrix(id) * in_weights[i];
+            total_weight += in_weights[i];
+        }
+    }
+    if (total_weight < 0.001) bone_transform = mat4(1.0);
+    gl_Position = lightSpaceMatrix * in_instance_model * bone_transform * vec4(in_position, 1.0);
+#elif defined(INSTANCED)
+    gl_Position = lightSpaceMatrix * in_instance_model * vec4(in_position, 1.0);
+#else
     gl_Position = lightSpaceMatrix * model * vec4(in_position, 1.0);
-}
\ No newline at end of file
+#endif
+}
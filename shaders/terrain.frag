@@ -1,6 +1,7 @@
 #version 330 core
 
-out vec4 out_color;
+layout (location = 0) out vec4 out_color;
+layout (location = 1) out vec4 out_normal; // Normal do mundo para o contorno em tela (settings.OUTLINE_MODE)
 
 in vec3 v_normal;
 in vec3 v_world_pos;
@@ -64,4 +65,5 @@ void main() {
     final_rgb = mix(final_rgb, u_sky_color, fog);
 
     out_color = vec4(final_rgb, 1.0);
+    out_normal = vec4(N * 0.5 + 0.5, 1.0);
 }
\ No newline at end of file
@@ -0,0 +1,59 @@
+#version 410 core
+
+// Variantes: SHADOW_PASS (mapa de sombra) e OUTLINE_PASS (casco invertido); todas
+// fazem o mesmo morph, então sombra e contorno não têm rachaduras entre os níveis.
+
+layout (location = 0) in vec3 in_position;
+layout (location = 1) in vec3 in_normal;
+layout (location = 3) in vec3 in_morph_target; // Posição do vértice no nível seguinte (mais grosseiro)
+
+// Matrizes para transformar o 3D em 2D na tela
+uniform mat4 model;
+#if defined(SHADOW_PASS)
+uniform mat4 lightSpaceMatrix;
+#else
+uniform mat4 view;
+uniform mat4 projection;
+#endif
+
+// CDLOD: faixa de distância (m) em que este nível se transforma no próximo
+// (u_camera_pos é a câmera da seleção, também nas passadas de sombra e contorno)
+uniform vec3 u_camera_pos;
+uniform float u_morph_start;
+uniform float u_morph_end;
+
+#if defined(OUTLINE_PASS)
+uniform float u_thickness;
+#elif !defined(SHADOW_PASS)
+uniform mat4 u_light_space_matrix; // Matriz da luz
+
+// Saída para o Fragment Shader
+out vec3 v_normal;
+out vec3 v_world_pos; // Posição no mundo (para iluminação)
+out vec4 v_frag_pos_light_space; // Posição na visão da luz
+#endif
+
+void main()
+{
+    // Morph contínuo: no fim da faixa o vértice coincide com o do nível vizinho (sem rachaduras)
+    float dist = distance(in_position, u_camera_pos);
+    float morph = clamp((dist - u_morph_start) / (u_morph_end - u_morph_start), 0.0, 1.0);
+    vec3 position = mix(in_position, in_morph_target, morph);
+
+#if defined(SHADOW_PASS)
+    gl_Position = lightSpaceMatrix * model * vec4(position, 1.0);
+#elif defined(OUTLINE_PASS)
+    gl_Position = projection * view * model * vec4(position + normalize(in_normal) * u_thickness, 1.0);
+#else
+    // Calcular posição no espaço do mundo
+    vec4 world_pos_4 = model * vec4(position, 1.0);
+    v_world_pos = world_pos_4.xyz;
+    v_normal = mat3(model) * in_normal;
+
+    // Calcular onde este vértice está na "tela" do sol
+    v_frag_pos_light_space = u_light_space_matrix * world_pos_4;
+
+    // Posição final na tela
+    gl_Position = projection * view * world_pos_4;
+#endif
+}
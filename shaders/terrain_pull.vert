@@ -0,0 +1,66 @@
+#version 410 core
+
+// Terreno por "vertex pulling": não há atributos de vértice.
+// Um único patch de PATCH x PATCH quads é instanciado pelo mapa todo; a posição
+// vem de gl_VertexID (dentro do patch) + gl_InstanceID (qual patch), e a altura
+// e a normal são lidas da textura de alturas (R32F, em metros).
+// Variantes: SHADOW_PASS (mapa de sombra) e OUTLINE_PASS (casco invertido).
+
+uniform sampler2D u_height_map;
+uniform int u_patch_quads;      // Quads por lado do patch
+uniform int u_patches_x;        // Patches por linha do mapa
+uniform ivec2 u_grid_size;      // (largura, profundidade) em texels
+uniform vec2 u_terrain_origin;  // Canto (x, z) do terreno no mundo
+uniform vec2 u_grid_step;       // Metros por texel em (x, z)
+
+uniform mat4 model;
+
+#if defined(SHADOW_PASS)
+uniform mat4 lightSpaceMatrix;
+#else
+uniform mat4 view;
+uniform mat4 projection;
+#endif
+
+#if defined(OUTLINE_PASS)
+uniform float u_thickness;
+#elif !defined(SHADOW_PASS)
+uniform mat4 u_light_space_matrix;
+out vec3 v_normal;
+out vec3 v_world_pos;
+out vec4 v_frag_pos_light_space;
+#endif
+
+float height_at(ivec2 texel)
+{
+    return texelFetch(u_height_map, clamp(texel, ivec2(0), u_grid_size - 1), 0).r;
+}
+
+void main()
+{
+    int row = u_patch_quads + 1;
+    ivec2 patch_coord = ivec2(gl_InstanceID % u_patches_x, gl_InstanceID / u_patches_x);
+    ivec2 local = ivec2(gl_VertexID % row, gl_VertexID / row);
+    ivec2 texel = min(patch_coord * u_patch_quads + local, u_grid_size - 1);
+
+    vec3 position = vec3(u_terrain_origin.x + float(texel.x) * u_grid_step.x,
+                         height_at(texel),
+                         u_terrain_origin.y + float(texel.y) * u_grid_step.y);
+
+    // Mesma normal da malha em CPU: (h_esq - h_dir, 2, h_cima - h_baixo)
+    vec3 normal = normalize(vec3(height_at(texel - ivec2(1, 0)) - height_at(texel + ivec2(1, 0)),
+                                 2.0,
+                                 height_at(texel - ivec2(0, 1)) - height_at(texel + ivec2(0, 1))));
+
+#if defined(SHADOW_PASS)
+    gl_Position = lightSpaceMatrix * model * vec4(position, 1.0);
+#elif defined(OUTLINE_PASS)
+    gl_Position = projection * view * model * vec4(position + normal * u_thickness, 1.0);
+#else
+    vec4 world_pos_4 = model * vec4(position, 1.0);
+    v_world_pos = world_pos_4.xyz;
+    v_normal = mat3(model) * normal;
+    v_frag_pos_light_space = u_light_space_matrix * world_pos_4;
+    gl_Position = projection * view * world_pos_4;
+#endif
+}
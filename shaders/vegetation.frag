@@ -1,5 +1,6 @@
 #version 330 core
-out vec4 out_color;
+layout (location = 0) out vec4 out_color;
+layout (location = 1) out vec4 out_normal; // Normal do mundo para o contorno em tela (settings.OUTLINE_MODE)
 
 in vec3 v_normal;
 in vec3 v_color;
@@ -31,4 +32,5 @@ void main()
     float fog_factor = smoothstep(80.0, 280.0, depth);
     
     out_color = vec4(mix(color_result, u_sky_color, fog_factor), 1.0);
+    out_normal = vec4(N * 0.5 + 0.5, 1.0);
 }
\ No newline at end of file
@@ -3,16 +3,19 @@ layout (location = 0) in vec3 aPos;
 layout (location = 1) in vec3 aColor;
 layout (location = 2) in vec3 aNormal;
 
+// Dados por instância (um registro por árvore/pedra, divisor 1)
+layout (location = 3) in mat4 aInstanceModel; // ocupa 3, 4, 5 e 6
+layout (location = 7) in vec3 aInstanceTint;
+
 out vec3 v_normal;
 out vec3 v_color;
 
-uniform mat4 model;
 uniform mat4 view;
 uniform mat4 projection;
 
 void main()
 {
-    gl_Position = projection * view * model * vec4(aPos, 1.0);
-    v_normal = mat3(transpose(inverse(model))) * aNormal;
-    v_color = aColor;
-}
\ No newline at end of file
+    gl_Position = projection * view * aInstanceModel * vec4(aPos, 1.0);
+    v_normal = mat3(transpose(inverse(aInstanceModel))) * aNormal;
+    v_color = aColor * aInstanceTint;
+}
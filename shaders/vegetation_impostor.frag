@@ -0,0 +1,28 @@
+#version 330 core
+layout (location = 0) out vec4 out_color;
+layout (location = 1) out vec4 out_normal; // Normal do mundo para o contorno em tela (settings.OUTLINE_MODE)
+
+in vec2 v_uv;
+in vec3 v_tint;
+
+uniform sampler2D u_atlas;
+uniform vec3 u_sun_color;
+uniform vec3 u_ambient_color;
+uniform vec3 u_sky_color;
+
+void main()
+{
+    vec4 texel = texture(u_atlas, v_uv);
+    if (texel.a < 0.5) discard; // Recorte da silhueta
+
+    // O atlas guarda a cor sem luz; aqui entra a luz média da faixa do meio do toon
+    vec3 light = u_ambient_color + u_sun_color * 0.6;
+    vec3 color_result = texel.rgb * v_tint * light;
+
+    // Mesmo fog da vegetação
+    float depth = gl_FragCoord.z / gl_FragCoord.w;
+    float fog_factor = smoothstep(80.0, 280.0, depth);
+
+    out_color = vec4(mix(color_result, u_sky_color, fog_factor), 1.0);
+    out_normal = vec4(0.0); // Quad plano: só a silhueta (profundidade) vira contorno
+}
@@ -0,0 +1,31 @@
+#version 330 core
+// Impostor: um quad virado para a câmera (gira só em Y) no lugar da árvore/pedra
+layout (location = 0) in vec2 aCorner; // x em -0.5..0.5, y em 0..1
+
+// Mesmos dados por instância da malha completa
+layout (location = 3) in mat4 aInstanceModel;
+layout (location = 7) in vec3 aInstanceTint;
+
+out vec2 v_uv;
+out vec3 v_tint;
+
+uniform mat4 view;
+uniform mat4 projection;
+uniform vec3 u_camera_right;   // Direita da câmera no plano XZ
+uniform vec3 u_impostor_box;   // largura, altura e base (Y) da malha-modelo
+uniform vec4 u_atlas_rect;     // uv da célula do atlas: origem.xy, tamanho.zw
+
+void main()
+{
+    vec3 origin = aInstanceModel[3].xyz;
+    float scale_xz = length(aInstanceModel[0].xyz);
+    float scale_y = length(aInstanceModel[1].xyz);
+
+    vec3 pos = origin
+             + u_camera_right * (aCorner.x * u_impostor_box.x * scale_xz)
+             + vec3(0.0, (u_impostor_box.z + aCorner.y * u_impostor_box.y) * scale_y, 0.0);
+    gl_Position = projection * view * vec4(pos, 1.0);
+
+    v_uv = u_atlas_rect.xy + vec2(aCorner.x + 0.5, aCorner.y) * u_atlas_rect.zw;
+    v_tint = aInstanceTint;
+}
@@ -0,0 +1,92 @@
+import numpy as np
+
+# Amostragem vetorizada dos clipes do glTF. Na carga, todos os canais de um clipe são
+# empacotados em arrays contínuos (agrupados por tipo: translação, rotação, escala);
+# a cada frame o clipe inteiro é amostrado de uma vez: uma busca binária das chaves
+# (searchsorted) e interpolação linear / slerp feitas em array.
+
+PATHS = (('translation', 3), ('rotation', 4), ('scale', 3))
+NLERP_THRESHOLD = 0.9995 # Acima desse cosseno o slerp vira interpolação linear normalizada
+
+
+class PackedClip:
+    """
+    Um clipe (dicionário do load_glb) pronto para amostrar. As chaves de todos os canais
+    ficam concatenadas (canal c em start[c]..last[c]) e os valores em linhas de 4 floats
+    (vec3 completado com 0). 'groups' = [(tipo, fatia das linhas, nós)].
+    """
+
+    def __init__(self, anim):
+        self.duration = float(anim['duration'])
+        self.groups = []
+        nodes, times, values = [], [], []
+        for path, width in PATHS:
+            first = len(nodes)
+            for channel in anim['channels']:
+                if channel['path'] != path or len(channel['times']) == 0:
+                    continue
+                channel_values = np.asarray(channel['values'], dtype=np.float64).reshape(-1, width)
+                count = min(len(channel['times']), len(channel_values))
+                nodes.append(channel['node_idx'])
+                times.append(np.asarray(channel['times'][:count], dtype=np.float64))
+                padded = np.zeros((count, 4))
+                padded[:, :width] = channel_values[:count]
+                values.append(padded)
+            if len(nodes) > first:
+                self.groups.append((path, slice(first, len(nodes)), np.array(nodes[first:], dtype=np.int64)))
+
+        self.channel_count = len(nodes)
+        if not nodes:
+            return
+        counts = np.array([len(channel_times) for channel_times in times], dtype=np.int64)
+        self.start = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        self.last = self.start + counts - 1
+        self.last_pair = np.maximum(self.last - 1, self.start) # Última chave que abre um intervalo
+        self.times = np.concatenate(times)
+        self.values = np.concatenate(values)
+
+        # Cada canal é deslocado por um passo maior que todo o intervalo de tempo, então
+        # as chaves de todos os canais formam um único array crescente (uma só busca binária)
+        span = float(self.times.max() - min(self.times.min(), 0.0)) + 1.0
+        self.shift = np.arange(len(nodes)) * span
+        self.keys = self.times + np.repeat(self.shift, counts)
+        self.rotations = next((rows for path, rows, _ in self.groups if path == 'rotation'), None)
+
+    def sample(self, current_time):
+        """
+        (canais, 4): valor de cada canal no instante (fora das chaves = chave da ponta).
+        Rotações em (x, y, z, w) como no glTF; as linhas de cada tipo estão em 'groups'.
+        """
+        if self.channel_count == 0:
+            return np.zeros((0, 4))
+        found = np.searchsorted(self.keys, current_time + self.shift, side='right') - 1
+        k = np.minimum(np.maximum(found, self.start), self.last_pair)
+        k1 = np.minimum(k + 1, self.last)
+
+        t0 = self.times[k]
+        dt = self.times[k1] - t0
+        factor = np.divide(current_time - t0, dt, out=np.zeros(len(k)), where=dt > 0)
+        factor = np.clip(factor, 0.0, 1.0)[:, None]
+
+        v0, v1 = self.values[k], self.values[k1]
+        result = v0 + (v1 - v0) * factor
+        if self.rotations is not None:
+            rows = self.rotations
+            result[rows] = slerp(v0[rows], v1[rows], factor[rows])
+        return result
+
+
+def slerp(q0, q1, factor):
+    """ Slerp de quaternions (N, 4) pelo caminho mais curto; ângulos pequenos usam nlerp. """
+    cos_theta = np.einsum('ij,ij->i', q0, q1)[:, None]
+    sign = np.where(cos_theta < 0.0, -1.0, 1.0)
+    q1 = q1 * sign
+    cos_theta = cos_theta * sign
+
+    near = cos_theta > NLERP_THRESHOLD
+    theta = np.arccos(np.minimum(cos_theta, 1.0))
+    sin_theta = np.where(near, 1.0, np.sin(theta))
+    w0 = np.where(near, 1.0 - factor, np.sin((1.0 - factor) * theta) / sin_theta)
+    w1 = np.where(near, factor, np.sin(factor * theta) / sin_theta)
+    result = w0 * q0 + w1 * q1
+    return result / np.linalg.norm(result, axis=1, keepdims=True)
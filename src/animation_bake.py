@@ -0,0 +1,105 @@
+import math
+
+import numpy as np
+from OpenGL.GL import *
+
+# Animações "assadas" numa textura: cada clipe é amostrado numa taxa fixa e cada
+# amostra vira uma linha com a paleta de ossos (4 texels RGBA32F = as 4 colunas
+# de cada mat4). O vertex shader dos personagens busca e interpola as
+# duas linhas vizinhas sozinho, então cada instância pode ter clipe, fase e
+# velocidade próprios sem custo de CPU por frame.
+
+BONE_TEXTURE_UNIT = 2   # 0 = textura difusa, 1 = mapa de sombra
+
+
+def bake_clips(model, fps):
+    """
+    Amostra todos os clipes do modelo. Devolve (frames, clips): frames é float32
+    (linhas, ossos, 16) coluna a coluna e clips = [(primeira linha, nº de linhas, duração)].
+    Um modelo sem animação vira um clipe parado na pose atual.
+    """
+    return sample_clips(model.skeleton, model.animations, len(model.bone_palette()), fps)
+
+
+def sample_clips(skeleton, animations, max_bones, fps):
+    """ bake_clips só com o esqueleto (skeleton.Skeleton) e os clipes: não usa OpenGL. """
+    bones = max(1, min(len(skeleton.joints), max_bones))
+    # Um clipe só mexe nos nós que ele anima: cada um parte da pose atual, sem herdar o anterior
+    pose = skeleton.save_pose()
+    rows, clips = [], []
+    for anim in animations or [None]:
+        skeleton.restore_pose(pose)
+        duration = anim['duration'] if anim else 0.0
+        # Amostras igualmente espaçadas de 0 até o fim (a última fecha o loop)
+        count = max(2, int(math.ceil(duration * fps)) + 1)
+        clips.append((len(rows), count, duration))
+        for i in range(count):
+            if anim:
+                skeleton.apply_clip(anim['packed'], duration * i / (count - 1))
+            skeleton.update()
+            rows.append(skeleton.skinning_matrices(max_bones)[:bones])
+
+    # Volta o esqueleto para a pose em que estava
+    skeleton.restore_pose(pose)
+    skeleton.update()
+    return np.array(rows, dtype=np.float32), clips
+
+
+class AnimationTexture:
+    """
+    Textura RGBA32F com as linhas de bake_clips (largura = ossos * 4, altura = amostras).
+    Sem clipes, serve de paleta por personagem: uma linha cada, reenviada com update_rows.
+    """
+
+    def __init__(self, frames, clips):
+        self.clips = clips
+        self.bones = frames.shape[1]
+        self.rows = frames.shape[0]
+
+        max_size = glGetIntegerv(GL_MAX_TEXTURE_SIZE)
+        if self.rows > max_size:
+            print(f"AVISO: {self.rows} amostras de animação passam do limite de textura ({max_size}); "
+                  f"reduza ANIMATION_BAKE_FPS.")
+
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA32F, self.bones * 4, self.rows, 0, GL_RGBA, GL_FLOAT,
+                     np.ascontiguousarray(frames, dtype=np.float32))
+        glBindTexture(GL_TEXTURE_2D, 0)
+        if clips:
+            print(f"Animações assadas: {len(clips)} clipes, {self.rows} amostras x {self.bones} ossos "
+                  f"({frames.nbytes / 1024:.0f} KB)")
+
+    def update_rows(self, frames):
+        """ Reenvia todas as linhas (poses calculadas na CPU). """
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, self.bones * 4, self.rows, GL_RGBA, GL_FLOAT,
+                        np.ascontiguousarray(frames, dtype=np.float32))
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    @staticmethod
+    def row_params(rows):
+        """ Atributo por instância que lê sempre a mesma linha (pose pronta, sem interpolar). """
+        rows = np.asarray(rows, dtype=np.float32)
+        zeros = np.zeros_like(rows)
+        return np.column_stack((rows, np.ones_like(rows), zeros, zeros))
+
+    def instance_params(self, clip_ids, phases, speeds):
+        """
+        Atributo por instância (N, 4): primeira linha do clipe, nº de linhas,
+        fase (0..1 do ciclo) e ciclos por segundo (velocidade / duração).
+        """
+        clip_ids = np.asarray(clip_ids, dtype=np.int64)
+        table = np.array(self.clips, dtype=np.float64).reshape(-1, 3)
+        durations = table[clip_ids, 2]
+        rates = np.divide(np.asarray(speeds, dtype=np.float64), durations,
+                          out=np.zeros(len(clip_ids)), where=durations > 0)
+        return np.column_stack((table[clip_ids, 0], table[clip_ids, 1], phases, rates)).astype(np.float32)
+
+    def bind(self, shader):
+        glActiveTexture(GL_TEXTURE0 + BONE_TEXTURE_UNIT)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glActiveTexture(GL_TEXTURE0)
+        shader.set_uniform_int("u_bone_texture", BONE_TEXTURE_UNIT)
@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+
+# "LOD de animação": cada personagem animado na CPU tem o próprio esqueleto, mas nem
+# todos precisam ser recalculados em todo frame. Perto da câmera a pose é refeita todo
+# frame; mais longe, a cada 2, 4, 8... frames (segurando a última pose no meio); fora
+# da tela o personagem congela. Um orçamento de tempo por frame limita o total: o que
+# não couber fica para o frame seguinte (na frente da fila).
+
+
+def in_frustum(view_projection, centers, radius):
+    """ Máscara das esferas (centros (N, 3), raio) que tocam o frustum da matriz projection * view. """
+    m = np.array(view_projection, dtype=np.float64) # Linha a linha (clip = M @ v)
+    planes = np.array([m[3] + m[0], m[3] - m[0], m[3] + m[1], m[3] - m[1], m[3] + m[2], m[3] - m[2]])
+    planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    distances = np.asarray(centers, dtype=np.float64) @ planes[:, :3].T + planes[:, 3]
+    return (distances >= -radius).all(axis=1)
+
+
+class AnimationScheduler:
+    def __init__(self, count, budget_ms, distances):
+        """
+        count: nº de personagens; budget_ms: tempo de CPU por frame para atualizar esqueletos;
+        distances: limites (m) das faixas: até a 1ª todo frame, depois a cada 2, 4, 8... frames.
+        """
+        self.budget = budget_ms / 1000.0
+        self.distances = np.asarray(distances, dtype=np.float64)
+        self.intervals = 2 ** np.arange(len(self.distances) + 1)
+        self.pending = np.zeros(count)            # Tempo acumulado desde a última atualização de cada um
+        self.overdue = np.zeros(count, dtype=bool) # Estava na vez mas estourou o orçamento
+        self.frame = 0
+        self.stats = {'updated': 0, 'deferred': 0, 'held': 0, 'frozen': 0}
+
+    def plan(self, delta_time, distances, visible):
+        """ Índices dos personagens que deveriam atualizar neste frame, em ordem de prioridade. """
+        self.frame += 1
+        count = len(self.pending)
+        # Fora da tela congela: o relógio dele também para
+        self.pending[visible] += delta_time
+        interval = self.intervals[np.searchsorted(self.distances, distances)]
+        # O índice desencontra os personagens da mesma faixa (não atualizam todos no mesmo frame)
+        due = visible & (((self.frame + np.arange(count)) % interval == 0) | self.overdue)
+
+        candidates = np.flatnonzero(due)
+        # Atrasados primeiro, depois do mais perto ao mais longe
+        order = candidates[np.lexsort((distances[candidates], ~self.overdue[candidates]))]
+        self.stats['frozen'] = int(count - visible.sum())
+        self.stats['held'] = int(visible.sum() - len(order))
+        return order
+
+    def run(self, order, update):
+        """
+        Chama update(índice, tempo acumulado) na ordem até gastar o orçamento (pelo menos
+        um por frame). Devolve quantos foram atualizados; os outros ficam para o próximo frame.
+        """
+        start = time.perf_counter()
+        done = 0
+        for index in order:
+            if done and time.perf_counter() - start > self.budget:
+                break
+            update(int(index), float(self.pending[index]))
+            self.pending[index] = 0.0
+            done += 1
+
+        self.overdue[order[:done]] = False
+        self.overdue[order[done:]] = True
+        self.stats['updated'] = done
+        self.stats['deferred'] = len(order) - done
+        return done
@@ -0,0 +1,137 @@
+import hashlib
+import os
+
+import numpy as np
+from OpenGL.GL import *
+from material_array import TextureArray
+from model import Model
+from shader import Shader
+
+# Registro de assets compartilhados: cada modelo, textura e programa de shader é
+# carregado uma vez por chave e entregue a quem pedir com contagem de referências.
+# Texturas são identificadas pelo conteúdo (hash dos pixels), então a mesma imagem
+# embutida em vários .glb vira uma textura só na GPU. Quando a última referência é
+# devolvida (release), os objetos do OpenGL são apagados.
+#
+#   shader:  ('shader', vertex, fragment, defines)
+#   modelo:  ('model', caminho do .glb)   (o Model inteiro é compartilhado: instâncias e
+#                                          textura de animação são do modelo, não de quem pediu)
+#   textura: ('texture', largura, altura, níveis, hash dos pixels do nível 0)
+#   camada:  ('layer', largura, altura, níveis, hash)   (uma camada de uma textura array, ver texture_layer)
+#   array:   ('array', largura, altura, níveis)         (referências = camadas vivas nela)
+
+KIND_NAMES = {'shader': "shader", 'model': "modelo", 'texture': "textura", 'layer': "camada", 'array': "array"}
+
+
+def upload_texture(levels):
+    """ Textura RGBA8 com REPEAT e filtro linear; 'levels' = [(largura, altura, pixels)] do nível 0 em diante. """
+    tex_id = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, tex_id)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    for level, (width, height, pixels) in enumerate(levels):
+        glTexImage2D(GL_TEXTURE_2D, level, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    return tex_id
+
+
+class AssetRegistry:
+    def __init__(self):
+        self.entries = {} # chave -> {'kind', 'name', 'handle', 'refs', 'size', 'free'}
+        self.reused = {kind: 0 for kind in KIND_NAMES} # Pedidos atendidos sem carregar de novo
+
+    def _acquire(self, key, name, create, size, free):
+        """ Handle da chave (criado na primeira vez) com uma referência a mais. """
+        entry = self.entries.get(key)
+        if entry is None:
+            handle = create()
+            entry = {'kind': key[0], 'name': name, 'handle': handle, 'refs': 0, 'size': size, 'free': free}
+            self.entries[key] = entry
+        else:
+            self.reused[key[0]] += 1
+        entry['refs'] += 1
+        return entry['handle']
+
+    def shader(self, vertex_path, fragment_path, defines=None):
+        """ Programa compilado uma vez por arquivos + variante (defines). """
+        variant = tuple(sorted((defines or {}).items()))
+        key = ('shader', os.path.normpath(vertex_path), os.path.normpath(fragment_path), variant)
+        name = f"{os.path.basename(vertex_path)} + {os.path.basename(fragment_path)}"
+        if variant:
+            name += " [" + ", ".join(define for define, _ in variant) + "]"
+        return self._acquire(key, name, lambda: Shader(vertex_path, fragment_path, defines), 0,
+                             lambda shader: glDeleteProgram(shader.program_id))
+
+    def model(self, path, shader, arrays=None, texture_arrays=False):
+        """
+        Model do .glb (um só por caminho + shader + texture_arrays; as texturas dele também passam
+        por este registro). 'arrays' = model_cache.load_model_arrays(path), se já foi carregado em outra thread.
+        texture_arrays=True põe as texturas em camadas de texturas array (shader com TEXTURE_ARRAY).
+        """
+        # O Model guarda o shader e o modo de textura: pedidos diferentes não podem cair no mesmo
+        key = ('model', os.path.normpath(path), shader, bool(texture_arrays))
+        name = path + (" [texturas array]" if texture_arrays else "")
+        model = self._acquire(key, name, lambda: Model(path, shader, assets=self, arrays=arrays,
+                                                       texture_arrays=texture_arrays), 0,
+                              lambda model: model.release())
+        self.entries[key]['size'] = model.gpu_bytes
+        return model
+
+    def texture(self, levels, name):
+        """ Textura de [(largura, altura, pixels RGBA8)], compartilhada por todas as imagens de mesmo conteúdo. """
+        width, height, pixels = levels[0]
+        digest = hashlib.sha1(memoryview(np.ascontiguousarray(pixels))).hexdigest()
+        key = ('texture', width, height, len(levels), digest)
+        size = sum(len(level_pixels) for _, _, level_pixels in levels)
+        return self._acquire(key, name, lambda: upload_texture(levels), size,
+                             lambda tex_id: glDeleteTextures(1, [tex_id]))
+
+    def texture_layer(self, levels, name):
+        """
+        (TextureArray, camada) da imagem: todas as imagens do mesmo tamanho e nº de níveis, de
+        qualquer modelo, dividem uma textura array (conteúdo repetido = mesma camada).
+        A camada só sai da array quando a array inteira é apagada (sem camadas vivas).
+        """
+        width, height, pixels = levels[0]
+        digest = hashlib.sha1(memoryview(np.ascontiguousarray(pixels))).hexdigest()
+        shape = (width, height, len(levels))
+
+        def add_layer():
+            array_key = ('array',) + shape
+            array = self._acquire(array_key, f"{width}x{height}, {len(levels)} níveis",
+                                  lambda: TextureArray(*shape), 0, lambda array: array.release())
+            self.entries[array_key]['size'] = array.gpu_bytes
+            return array, array.add(levels)
+
+        # O tamanho fica na entrada da array (é ela que ocupa a GPU)
+        return self._acquire(('layer',) + shape + (digest,), name, add_layer, 0,
+                             lambda layer: self.release(layer[0]))
+
+    def release(self, handle):
+        """ Devolve uma referência; na última, apaga o asset da GPU. """
+        for key, entry in self.entries.items():
+            if entry['handle'] == handle: # IDs de textura e camadas por valor; Shader, Model e array por identidade
+                entry['refs'] -= 1
+                if entry['refs'] <= 0:
+                    del self.entries[key]
+                    entry['free'](entry['handle'])
+                return
+        print(f"AVISO: release de um asset que não está no registro ({handle}).")
+
+    def resident_bytes(self):
+        """ Estimativa da memória de GPU ocupada pelos assets residentes (bytes). """
+        return sum(entry['size']() if callable(entry['size']) else entry['size'] for entry in self.entries.values())
+
+    def report(self):
+        """ Imprime o que está carregado: tipo, referências, tamanho e nome de cada asset. """
+        counts = {kind: 0 for kind in KIND_NAMES}
+        print("Assets residentes:")
+        for entry in sorted(self.entries.values(), key=lambda entry: (entry['kind'], entry['name'])):
+            counts[entry['kind']] += 1
+            size = entry['size']() if callable(entry['size']) else entry['size']
+            print(f"  {KIND_NAMES[entry['kind']]:<8} refs {entry['refs']:>2}  {size / (1024 * 1024):7.2f} MB  {entry['name']}")
+        summary = ", ".join(f"{counts[kind]} {KIND_NAMES[kind]}(s) ({self.reused[kind]} reaproveitado(s))"
+                            for kind in KIND_NAMES)
+        print(f"Total: {summary}; ~{self.resident_bytes() / (1024 * 1024):.1f} MB na GPU")
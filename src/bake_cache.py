@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+# Formato do arquivo "bake" (binário, mapeável em memória):
+#   [magic 8 bytes][versão uint32][tamanho do cabeçalho uint32][cabeçalho JSON][arrays alinhados]
+# O cabeçalho guarda os metadados livres e, para cada array, dtype/shape/offset.
+BAKE_MAGIC = b"A3BAKE\0\0"
+BAKE_FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+
+def _align(value):
+    return (value + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """ Hash do conteúdo do arquivo (lido em blocos, sem carregar tudo na RAM). """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_header(f, entries, meta):
+    header = json.dumps({"meta": meta or {}, "arrays": entries}).encode('utf-8')
+    f.write(BAKE_MAGIC)
+    f.write(struct.pack("<II", BAKE_FORMAT_VERSION, len(header)))
+    f.write(header)
+    return _align(len(BAKE_MAGIC) + 8 + len(header))
+
+
+def _layout(specs):
+    """ specs: {nome: (dtype, shape)} -> (entradas do cabeçalho, tamanho total dos dados) """
+    entries = {}
+    offset = 0
+    for name, (dtype, shape) in specs.items():
+        dtype = np.dtype(dtype)
+        entries[name] = {"dtype": dtype.str, "shape": [int(n) for n in shape], "offset": offset}
+        offset = _align(offset + int(np.prod(shape, dtype=np.int64)) * dtype.itemsize)
+    return entries, offset
+
+
+def write_bake(path, arrays, meta=None):
+    """
+    Grava um dicionário {nome: np.ndarray} num único arquivo.
+    A escrita é feita num arquivo temporário e renomeada no final,
+    assim um processo interrompido nunca deixa um cache pela metade.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    contiguous = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    entries, data_size = _layout({name: (a.dtype, a.shape) for name, a in contiguous.items()})
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        data_start = _write_header(f, entries, meta)
+        for name, array in contiguous.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + data_size)
+    os.replace(tmp_path, path)
+
+
+def allocate_bake(path, specs, meta=None):
+    """
+    Cria o arquivo já no tamanho final e devolve {nome: np.memmap gravável}.
+    Serve para bakes maiores que a RAM: quem chama preenche os arrays aos
+    pedaços, chama .flush(), solta os memmaps e chama finalize_bake(path).
+    Até lá o arquivo fica em path + ".tmp" (como no write_bake), então uma
+    conversão interrompida nunca deixa um bake pela metade no lugar do final.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    entries, data_size = _layout(specs)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        data_start = _write_header(f, entries, meta)
+        f.truncate(data_start + data_size)
+
+    arrays = {}
+    for name, entry in entries.items():
+        arrays[name] = np.memmap(tmp_path, dtype=np.dtype(entry["dtype"]), mode='r+',
+                                 offset=data_start + entry["offset"], shape=tuple(entry["shape"]))
+    return arrays
+
+
+def finalize_bake(path):
+    """ Renomeia o bake criado por allocate_bake para o caminho final (memmaps já fechados). """
+    os.replace(path + ".tmp", path)
+
+
+def read_bake(path):
+    """
+    Abre um arquivo bake e devolve (arrays, meta).
+    Os arrays são views somente-leitura de um único np.memmap: nada é copiado
+    para a RAM até ser de fato acessado (ex.: pelo glBufferData).
+    Devolve None se o arquivo não existir ou estiver em formato incompatível.
+    """
+    if not os.path.isfile(path):
+        return None
+
+    with open(path, 'rb') as f:
+        magic = f.read(len(BAKE_MAGIC))
+        if magic != BAKE_MAGIC:
+            return None
+        version, header_len = struct.unpack("<II", f.read(8))
+        if version != BAKE_FORMAT_VERSION:
+            return None
+        header = json.loads(f.read(header_len).decode('utf-8'))
+
+    data_start = _align(len(BAKE_MAGIC) + 8 + header_len)
+    raw = np.memmap(path, dtype=np.uint8, mode='r')
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        start = data_start + entry["offset"]
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        arrays[name] = raw[start:start + nbytes].view(dtype).reshape(shape)
+    return arrays, header["meta"]
@@ -72,7 +72,10 @@ class Camera:
         if vegetation:
             player_radius = 0.5 # Gordinho do jogador
             
-            for tx, tz, tr in vegetation.tree_positions:
+            # Só as árvores das células em volta do jogador (índice espacial)
+            nearby = vegetation.grid.query_radius(self.pos.x, self.pos.z, player_radius, include_item_radius=True)
+            for index in nearby:
+                tx, tz, tr = vegetation.tree_positions[index]
                 # Distância entre jogador e árvore (apenas X e Z)
                 dx = self.pos.x - tx
                 dz = self.pos.z - tz
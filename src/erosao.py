@@ -0,0 +1,172 @@
+"""
+Erosão térmica e hidráulica para heightmaps (etapa depois do gerador da ilha).
+
+Cada iteração é um passo sobre a grade inteira com arrays NumPy float32:
+nada de laço por pixel ou por gota. Os fluxos vão só para os 4 vizinhos e a
+borda do mapa se comporta como parede (nada entra nem sai), então a massa
+de terra é conservada.
+
+Uso (na raiz do projeto):
+    python src/erosao.py --gerar --saida assets/textures/heightmap.npy
+    python src/erosao.py --entrada assets/textures/heightmap.png --hidraulica 300 --termica 50
+Depois aponte settings.TERRAIN_HEIGHTMAP para o arquivo gerado (.npy/.r32/.png de 16 bits).
+"""
+import argparse
+import time
+
+import numpy as np
+
+import settings
+from heightmap_io import load_heightmap, save_heightmap
+
+# Vizinhos (linha, coluna)
+OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+# Erosão térmica: material desliza onde a inclinação passa do ângulo de repouso
+TALUS_ANGLE = 33.0      # Graus
+THERMAL_RATE = 0.5      # Fração do excesso movida por iteração
+
+# Erosão hidráulica (modelo de grade: água, sedimento e terreno em 3 arrays)
+RAIN = 0.01             # Metros de chuva por iteração
+CAPACITY = 4.0          # Sedimento que 1 m de água em movimento consegue carregar
+EROSION = 0.3           # Fração do que falta para a capacidade que é arrancada do chão
+DEPOSITION = 0.3        # Fração do excesso de sedimento depositada
+EVAPORATION = 0.02      # Fração da água que evapora por iteração
+
+
+def _neighbors(values):
+    """ Valores dos 4 vizinhos de cada célula (borda repetida = parede). """
+    rows, cols = values.shape
+    padded = np.pad(values, 1, mode='edge')
+    return [padded[1 + di:1 + di + rows, 1 + dj:1 + dj + cols] for di, dj in OFFSETS]
+
+
+def _shift(values, di, dj):
+    """ result[i, j] = values[i - di, j - dj] (o que a célula vizinha mandou para cá). """
+    rows, cols = values.shape
+    result = np.zeros_like(values)
+    result[max(di, 0):rows + min(di, 0), max(dj, 0):cols + min(dj, 0)] = \
+        values[max(-di, 0):rows + min(-di, 0), max(-dj, 0):cols + min(-dj, 0)]
+    return result
+
+
+def thermal_step(heights, cell_size, talus_angle=TALUS_ANGLE, rate=THERMAL_RATE):
+    """ Uma iteração de erosão térmica (in-place). Devolve o volume movido (m por célula, somado). """
+    talus = np.float32(np.tan(np.radians(talus_angle)) * cell_size)
+    excess = [np.maximum(heights - neighbor - talus, 0.0) for neighbor in _neighbors(heights)]
+    total = sum(excess)
+    amount = np.float32(rate * 0.5) * np.maximum.reduce(excess)
+
+    share = np.divide(amount, total, out=np.zeros_like(total), where=total > 0)
+    heights -= amount
+    for (di, dj), part in zip(OFFSETS, excess):
+        heights += _shift(part * share, di, dj)
+    return float(amount.sum())
+
+
+class HydraulicState:
+    """ Água e sedimento em cima da grade (mesmo formato das alturas). """
+
+    def __init__(self, heights):
+        self.water = np.zeros_like(heights)
+        self.sediment = np.zeros_like(heights)
+
+
+def hydraulic_step(heights, state):
+    """ Uma iteração de erosão hidráulica (in-place). Devolve o sedimento arrancado na iteração. """
+    water, sediment = state.water, state.sediment
+    water += np.float32(RAIN)
+
+    # Água escorre para os vizinhos mais baixos (nível da água = terreno + água)
+    surface = heights + water
+    drops = [np.maximum(surface - neighbor, 0.0) for neighbor in _neighbors(surface)]
+    total_drop = sum(drops)
+    # No máximo metade do desnível (senão a água passa do equilíbrio e oscila)
+    outflow = np.minimum(water, total_drop * 0.5)
+    share = np.divide(outflow, total_drop, out=np.zeros_like(total_drop), where=total_drop > 0)
+
+    # Capacidade de transporte proporcional à água que está se movendo
+    capacity = np.float32(CAPACITY) * outflow
+    erode = np.where(sediment < capacity,
+                     np.float32(EROSION) * (capacity - sediment),
+                     -np.float32(DEPOSITION) * (sediment - capacity))
+    heights -= erode
+    sediment += erode
+
+    # Sedimento viaja junto com a água, na mesma proporção
+    concentration = np.divide(sediment, water, out=np.zeros_like(water), where=water > 0)
+    water -= outflow
+    sediment -= concentration * outflow
+    for (di, dj), drop in zip(OFFSETS, drops):
+        flow = drop * share
+        water += _shift(flow, di, dj)
+        sediment += _shift(flow * concentration, di, dj)
+
+    water *= np.float32(1.0 - EVAPORATION)
+    return float(np.maximum(erode, 0.0).sum())
+
+
+def erode(heights, hydraulic_iterations=200, thermal_iterations=50, time_budget=None, terrain_size=None):
+    """
+    Roda a erosão hidráulica e depois a térmica sobre uma cópia float32 das alturas (metros).
+    'time_budget' (segundos) interrompe antes se o tempo acabar.
+    """
+    terrain_size = terrain_size or settings.TERRAIN_SIZE
+    heights = np.array(heights, dtype=np.float32)
+    cell_size = terrain_size / float(heights.shape[1] - 1)
+    t_start = time.perf_counter()
+
+    def out_of_time():
+        return time_budget is not None and time.perf_counter() - t_start > time_budget
+
+    state = HydraulicState(heights)
+    for iteration in range(hydraulic_iterations):
+        if out_of_time():
+            print(f"Orçamento de tempo esgotado na iteração hidráulica {iteration}.")
+            break
+        t0 = time.perf_counter()
+        eroded = hydraulic_step(heights, state)
+        print(f"Hidráulica {iteration + 1}/{hydraulic_iterations}: {(time.perf_counter() - t0) * 1000:.1f} ms "
+              f"(erodido {eroded:.2f} m, água {state.water.sum():.1f} m)")
+    # O sedimento que ainda está na água assenta onde está
+    heights += state.sediment
+
+    for iteration in range(thermal_iterations):
+        if out_of_time():
+            print(f"Orçamento de tempo esgotado na iteração térmica {iteration}.")
+            break
+        t0 = time.perf_counter()
+        moved = thermal_step(heights, cell_size)
+        print(f"Térmica {iteration + 1}/{thermal_iterations}: {(time.perf_counter() - t0) * 1000:.1f} ms "
+              f"(movido {moved:.2f} m)")
+
+    print(f"Erosão concluída em {time.perf_counter() - t_start:.2f} s")
+    return heights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplica erosão hidráulica e térmica num heightmap.")
+    parser.add_argument("--entrada", default=settings.TERRAIN_HEIGHTMAP)
+    parser.add_argument("--gerar", action="store_true",
+                        help="Parte da ilha de gerar_ilha.py em vez de ler --entrada")
+    parser.add_argument("--tamanho", type=int, default=1024, help="Lado da ilha com --gerar")
+    parser.add_argument("--hidraulica", type=int, default=200, help="Iterações de erosão hidráulica")
+    parser.add_argument("--termica", type=int, default=50, help="Iterações de erosão térmica")
+    parser.add_argument("--tempo-max", type=float, default=None, help="Orçamento total em segundos")
+    parser.add_argument("--saida", default="assets/textures/heightmap.npy",
+                        help="Formato de alta precisão pela extensão: .npy, .r32 ou .png (16 bits)")
+    args = parser.parse_args()
+
+    if args.gerar:
+        from gerar_ilha import generate_island
+        heights = generate_island(args.tamanho) * np.float32(settings.MAX_TERRAIN_HEIGHT)
+    else:
+        heights = load_heightmap(args.entrada)
+
+    result = erode(heights, args.hidraulica, args.termica, args.tempo_max)
+    save_heightmap(args.saida, result)
+    print(f"Para usar no jogo: TERRAIN_HEIGHTMAP = \"{args.saida}\" em settings.py")
+
+
+if __name__ == "__main__":
+    main()
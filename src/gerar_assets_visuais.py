@@ -1,35 +1,48 @@
 from PIL import Image, ImageDraw, ImageFilter
-import math
 import os
 
+import numpy as np
+
+import settings
+from heightmap_io import save_heightmap
+
 # Garante diretórios
 os.makedirs("assets/textures", exist_ok=True)
 
+def gaussian_blur(values, sigma):
+    """ Blur gaussiano separável em float (o GaussianBlur do PIL só trabalha em 8 bits). """
+    radius = int(3 * sigma)
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel /= kernel.sum()
+
+    rows, cols = values.shape
+    padded = np.pad(values, ((0, 0), (radius, radius)), mode='edge')
+    values = sum(w * padded[:, k:k + cols] for k, w in enumerate(kernel))
+    padded = np.pad(values, ((radius, radius), (0, 0)), mode='edge')
+    return sum(w * padded[k:k + rows, :] for k, w in enumerate(kernel))
+
+
 # 1. HEIGHTMAP SUAVIZADO (Curvas amplas)
-def generate_smooth_heightmap():
-    size = 1024
-    img = Image.new('L', (size, size), 0)
-    pixels = img.load()
+def generate_smooth_heightmap(size=1024, path=settings.TERRAIN_HEIGHTMAP):
     center = size / 2
-    
-    # Gera uma ilha cônica suave
-    for x in range(size):
-        for y in range(size):
-            dx, dy = x - center, y - center
-            dist = math.sqrt(dx*dx + dy*dy) / (size/2)
-            
-            # Curva suave (cosseno)
-            if dist < 1.0:
-                h = (math.cos(dist * math.pi) + 1) * 0.5
-                # Adiciona "ruído" suave desenhado
-                noise = (math.sin(x * 0.05) + math.cos(y * 0.05)) * 0.02
-                pixels[x,y] = int((h + noise) * 255)
-            else:
-                pixels[x,y] = 0
-                
-    # Blur para tirar pontas
-    img = img.filter(ImageFilter.GaussianBlur(radius=10))
-    img.save("assets/textures/heightmap.jpg")
+
+    # Gera uma ilha cônica suave (a imagem inteira de uma vez, com NumPy)
+    y = np.arange(size, dtype=np.float64)[:, None]
+    x = np.arange(size, dtype=np.float64)[None, :]
+    dx, dy = x - center, y - center
+    dist = np.sqrt(dx*dx + dy*dy) / (size/2)
+
+    # Curva suave (cosseno)
+    h = (np.cos(dist * np.pi) + 1) * 0.5
+    # Adiciona "ruído" suave desenhado
+    noise = (np.sin(x * 0.05) + np.cos(y * 0.05)) * 0.02
+    values = np.clip(h + noise, 0.0, 1.0)
+    values[dist >= 1.0] = 0.0
+
+    # Blur para tirar pontas (em float: sem os degraus de 8 bits)
+    values = gaussian_blur(values, 10)
+    save_heightmap(path, values * settings.MAX_TERRAIN_HEIGHT)
     print("Heightmap suave gerado.")
 
 # 2. SOL ESTILIZADO (Sprite 2D)
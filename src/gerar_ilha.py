@@ -1,59 +1,73 @@
-from PIL import Image
-import math
+import argparse
+import time
+
+import numpy as np
+
+import settings
+from heightmap_io import save_heightmap
 
 # Configurações da Ilha
 SIZE = 1024          # Tamanho da imagem
 CENTER = SIZE / 2
 
 # AJUSTE 1: Aumentamos a área garantidamente plana (era 300)
-RADIUS_FLAT = 340    
+RADIUS_FLAT = 340
 
 # AJUSTE 2: Aumentamos o limite da ilha para usar mais espaço da imagem (era 480)
 # Isso ajuda a distribuir a inclinação por uma área maior.
-RADIUS_MAX = 510     
-
-img = Image.new('L', (SIZE, SIZE), color=0) # Cria imagem preta (fundo do mar)
-pixels = img.load()
-
-print("Gerando heightmap... aguarde um momento.")
-
-for x in range(SIZE):
-    for y in range(SIZE):
-        # Distância do pixel até o centro
-        dx = x - CENTER
-        dy = y - CENTER
-        distance = math.sqrt(dx*dx + dy*dy)
-
-        if distance < RADIUS_FLAT:
-            # Centro totalmente plano (Platô)
-            pixels[x, y] = 255
-            
-        elif distance < RADIUS_MAX:
-            # Zona de transição (Borda caindo)
-            
-            # 'factor' vai de 0.0 (início da queda) até 1.0 (fim da ilha)
-            factor = (distance - RADIUS_FLAT) / (RADIUS_MAX - RADIUS_FLAT)
-            
-            # --- O TRUQUE MATEMÁTICO ---
-            # Elevamos o fator ao quadrado (ou cubo). 
-            # Isso faz com que o número permaneça pequeno no início e cresça rápido no final.
-            # Resultado: A ilha mantém a altura por mais tempo e cai só na borda final.
-            # Tenta alterar para 3.0 se quiseres ainda mais plano!
-            factor = math.pow(factor, 2.0)
-            
-            # Usar coseno para a curva S suave
-            height = (math.cos(factor * math.pi) + 1) / 2 
-            
-            pixels[x, y] = int(height * 255)
-        else:
-            # Mar/Vazio
-            pixels[x, y] = 0
-
-# Salva na pasta de texturas
-try:
-    path = "assets/textures/heightmap.jpg"
-    img.save(path)
-    print(f"Sucesso! Heightmap atualizado e salvo em '{path}'")
-except FileNotFoundError:
-    img.save("heightmap.jpg") 
-    print("AVISO: Pasta 'assets/textures' não encontrada. Imagem salva na raiz como 'heightmap.jpg'.")
\ No newline at end of file
+RADIUS_MAX = 510
+
+
+def generate_island(size=SIZE):
+    """
+    Heightmap da ilha (float32 0..1, [linha, coluna]) calculado de uma vez com NumPy.
+    Os raios são proporcionais ao tamanho. Sem quantizar em 8 bits: quem grava
+    escolhe a precisão pelo formato (ver heightmap_io).
+    """
+    scale = size / float(SIZE)
+    center = size / 2
+    radius_flat = RADIUS_FLAT * scale
+    radius_max = RADIUS_MAX * scale
+
+    # Distância de cada pixel até o centro (broadcast linha x coluna)
+    dy = np.arange(size, dtype=np.float64)[:, None] - center
+    dx = np.arange(size, dtype=np.float64)[None, :] - center
+    distance = np.sqrt(dx * dx + dy * dy)
+
+    # 'factor' vai de 0.0 (início da queda) até 1.0 (fim da ilha)
+    factor = np.clip((distance - radius_flat) / (radius_max - radius_flat), 0.0, 1.0)
+
+    # --- O TRUQUE MATEMÁTICO ---
+    # Elevamos o fator ao quadrado (ou cubo).
+    # Isso faz com que o número permaneça pequeno no início e cresça rápido no final.
+    # Resultado: A ilha mantém a altura por mais tempo e cai só na borda final.
+    # Tenta alterar para 3.0 se quiseres ainda mais plano!
+    factor = factor ** 2.0
+
+    # Usar coseno para a curva S suave
+    height = (np.cos(factor * np.pi) + 1) / 2
+
+    height = height.astype(np.float32)
+    height[distance < radius_flat] = 1.0 # Centro totalmente plano (Platô)
+    height[distance >= radius_max] = 0.0 # Mar/Vazio
+    return height
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o heightmap da ilha.")
+    parser.add_argument("--tamanho", type=int, default=SIZE, help="Lado da imagem em pixels")
+    parser.add_argument("--saida", default=settings.TERRAIN_HEIGHTMAP,
+                        help="Extensão define o formato: .png (16 bits), .npy, .r32, .jpg")
+    args = parser.parse_args()
+
+    print("Gerando heightmap... aguarde um momento.")
+    t0 = time.perf_counter()
+    heights = generate_island(args.tamanho)
+    print(f"Heightmap {args.tamanho}x{args.tamanho} calculado em {time.perf_counter() - t0:.2f} s")
+
+    # Salva na pasta de texturas (em metros; o formato vem da extensão)
+    save_heightmap(args.saida, heights * settings.MAX_TERRAIN_HEIGHT)
+
+
+if __name__ == "__main__":
+    main()
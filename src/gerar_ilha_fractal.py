@@ -0,0 +1,155 @@
+"""
+Gerador de ilha com ruído fractal (várias oitavas de "value noise").
+
+O ruído vem de um hash inteiro das coordenadas da grade (sem tabela aleatória
+com estado), então cada pixel depende só da sua posição e da semente: a
+imagem pode ser dividida em tiles e calculada em vários processos, e o
+resultado é idêntico para qualquer tamanho de tile ou número de processos.
+
+Uso (na raiz do projeto):
+    python src/gerar_ilha_fractal.py
+    python src/gerar_ilha_fractal.py --tamanho 8192 --processos 8 --semente 7 --saida assets/textures/ilha.npy
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import settings
+from heightmap_io import save_heightmap
+
+# Configurações da Ilha (frações do lado da imagem, como em gerar_ilha.py)
+SIZE = 4096
+SEED = 1
+TILE = 512              # Pixels por lado de cada tile de trabalho
+OCTAVES = 7
+BASE_FREQUENCY = 3.0    # Ciclos da primeira oitava ao longo da imagem
+LACUNARITY = 2.0        # Multiplicador da frequência a cada oitava
+GAIN = 0.5              # Multiplicador da amplitude a cada oitava
+
+RADIUS_FLAT = 0.62      # Raio (fração do meio-lado) onde começa a queda para o mar
+RADIUS_MAX = 0.98       # Raio onde a ilha termina
+COAST_WARP = 0.18       # Quanto o ruído deforma o contorno da costa
+PLATEAU_HEIGHT = 0.8    # Altura média do platô (0..1)
+RELIEF = 0.35           # Amplitude do relevo por cima do platô
+
+
+def _hash_to_unit(ix, iz, seed):
+    """ Hash inteiro (uint32, estilo murmur) das coordenadas da grade -> [0, 1). """
+    h = (ix.astype(np.uint32) * np.uint32(0x8DA6B343)) ^ (iz.astype(np.uint32) * np.uint32(0xD8163841))
+    h ^= np.uint32((seed * 0x9E3779B9) & 0xFFFFFFFF)
+    h ^= h >> np.uint32(16)
+    h *= np.uint32(0x85EBCA6B)
+    h ^= h >> np.uint32(13)
+    h *= np.uint32(0xC2B2AE35)
+    h ^= h >> np.uint32(16)
+    return h.astype(np.float32) * np.float32(1.0 / 4294967296.0)
+
+
+def _value_noise(u, v, seed):
+    """ Value noise em coordenadas contínuas u (colunas) e v (linhas), com interpolação quíntica. """
+    iu = np.floor(u).astype(np.int64)
+    iv = np.floor(v).astype(np.int64)
+    fu = (u - iu).astype(np.float32)
+    fv = (v - iv).astype(np.float32)
+
+    # Só os pontos da grade que o tile usa (poucos nas oitavas baixas)
+    u0, v0 = iu.min(), iv.min()
+    lattice_u = np.arange(u0, iu.max() + 2)
+    lattice_v = np.arange(v0, iv.max() + 2)
+    lattice = _hash_to_unit(lattice_u[None, :], lattice_v[:, None], seed)
+
+    cu = (iu - u0)[None, :]
+    cv = (iv - v0)[:, None]
+    su = (fu * fu * fu * (fu * (fu * 6 - 15) + 10))[None, :]
+    sv = (fv * fv * fv * (fv * (fv * 6 - 15) + 10))[:, None]
+
+    top = lattice[cv, cu] + (lattice[cv, cu + 1] - lattice[cv, cu]) * su
+    bottom = lattice[cv + 1, cu] + (lattice[cv + 1, cu + 1] - lattice[cv + 1, cu]) * su
+    return top + (bottom - top) * sv
+
+
+def fractal_noise(rows, cols, size, seed, octaves=OCTAVES):
+    """ Soma de oitavas (fBm) normalizada para [0, 1], nas linhas/colunas globais dadas. """
+    total = np.zeros((len(rows), len(cols)), dtype=np.float32)
+    frequency = BASE_FREQUENCY / size
+    amplitude = 1.0
+    norm = 0.0
+    for octave in range(octaves):
+        # Semente diferente por oitava para as camadas não se alinharem
+        total += amplitude * _value_noise(cols * frequency, rows * frequency, seed * 131 + octave)
+        norm += amplitude
+        frequency *= LACUNARITY
+        amplitude *= GAIN
+    return total / np.float32(norm)
+
+
+def generate_tile(size, seed, i0, i1, j0, j1):
+    """ Alturas (float32, 0..1) das linhas [i0, i1) e colunas [j0, j1) da ilha. """
+    rows = np.arange(i0, i1, dtype=np.float64)
+    cols = np.arange(j0, j1, dtype=np.float64)
+
+    # Contorno da costa deformado por um ruído de baixa frequência
+    center = size / 2.0
+    dist = np.sqrt((cols[None, :] - center) ** 2 + (rows[:, None] - center) ** 2) / center
+    coast = fractal_noise(rows, cols, size, seed + 1000, octaves=3)
+    dist = dist + (coast - 0.5) * COAST_WARP
+
+    factor = np.clip((dist - RADIUS_FLAT) / (RADIUS_MAX - RADIUS_FLAT), 0.0, 1.0) ** 2.0
+    mask = ((np.cos(factor * np.pi) + 1) / 2).astype(np.float32)
+
+    detail = fractal_noise(rows, cols, size, seed)
+    height = mask * (PLATEAU_HEIGHT + RELIEF * (detail - 0.5))
+    return np.clip(height, 0.0, 1.0).astype(np.float32)
+
+
+def _generate_tile_job(args):
+    size, seed, i0, i1, j0, j1 = args
+    return i0, j0, generate_tile(size, seed, i0, i1, j0, j1)
+
+
+def generate_fractal_island(size=SIZE, seed=SEED, tile=TILE, workers=None):
+    """
+    Ilha inteira como float32 [linha, coluna] em 0..1.
+    workers=1 calcula no próprio processo; None usa um processo por núcleo.
+    """
+    heights = np.empty((size, size), dtype=np.float32)
+    jobs = [(size, seed, i0, min(i0 + tile, size), j0, min(j0 + tile, size))
+            for i0 in range(0, size, tile) for j0 in range(0, size, tile)]
+
+    if workers == 1:
+        results = map(_generate_tile_job, jobs)
+        for i0, j0, block in results:
+            heights[i0:i0 + block.shape[0], j0:j0 + block.shape[1]] = block
+        return heights
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i0, j0, block in pool.map(_generate_tile_job, jobs):
+            heights[i0:i0 + block.shape[0], j0:j0 + block.shape[1]] = block
+    return heights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera uma ilha com ruído fractal (tiles em paralelo).")
+    parser.add_argument("--tamanho", type=int, default=SIZE, help="Lado da imagem em pixels")
+    parser.add_argument("--semente", type=int, default=SEED)
+    parser.add_argument("--tile", type=int, default=TILE, help="Lado de cada tile de trabalho")
+    parser.add_argument("--processos", type=int, default=os.cpu_count(),
+                        help="Processos em paralelo (o resultado não muda)")
+    parser.add_argument("--saida", default=settings.TERRAIN_HEIGHTMAP,
+                        help="Extensão define o formato: .png (16 bits), .npy, .r32, .jpg")
+    args = parser.parse_args()
+
+    print(f"Gerando ilha fractal {args.tamanho}x{args.tamanho} "
+          f"(semente {args.semente}, {args.processos} processos)...")
+    t0 = time.perf_counter()
+    heights = generate_fractal_island(args.tamanho, args.semente, args.tile, args.processos)
+    print(f"Ruído calculado em {time.perf_counter() - t0:.2f} s")
+
+    save_heightmap(args.saida, heights * settings.MAX_TERRAIN_HEIGHT)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+import settings
+
+# Leitura/escrita de heightmaps em vários formatos. Tudo em metros (float32, [linha Z, coluna X]).
+#   .png (16 bits)      -> 0..65535 = 0..MAX_TERRAIN_HEIGHT (PNG de 8 bits também é aceito na leitura)
+#   .npy                -> float32 já em metros, aberto com mmap (nada é lido até ser usado)
+#   .r32 / .raw         -> float32 cru em metros, só mapa quadrado (o lado sai do tamanho do arquivo;
+#                          para mapas retangulares use .npy, que guarda o formato)
+#   outros (.jpg, ...)  -> imagem de 8 bits, 0..255 = 0..MAX_TERRAIN_HEIGHT (formato antigo)
+
+RAW_EXTENSIONS = (".r32", ".raw")
+
+
+def _extension(path):
+    return os.path.splitext(path)[1].lower()
+
+
+def _load_raw(path):
+    size = os.path.getsize(path)
+    count = size // 4
+    side = int(round(count ** 0.5))
+    if size % 4 or side * side != count or side < 2:
+        raise ValueError(f"{path}: float32 cru precisa ser um mapa quadrado ({size} bytes)")
+    return np.memmap(path, dtype=np.float32, mode='r', shape=(side, side))
+
+
+def _load_image(path):
+    image = Image.open(path)
+    if image.mode in ("I;16", "I;16B", "I;16L", "I"):
+        # 16 bits (o PIL abre alguns PNGs de 16 bits como "I", mas os valores vão até 65535)
+        pixels = np.asarray(image).astype(np.float32)
+        return pixels * np.float32(settings.MAX_TERRAIN_HEIGHT / 65535.0)
+
+    # np.asarray lê o buffer da imagem de uma vez (sem image.load() pixel a pixel)
+    pixels = np.asarray(image.convert('L'), dtype=np.float32)
+    return pixels * np.float32(settings.MAX_TERRAIN_HEIGHT / 255.0)
+
+
+def load_heightmap(heightmap_path):
+    """
+    Lê o heightmap e devolve as alturas em metros ([linha Z, coluna X]).
+    .npy e .r32/.raw voltam como memmap somente-leitura (float32); se um desses estiver
+    faltando, corrompido ou com formato errado, a exceção sobe (OSError/ValueError).
+    Imagens mantêm o comportamento antigo: imagem ilegível ou ausente vira plano chato.
+    """
+    extension = _extension(heightmap_path)
+    if extension == ".npy":
+        heights = np.load(heightmap_path, mmap_mode='r')
+        if heights.ndim != 2 or min(heights.shape) < 2:
+            raise ValueError(f"{heightmap_path}: esperava uma matriz 2D de alturas, veio {heights.shape}")
+        if heights.dtype != np.float32:
+            heights = heights.astype(np.float32)
+        return heights
+    if extension in RAW_EXTENSIONS:
+        return _load_raw(heightmap_path)
+    try:
+        return _load_image(heightmap_path)
+    except OSError as e:
+        print(f"ERRO: Não consegui ler {heightmap_path} ({e}). Usando plano chato.")
+        return np.zeros((2, 2), dtype=np.float32)
+
+
+def save_heightmap(path, heights):
+    """
+    Grava alturas em metros no formato indicado pela extensão de 'path'.
+    PNG sai em 16 bits; .npy e .r32/.raw guardam o float32 sem perda (.r32/.raw só
+    mapas quadrados: o arquivo cru não guarda o formato).
+    """
+    extension = _extension(path)
+    heights = np.asarray(heights, dtype=np.float32)
+    if extension in RAW_EXTENSIONS and heights.shape[0] != heights.shape[1]:
+        raise ValueError(f"{path}: float32 cru só guarda mapas quadrados "
+                         f"(este é {heights.shape[1]}x{heights.shape[0]}); use .npy")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    if extension == ".npy":
+        np.save(path, heights)
+    elif extension in RAW_EXTENSIONS:
+        heights.tofile(path)
+    else:
+        normalized = np.clip(heights / settings.MAX_TERRAIN_HEIGHT, 0.0, 1.0)
+        if extension == ".png":
+            Image.fromarray(np.round(normalized * 65535).astype(np.uint16)).save(path)
+        else:
+            Image.fromarray(np.round(normalized * 255).astype(np.uint8), mode='L').save(path)
+    print(f"Heightmap salvo em '{path}' ({heights.shape[1]}x{heights.shape[0]})")
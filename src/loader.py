@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+# Carga em paralelo: o trabalho de CPU (ler arquivos, interpretar .glb, decodificar
+# imagens, gerar terreno e floresta) roda em pools; só o envio para a GPU (que precisa
+# do contexto OpenGL) volta para a thread principal, numa fila consumida com um
+# orçamento de tempo por frame. Um job pode depender de outros: o trabalho dele só
+# começa depois que os envios das dependências terminaram.
+# Threads servem para o que solta o GIL (numpy grande, arquivos, freetype) e para o que
+# precisa de objetos já carregados (ex.: a floresta lê o Terrain). Trabalho em Python puro
+# (interpretar .glb, amostrar esqueletos) só anda em paralelo em processos: esses jobs
+# usam process=True (work e resultado precisam ser "picklable").
+
+
+def _timed(work, *args):
+    """ work(*args) -> (resultado, (início, fim, onde rodou)). perf_counter é monotônico do sistema (vale entre processos). """
+    start = time.perf_counter()
+    data = work(*args) if work is not None else None
+    if multiprocessing.parent_process() is not None:
+        where = multiprocessing.current_process().name
+    else:
+        where = threading.current_thread().name
+    return data, (start, time.perf_counter(), where)
+
+
+class LoadJob:
+    def __init__(self, name, work, upload, after, process):
+        self.name = name
+        self.work = work       # work(*resultados de 'after') -> dados (no pool)
+        self.upload = upload   # upload(dados) -> resultado do job (na thread do OpenGL)
+        self.after = after
+        self.process = process # Roda no pool de processos
+        self.future = None
+        self.result = None
+        self.done = False
+        self.work_span = None   # (início, fim, thread) do trabalho
+        self.upload_span = None # (início, fim) do envio
+
+
+class AssetLoader:
+    def __init__(self, workers, processes=0):
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="carga")
+        # Um núcleo fica para a thread principal (com um núcleo só, tudo vai para as threads)
+        self.processes = min(processes, max(0, (os.cpu_count() or 1) - 1))
+        self.process_pool = None # Criado no primeiro job com process=True
+        self.jobs = []
+        self.start = time.perf_counter()
+
+    def submit(self, name, work=None, upload=None, after=(), process=False):
+        """
+        Agenda um job e devolve o LoadJob (job.result fica pronto depois do envio).
+        work e upload são opcionais: sem work o upload recebe None; sem upload o resultado é o do work.
+        process=True roda o work num processo separado (se houver processos configurados).
+        """
+        job = LoadJob(name, work, upload, list(after), process and self.processes > 0)
+        self.jobs.append(job)
+        self._start_ready()
+        return job
+
+    def _start_ready(self):
+        for job in self.jobs:
+            if job.future is None and all(dep.done for dep in job.after):
+                pool = self.pool
+                if job.process:
+                    if self.process_pool is None:
+                        # "spawn": o filho não herda o contexto OpenGL nem as threads deste processo
+                        self.process_pool = ProcessPoolExecutor(max_workers=self.processes,
+                                                                mp_context=multiprocessing.get_context("spawn"))
+                    pool = self.process_pool
+                job.future = pool.submit(_timed, job.work, *[dep.result for dep in job.after])
+
+    def pump(self, budget_ms):
+        """
+        Na thread do OpenGL: faz os envios prontos, na ordem em que foram agendados, até
+        gastar o orçamento (pelo menos um por chamada). Devolve quantos foram feitos.
+        Exceções do trabalho no pool são relançadas aqui.
+        """
+        start = time.perf_counter()
+        done = 0
+        for job in self.jobs:
+            if job.done or job.future is None or not job.future.done():
+                continue
+            if done and time.perf_counter() - start > budget_ms / 1000.0:
+                break
+            data, job.work_span = job.future.result()
+            upload_start = time.perf_counter()
+            job.result = job.upload(data) if job.upload is not None else data
+            job.upload_span = (upload_start, time.perf_counter())
+            job.done = True
+            done += 1
+            self._start_ready() # Libera quem dependia deste job
+        return done
+
+    def finished(self):
+        return all(job.done for job in self.jobs)
+
+    def progress(self):
+        return sum(job.done for job in self.jobs), len(self.jobs)
+
+    def finish(self, budget_ms, frame=None, frame_interval=1.0 / 60.0):
+        """ Bombeia até tudo carregar; 'frame()' é chamado entre as levas (tela de carga). """
+        while not self.finished():
+            if not self.pump(budget_ms):
+                # Nada pronto: dorme até algum trabalho terminar (sem disputar o GIL com o pool)
+                running = [job.future for job in self.jobs if job.future is not None and not job.future.done()]
+                if running:
+                    wait(running, timeout=frame_interval, return_when=FIRST_COMPLETED)
+            if frame is not None:
+                frame()
+        self.pool.shutdown()
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+
+    def print_timeline(self, width=48):
+        """ Linha do tempo da carga: '=' trabalho no pool, '#' envio na thread principal. """
+        spans = [span for job in self.jobs for span in (job.work_span, job.upload_span) if span]
+        if not spans:
+            return
+        total = max(span[1] for span in spans) - self.start
+        scale = width / max(total, 1e-6)
+
+        print(f"Linha do tempo da carga ({total:.2f} s, {len(self.jobs)} jobs, "
+              f"{self.workers} threads + {self.processes} processos, {os.cpu_count()} núcleos):")
+        for job in self.jobs:
+            bar = [' '] * width
+            parts = []
+            for span, mark in ((job.work_span, '='), (job.upload_span, '#')):
+                if span is None:
+                    continue
+                first = min(int((span[0] - self.start) * scale), width - 1)
+                last = max(first + 1, min(int((span[1] - self.start) * scale), width))
+                bar[first:last] = mark * (last - first)
+                parts.append(f"{span[0] - self.start:5.2f}-{span[1] - self.start:5.2f} s")
+            thread = f" ({job.work_span[2]})" if job.work_span and job.work is not None else ""
+            print(f"  {job.name:<16} |{''.join(bar)}| {' + '.join(parts)}{thread}")
+
+        work = sum(job.work_span[1] - job.work_span[0] for job in self.jobs if job.work_span)
+        upload = sum(job.upload_span[1] - job.upload_span[0] for job in self.jobs if job.upload_span)
+        print(f"  Trabalho somado: {work:.2f} s no pool + {upload:.2f} s de envio; "
+              f"paralelismo efetivo {(work + upload) / max(total, 1e-6):.1f}x")
@@ -1,16 +1,20 @@
 import glfw
 from OpenGL.GL import *
 import settings # As constantes
-from shader import Shader # Importar a classe Shader
+from assets import AssetRegistry # Modelos, texturas e shaders compartilhados
 import glm # Biblioteca para manipulação de vetores e matrizes
 from camera import Camera # Importar a classe Camera
-from terrain import Terrain # Importar a classe Terrain
+from terrain import Terrain, load_terrain_data, terrain_vertex_shader_path # Importar a classe Terrain
 from shadow_mapper import ShadowMapper # Importar a classe ShadowMapper
-from model import Model # Importar a classe Model
-from text_renderer import TextRenderer
+from text_renderer import TextRenderer, rasterize_glyphs
+from loader import AssetLoader # Carga em paralelo (CPU no pool, envio para a GPU aqui)
+from model import prepare_model
+from animation_bake import AnimationTexture
+from functools import partial
 from vegetation import Vegetation
 from population import Population
 from water import Water
+from post_outline import ScreenOutline
 
 import math
 import numpy as np
@@ -47,8 +51,11 @@ class Engine:
         self.last_time = glfw.get_time()
         self.delta_time = 0.0
 
+        # Cada modelo, textura e shader é carregado uma vez e compartilhado (report() no fim)
+        self.assets = AssetRegistry()
+
         # ----------- SHADER DO SOL -----------
-        self.sun_shader = Shader("shaders/sun.vert", "shaders/sun.frag")
+        self.sun_shader = self.assets.shader("shaders/sun.vert", "shaders/sun.frag")
 
         # Quad de 2 triângulos
         sun_vertices = np.array([
@@ -97,74 +104,143 @@ class Engine:
         self.sky_color = settings.COLOR_DAY # Cor inicial do céu
 
         # Shader de Contorno
-        self.outline_shader = Shader("shaders/outline.vert", "shaders/outline.frag")
+        self.outline_shader = self.assets.shader("shaders/outline.vert", "shaders/outline.frag")
 
-        # Relogio 
-        self.text_shader = Shader("shaders/text.vert", "shaders/text.frag")
-        self.text_renderer = TextRenderer("assets/fonts/OpenSansHebrew-Regular.ttf", 32)
+        # Relogio (a fonte é carregada junto com o resto, logo abaixo)
+        self.text_shader = self.assets.shader("shaders/text.vert", "shaders/text.frag")
+        self.text_renderer = None
 
         # Projeção ortográfica para HUD do relogio
         self.hud_projection = glm.ortho(0, self.width, 0, self.height)
 
         # Testar o carregamento do shader
         try:
-            self.terrain_shader = Shader("shaders/terrain.vert", "shaders/terrain.frag")
-            self.shadow_shader = Shader("shaders/shadow_map.vert", "shaders/shadow_map.frag")
+            # O vertex shader depende do modo do terreno (grade inteira ou CDLOD)
+            self.terrain_shader = self.assets.shader(terrain_vertex_shader_path(), "shaders/terrain.frag")
+            self.shadow_shader = self.assets.shader("shaders/shadow_map.vert", "shaders/shadow_map.frag")
 
             # NOVO SHADER DE PERSONAGEM
-            self.model_shader = Shader("shaders/animated_model.vert", "shaders/animated_model.frag")
-
-            # Inicializar o terreno com o shader
-            self.terrain = Terrain(self.terrain_shader)
-
-            # Cria a floresta (passando o terreno para calcular altura)
-            self.vegetation = Vegetation(self.terrain, count=200)
-
-            # Importar personagens
-            self.character = Model("assets/models/character.glb", self.model_shader)
-            self.abe = Model("assets/models/abe.glb", self.model_shader)
-            self.boss = Model("assets/models/boss.glb", self.model_shader)
-            self.michelle = Model("assets/models/michelle.glb", self.model_shader)
+            # (variante instanciada: uma chamada por malha para todos os personagens do modelo)
+            # (cada instância busca a própria pose na textura de ossos: clipes assados ou poses da CPU)
+            # (com CHARACTER_TEXTURE_ARRAYS cada malha só escolhe a camada da textura array)
+            model_defines = {"INSTANCED": 1}
+            if settings.CHARACTER_TEXTURE_ARRAYS:
+                model_defines["TEXTURE_ARRAY"] = 1
+            self.model_shader = self.assets.shader("shaders/animated_model.vert", "shaders/animated_model.frag",
+                                                   defines=model_defines)
+
+            # Carga em paralelo: leitura, decodificação e geração rodam em threads/processos;
+            # o envio para a GPU de cada item volta para cá, com orçamento por frame
+            loader = AssetLoader(settings.LOADER_WORKERS, settings.LOADER_PROCESSES)
+            font = "assets/fonts/OpenSansHebrew-Regular.ttf"
+            font_job = loader.submit("fonte", work=lambda: rasterize_glyphs(font, 32),
+                                     upload=lambda glyphs: TextRenderer(font, 32, glyphs))
+
+            # Terreno (alturas e malha) e, depois dele, a floresta (que usa as alturas)
+            terrain_job = loader.submit("terreno", work=lambda: load_terrain_data(settings.TERRAIN_HEIGHTMAP),
+                                        upload=lambda data: Terrain(self.terrain_shader, self.assets, data))
+
+            def upload_vegetation(vegetation):
+                vegetation.upload()
+                return vegetation
+            vegetation_job = loader.submit("vegetacao", work=lambda terrain: Vegetation(terrain, self.assets, count=200, upload=False),
+                                           upload=upload_vegetation, after=[terrain_job])
+
+            # Importar personagens: ler o .glb e amostrar os clipes (animação assada) rodam
+            # num processo; aqui só são criados as malhas, as texturas e a textura de ossos
+            bake_fps = settings.ANIMATION_BAKE_FPS if settings.POPULATION_BAKED_ANIMATION else None
+            model_jobs = []
+            for name in ("character", "abe", "boss", "michelle"):
+                path = f"assets/models/{name}.glb"
+                model_jobs.append(loader.submit(f"modelo {name}", work=partial(prepare_model, path, bake_fps),
+                                                upload=partial(self.upload_character, path), process=True))
 
             # --- NOVO: GERAR POPULAÇÃO ---
-            # Agrupa os modelos numa lista
-            models_list = [self.character, self.abe, self.boss, self.michelle]
-            # Cria a multidão (80 pessoas)
-            self.population = Population(self.terrain, models_list, count=80)
+            # Cria a multidão (80 pessoas) quando o terreno e os 4 modelos estiverem na GPU
+            population_job = loader.submit(
+                "populacao", upload=lambda _: Population(terrain_job.result, [job.result for job in model_jobs], self.assets, count=80),
+                after=[terrain_job] + model_jobs)
+
+            loader.finish(settings.LOADER_UPLOAD_BUDGET_MS, lambda: self.render_loading_screen(loader, font_job))
+            loader.print_timeline()
+
+            self.text_renderer = font_job.result
+            self.terrain = terrain_job.result
+            self.vegetation = vegetation_job.result
+            self.character, self.abe, self.boss, self.michelle = [job.result for job in model_jobs]
+            self.population = population_job.result
             # NOVO: Criar o mar (Altura 12 para cobrir o fundo do terreno que vai a zero)
-            self.water = Water(size=800, height=12.0)
+            self.water = Water(self.assets, size=800, height=12.0)
 
             self.shadow_mapper = ShadowMapper()
 
+            # Contorno em pós-processamento (None = contorno por casco, render_with_outline)
+            self.screen_outline = None
+            if settings.OUTLINE_MODE == "screen":
+                self.screen_outline = ScreenOutline(self.width, self.height, self.assets)
+
+            self.assets.report()
+
         except Exception as e:
             print(f"Falha ao inicializar o shader: {e}")
             glfw.terminate()
             exit() # Sair se os shaders não carregarem
 
+    def upload_character(self, path, prepared):
+        """ Envio de um personagem da carga (model.prepare_model): modelo e, se veio assada, a textura de ossos. """
+        arrays, baked = prepared
+        model = self.assets.model(path, self.model_shader, arrays, texture_arrays=settings.CHARACTER_TEXTURE_ARRAYS)
+        if baked is not None and model.animation_texture is None:
+            model.animation_texture = AnimationTexture(*baked)
+        return model
+
+    def render_loading_screen(self, loader, font_job):
+        """ Um frame da tela de carga (entre os envios do loader): céu e progresso. """
+        glfw.poll_events()
+        glClearColor(self.sky_color.r, self.sky_color.g, self.sky_color.b, 1.0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        if font_job.done:
+            done, total = loader.progress()
+            glDisable(GL_DEPTH_TEST)
+            glEnable(GL_BLEND)
+            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+            self.text_shader.use()
+            self.text_shader.set_uniform_mat4("projection", self.hud_projection)
+            self.text_shader.set_uniform_int("text", 0)
+            font_job.result.render_text(self.text_shader, f"Carregando... {done}/{total}",
+                                        20, 40, 0.5, (1.0, 1.0, 1.0))
+            glDisable(GL_BLEND)
+            glEnable(GL_DEPTH_TEST)
+
+        glfw.swap_buffers(self.window)
+
     def render_with_outline(self, model_obj, view, projection, model_matrix=None, thickness=0.12):
         """Desenha o contorno preto com espessura configurável."""
         
         glCullFace(GL_FRONT) 
         
-        self.outline_shader.use()
-        self.outline_shader.set_uniform_mat4("view", view)
-        self.outline_shader.set_uniform_mat4("projection", projection)
+        # Terreno e vegetação podem trazer sua própria variante do shader de contorno
+        outline_shader = self.outline_shader
+        if isinstance(model_obj, (Terrain, Vegetation)):
+             outline_shader = model_obj.pass_shader("outline", self.outline_shader)
+
+        outline_shader.use()
+        outline_shader.set_uniform_mat4("view", view)
+        outline_shader.set_uniform_mat4("projection", projection)
         # Usa o valor passado por parâmetro (padrão 0.12 se não passar nada)
-        self.outline_shader.set_uniform_float("u_thickness", thickness) 
+        outline_shader.set_uniform_float("u_thickness", thickness) 
         
         if model_matrix is None:
-             self.outline_shader.set_uniform_mat4("model", glm.mat4(1.0))
+             outline_shader.set_uniform_mat4("model", glm.mat4(1.0))
         else:
-             self.outline_shader.set_uniform_mat4("model", model_matrix)
+             outline_shader.set_uniform_mat4("model", model_matrix)
 
         # Compatibilidade de tipos
         if isinstance(model_obj, Terrain):
-             model_obj.draw(None, None, None, override_shader=self.outline_shader)
+             model_obj.draw(None, None, None, override_shader=outline_shader)
         elif isinstance(model_obj, Vegetation):
-             glBindVertexArray(model_obj.vao)
-             vertex_count = len(model_obj.vertices) // 9 
-             glDrawArrays(GL_TRIANGLES, 0, vertex_count)
-             glBindVertexArray(0)
+             model_obj.draw_instances()
         else:
              model_obj.draw(self.outline_shader)
         
@@ -188,6 +264,12 @@ class Engine:
             # ---------- atualizar ciclo dia/noite ----------
             self.update_day_night_cycle()
 
+            # ---------- LOD do terreno (mesma seleção para as 3 passadas) ----------
+            self.terrain.update(self.camera.pos)
+
+            # ---------- LOD da vegetação (malha completa / reduzida / impostor) ----------
+            self.vegetation.update_lod(self.camera.pos)
+
             # ---------- preparar dados para sombras ----------
             self.terrain_height_at_center = self.terrain.get_height(0, 0)
 
@@ -207,20 +289,36 @@ class Engine:
             self.shadow_shader.use()
             self.shadow_shader.set_uniform_mat4("lightSpaceMatrix", light_space_matrix)
 
-            # 1. Desenhar Terreno no shadow map
-            self.terrain.draw(self.camera, projection=None, sun_direction=None, override_shader=self.shadow_shader)
+            # 1. Desenhar Terreno no shadow map (o terreno pode ter sua própria variante do shader)
+            terrain_shadow_shader = self.terrain.pass_shader("shadow", self.shadow_shader)
+            if terrain_shadow_shader is not self.shadow_shader:
+                terrain_shadow_shader.use()
+                terrain_shadow_shader.set_uniform_mat4("lightSpaceMatrix", light_space_matrix)
+            self.terrain.draw(self.camera, projection=None, sun_direction=None, override_shader=terrain_shadow_shader)
+            self.shadow_shader.use()
 
-            # 2. Desenhar Vegetação no shadow map (NOVO - CORREÇÃO)
-            self.vegetation.draw_shadow(self.shadow_shader)
+            # 2. Desenhar Vegetação no shadow map (NOVO - CORREÇÃO), com a variante instanciada
+            vegetation_shadow_shader = self.vegetation.pass_shader("shadow", self.shadow_shader)
+            vegetation_shadow_shader.use()
+            vegetation_shadow_shader.set_uniform_mat4("lightSpaceMatrix", light_space_matrix)
+            self.vegetation.draw_shadow(vegetation_shadow_shader)
+            self.shadow_shader.use()
 
-            # 3. Desenhar Personagens no shadow map (NOVO - CORREÇÃO)
-            self.population.draw_shadow(self.shadow_shader)
+            # 3. Desenhar Personagens no shadow map (NOVO - CORREÇÃO), com ossos e instâncias
+            population_shadow_shader = self.population.pass_shader("shadow", self.shadow_shader)
+            population_shadow_shader.use()
+            population_shadow_shader.set_uniform_mat4("lightSpaceMatrix", light_space_matrix)
+            self.population.draw_shadow(population_shadow_shader)
 
             self.shadow_mapper.unbind(self.width, self.height)
 
             # ---------- limpar framebuffer principal e configurar céu ----------
-            glClearColor(self.sky_color.r, self.sky_color.g, self.sky_color.b, 1.0)
-            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            if self.screen_outline:
+                # A cena vai para o framebuffer do contorno (cor + normal + profundidade)
+                self.screen_outline.begin(self.sky_color)
+            else:
+                glClearColor(self.sky_color.r, self.sky_color.g, self.sky_color.b, 1.0)
+                glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
             # ---------- projeção principal e VIEW ----------
             projection = glm.perspective(glm.radians(45.0), self.width / self.height, 0.1, 1000.0)
@@ -241,24 +339,24 @@ class Engine:
 
             self.terrain.draw(self.camera, projection, self.sun_direction)
 
-            # [NOVO] Desenho do Contorno do Terreno
-            self.render_with_outline(self.terrain, view, projection)
+            # [NOVO] Desenho do Contorno do Terreno (no modo "screen" sai na passada de bordas)
+            if not self.screen_outline:
+                self.render_with_outline(self.terrain, view, projection)
 
             # --- 2. VEGETAÇÃO ---
-            self.vegetation.shader.use() # Garante que o shader está ativo antes de enviar uniforms
-            # NOVO: Enviar cor do céu para o Fog da vegetação
-            self.vegetation.shader.set_uniform_vec3("u_sky_color", current_sky_color)
-            # --- NOVO: DESENHAR VEGETAÇÃO ---
+            # --- NOVO: DESENHAR VEGETAÇÃO (a cor do céu vai para o Fog da malha e dos impostores) ---
             self.vegetation.draw(
                 view, 
                 projection, 
                 self.sun_direction, 
                 settings.COLOR_SUN, 
-                settings.COLOR_AMBIENT
+                settings.COLOR_AMBIENT,
+                current_sky_color
             )
 
             # [NOVO] Contorno da Vegetação (Pode ficar pesado, teste!)
-            self.render_with_outline(self.vegetation, view, projection)
+            if not self.screen_outline:
+                self.render_with_outline(self.vegetation, view, projection)
 
             # --- 3. POPULAÇÃO ---
             self.model_shader.use()
@@ -275,10 +373,16 @@ class Engine:
             )
 
             # --- NOVO: DESENHAR ÁGUA ---
+            if self.screen_outline:
+                self.screen_outline.color_only() # Água transparente não entra no contorno
             self.water.draw(view, projection, self.sky_color)
+
+            # Passada de bordas: cena contornada (e profundidade) de volta na tela
+            if self.screen_outline:
+                self.screen_outline.finish()
             
             # Atualizar animações
-            self.population.update_animations(self.delta_time)
+            self.population.update_animations(self.delta_time, self.camera.pos, projection * view)
 
             # (OBS: Removi as chamadas manuais antigas self.character.draw etc, 
             # pois a population já desenha todos eles)
@@ -309,12 +413,54 @@ class Engine:
                 (1.0, 1.0, 1.0)
             )
 
+            # Estatísticas de desempenho (triângulos do terreno neste frame)
+            stats_str = (f"Terreno: {self.terrain.triangles_per_pass / 1000:.0f}k tri/passada, "
+                         f"{self.terrain.frame_triangles / 1000:.0f}k tri/frame")
+            self.text_renderer.render_text(
+                self.text_shader,
+                stats_str,
+                20,
+                self.height - 70,
+                0.5,
+                (1.0, 1.0, 1.0)
+            )
+
+            # Árvores em cada nível de detalhe da vegetação
+            full, reduced, impostor = self.vegetation.lod_counts
+            lod_str = f"Arvores: {full} completas, {reduced} reduzidas, {impostor} impostores"
+            self.text_renderer.render_text(
+                self.text_shader,
+                lod_str,
+                20,
+                self.height - 95,
+                0.5,
+                (1.0, 1.0, 1.0)
+            )
+
+            # Esqueletos atualizados/pulados neste frame (animação na CPU)
+            if not self.population.baked:
+                stats = self.population.scheduler.stats
+                anim_str = (f"Animacao: {stats['updated']} atualizados, {stats['deferred']} adiados, "
+                            f"{stats['held']} em espera, {stats['frozen']} congelados")
+                self.text_renderer.render_text(
+                    self.text_shader,
+                    anim_str,
+                    20,
+                    self.height - 120,
+                    0.5,
+                    (1.0, 1.0, 1.0)
+                )
+
             glDisable(GL_BLEND)
             glEnable(GL_DEPTH_TEST)
 
             # ---------- trocar buffers ----------
             glfw.swap_buffers(self.window)
             
+        # Os objetos da cena devolvem seus shaders ao registro antes de o contexto sumir
+        for scene_object in (self.terrain, self.vegetation, self.population, self.water, self.screen_outline):
+            if scene_object is not None:
+                scene_object.release()
         glfw.terminate()
 
 
@@ -372,11 +518,31 @@ class Engine:
         # Pular (Barra de Espaço)
         if glfw.get_key(self.window, glfw.KEY_SPACE) == glfw.PRESS:
             self.camera.jump()
+
+        # Editar o terreno (pincel no chão à frente da câmera)
+        for key, kind in ((glfw.KEY_R, "raise"), (glfw.KEY_F, "lower"),
+                          (glfw.KEY_G, "flatten"), (glfw.KEY_H, "smooth")):
+            if glfw.get_key(self.window, key) == glfw.PRESS:
+                self.sculpt_terrain(kind, front_xz)
         
         
         
         
         
+    def sculpt_terrain(self, kind, front_xz):
+        """ Aplica o pincel e reapoia árvores e personagens na área editada. """
+        if not self.terrain.can_edit:
+            return
+        target = self.camera.pos + front_xz * settings.TERRAIN_BRUSH_DISTANCE
+        strength = settings.TERRAIN_BRUSH_STRENGTH * self.delta_time
+        if kind in ("flatten", "smooth"):
+            strength = min(1.0, strength)
+
+        rect = self.terrain.apply_brush(kind, target.x, target.z, settings.TERRAIN_BRUSH_RADIUS, strength)
+        if rect is not None:
+            self.vegetation.snap_to_terrain(rect)
+            self.population.snap_to_terrain(rect)
+
     def render_sun(self, projection):
         self.sun_shader.use()
 
@@ -0,0 +1,65 @@
+import numpy as np
+from OpenGL.GL import *
+
+# Texturas de material dos personagens numa GL_TEXTURE_2D_ARRAY: todas as imagens do
+# mesmo tamanho (e mesma cadeia de mipmaps) viram camadas de uma textura só. Cada malha
+# guarda (array, camada) e o shader (variante TEXTURE_ARRAY) escolhe a camada por um
+# uniform, então a multidão inteira desenha com a textura ligada uma vez por passada.
+
+
+class TextureArray:
+    """
+    Camadas RGBA8 de largura x altura com 'level_count' níveis de mipmap. As camadas ficam
+    guardadas na CPU (normalmente mapeadas do bake do modelo) e a textura é montada no
+    primeiro bind; camadas adicionadas depois disso fazem ela ser remontada no próximo bind.
+    """
+
+    def __init__(self, width, height, level_count):
+        self.width = width
+        self.height = height
+        self.level_count = level_count
+        self.layers = [] # Pixels de cada nível de cada camada
+        self.texture = None
+        self.dirty = False
+
+    def add(self, levels):
+        """ Nova camada com os níveis [(largura, altura, pixels)]; devolve o índice dela. """
+        self.layers.append([np.ascontiguousarray(pixels) for _, _, pixels in levels])
+        self.dirty = True
+        return len(self.layers) - 1
+
+    def build(self):
+        if self.texture is None:
+            self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, self.texture)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_S, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_T, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAX_LEVEL, self.level_count - 1)
+        for level in range(self.level_count):
+            width, height = max(1, self.width >> level), max(1, self.height >> level)
+            glTexImage3D(GL_TEXTURE_2D_ARRAY, level, GL_RGBA8, width, height, len(self.layers), 0,
+                         GL_RGBA, GL_UNSIGNED_BYTE, None)
+            for layer, levels in enumerate(self.layers):
+                glTexSubImage3D(GL_TEXTURE_2D_ARRAY, level, 0, 0, layer, width, height, 1,
+                                GL_RGBA, GL_UNSIGNED_BYTE, levels[level])
+        glBindTexture(GL_TEXTURE_2D_ARRAY, 0)
+        self.dirty = False
+        print(f"Textura array {self.width}x{self.height}: {len(self.layers)} camadas "
+              f"({self.gpu_bytes() / (1024 * 1024):.1f} MB)")
+
+    def bind(self, unit=0):
+        if self.dirty:
+            self.build()
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, self.texture)
+
+    def gpu_bytes(self):
+        return sum(len(pixels) for levels in self.layers for pixels in levels)
+
+    def release(self):
+        if self.texture is not None:
+            glDeleteTextures(1, [self.texture])
+        self.texture = None
+        self.layers = []
@@ -2,40 +2,48 @@ import struct
 import numpy as np
 from OpenGL.GL import *
 import ctypes
-from pygltflib import GLTF2
-import glm
-import io
-from PIL import Image # Biblioteca para ler a textura
-
-# --- CLASSE AUXILIAR PARA ANIMAÇÃO ---
-class Node:
-    def __init__(self, index, name, local_matrix=glm.mat4(1.0)):
-        self.index = index
-        self.name = name
-        self.children = []
-        self.parent = None
-        
-        # Transformações Locais (Animáveis)
-        self.translation = glm.vec3(0.0)
-        self.rotation = glm.quat(1.0, 0.0, 0.0, 0.0)
-        self.scale = glm.vec3(1.0)
-        
-        self.local_transform = local_matrix
-        self.global_transform = glm.mat4(1.0)
-        self.inverse_bind_matrix = glm.mat4(1.0)
-        self.is_joint = False
+from animation import PackedClip
+from skeleton import Skeleton
+from model_cache import load_model_arrays
+from model_data import unpack_clips
+from animation_bake import sample_clips
+
+MAX_BONES = 100          # Tamanho da paleta de ossos (igual ao MAX_BONES dos shaders)
+INSTANCE_LOCATION = 5    # Primeiro atributo da matriz por instância (5 a 8)
+ANIMATION_LOCATION = 9   # Parâmetros de animação por instância (linha da textura de ossos)
+
+def build_skeleton(arrays):
+    """ Skeleton (nós, pose inicial e juntas da skin) dos arrays de model_data.parse_glb. """
+    inverse_binds = arrays["skin_inverse_binds"] if len(arrays["skin_inverse_binds"]) else None
+    return Skeleton(arrays["node_parents"], arrays["node_translations"], arrays["node_rotations"],
+                    arrays["node_scales"], arrays["skin_joints"], inverse_binds)
+
+
+def build_clips(arrays):
+    """ Clipes dos arrays, com os canais empacotados para amostrar de uma vez. """
+    clips = unpack_clips(arrays)
+    for anim in clips:
+        anim['packed'] = PackedClip(anim)
+    return clips
+
+
+def prepare_model(path, bake_fps=None):
+    """
+    Parte da carga de um modelo que não usa OpenGL (pode rodar em outro processo):
+    (arrays do .glb, clipes assados com sample_clips ou None se bake_fps=None).
+    """
+    arrays = load_model_arrays(path)
+    if arrays is None or bake_fps is None:
+        return arrays, None
+    return arrays, sample_clips(build_skeleton(arrays), build_clips(arrays), MAX_BONES, bake_fps)
 
-    def update_local_transform(self):
-        t = glm.translate(glm.mat4(1.0), self.translation)
-        r = glm.mat4(self.rotation)
-        s = glm.scale(glm.mat4(1.0), self.scale)
-        self.local_transform = t * r * s
 
 class Mesh:
-    def __init__(self, vertices, indices, texture_id=None):
+    def __init__(self, vertices, indices, texture_id=None, texture_layer=None):
         self.vertices = vertices
         self.indices = indices
         self.texture_id = texture_id # ID da textura OpenGL
+        self.texture_layer = texture_layer # (TextureArray, camada), (None, -1) sem textura; variante TEXTURE_ARRAY
         self.vao = glGenVertexArrays(1)
         self.vbo = glGenBuffers(1)
         self.ebo = glGenBuffers(1)
@@ -74,7 +82,45 @@ class Mesh:
         
         glBindVertexArray(0)
 
-    def draw(self, shader):
+    def set_instance_buffer(self, instance_vbo):
+        """ Liga a matriz por instância (mat4 coluna a coluna, locations 5 a 8) ao VAO desta malha. """
+        if len(self.vertices) == 0: return
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, instance_vbo)
+        for column in range(4):
+            glEnableVertexAttribArray(INSTANCE_LOCATION + column)
+            glVertexAttribPointer(INSTANCE_LOCATION + column, 4, GL_FLOAT, GL_FALSE, 64, ctypes.c_void_p(column * 16))
+            glVertexAttribDivisor(INSTANCE_LOCATION + column, 1)
+        glBindVertexArray(0)
+
+    def set_animation_buffer(self, animation_vbo):
+        """ Liga os parâmetros de animação por instância (vec4, location 9) ao VAO desta malha. """
+        if len(self.vertices) == 0: return
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, animation_vbo)
+        glEnableVertexAttribArray(ANIMATION_LOCATION)
+        glVertexAttribPointer(ANIMATION_LOCATION, 4, GL_FLOAT, GL_FALSE, 16, ctypes.c_void_p(0))
+        glVertexAttribDivisor(ANIMATION_LOCATION, 1)
+        glBindVertexArray(0)
+
+    def bind_material(self, shader, bound=None):
+        """
+        'bound' é um dicionário compartilhado pelas malhas de uma passada ('array' e 'layer' já
+        ligados): com texturas array, a textura só é religada quando muda de array.
+        """
+        if self.texture_layer is not None:
+            array, layer = self.texture_layer
+            if bound is None:
+                bound = {}
+            if array is not None and bound.get('array') is not array:
+                array.bind(0) # Unidade 0 para cor difusa
+                shader.set_uniform_int("u_texture_layers", 0)
+                bound['array'] = array
+            if bound.get('layer') != layer:
+                shader.set_uniform_int("u_texture_layer", layer)
+                bound['layer'] = layer
+            return
+
         # Ativar Textura se existir
         if self.texture_id is not None:
             glActiveTexture(GL_TEXTURE0) # Unidade 0 para cor difusa
@@ -84,6 +130,9 @@ class Mesh:
         else:
             shader.set_uniform_int("u_has_texture", 0)
 
+    def draw(self, shader, bound=None):
+        self.bind_material(shader, bound)
+
         glBindVertexArray(self.vao)
         if len(self.indices) > 0:
             glDrawElements(GL_TRIANGLES, len(self.indices), GL_UNSIGNED_INT, None)
@@ -91,221 +140,162 @@ class Mesh:
             glDrawArrays(GL_TRIANGLES, 0, len(self.vertices) // 16)
         glBindVertexArray(0)
 
+    def draw_instanced(self, shader, count, bound=None):
+        """ Todas as instâncias numa chamada (shader com a variante INSTANCED). """
+        if len(self.vertices) == 0: return
+        self.bind_material(shader, bound)
+
+        glBindVertexArray(self.vao)
+        if len(self.indices) > 0:
+            glDrawElementsInstanced(GL_TRIANGLES, len(self.indices), GL_UNSIGNED_INT, None, count)
+        else:
+            glDrawArraysInstanced(GL_TRIANGLES, 0, len(self.vertices) // 16, count)
+        glBindVertexArray(0)
+
+    def release(self):
+        glDeleteVertexArrays(1, [self.vao])
+        glDeleteBuffers(2, [self.vbo, self.ebo])
+
 class Model:
-    def __init__(self, path, shader):
+    def __init__(self, path, shader, assets, arrays=None, texture_arrays=False):
+        """ Crie pelo registro (AssetRegistry.model): 'assets' guarda as texturas compartilhadas. """
+        self.path = path
         self.shader = shader
+        self.assets = assets # Texturas compartilhadas (assets.AssetRegistry)
+        self.texture_arrays = texture_arrays # Texturas como camadas de texturas array (variante TEXTURE_ARRAY)
         self.meshes = []
-        self.nodes = []
-        self.root_nodes = []
+        self.skeleton = Skeleton([]) # Nós, pose e juntas em arrays (preenchido no load_glb)
         self.joints = []
         self.animations = [] 
-        self.current_time = 0.0
-        self.textures = {} # Mapa de índice GLTF -> ID OpenGL
+        self.textures = {} # Mapa de índice GLTF -> ID OpenGL ou (array, camada) (do registro de assets)
+        self.instance_vbo = None # Matrizes das instâncias (set_instances)
+        self.instance_count = 0
+        self.animation_vbo = None # Clipe/fase/velocidade de cada instância (animação assada)
+        self.animation_texture = None # AnimationTexture (animation_bake), se o modelo foi assado
         
-        self.load_glb(path)
+        self.load_glb(path, arrays)
+        # Pose de repouso (ponto de partida do bake e das poses da CPU); os ossos vão
+        # para a GPU na textura de animação (animation_bake.AnimationTexture)
+        self.update_hierarchy()
 
-    def update_animation(self, delta_time):
-        if not self.animations: return # Se não tiver animação, não faz nada
+    def apply_clip(self, anim, current_time):
+        """ Coloca os nós na pose do clipe 'anim' no instante 'current_time' (segundos). """
+        self.skeleton.apply_clip(anim['packed'], current_time)
 
-        anim = self.animations[0]
-        self.current_time += delta_time
-        if self.current_time > anim['duration']: self.current_time = 0.0
-        
-        for channel in anim['channels']:
-            node = self.nodes[channel['node_idx']]
-            times = channel['times']
-            values = channel['values']
-            path = channel['path']
-            
-            # Busca binária ou linear simples
-            k = 0
-            for i in range(len(times) - 1):
-                if self.current_time >= times[i] and self.current_time <= times[i+1]:
-                    k = i
-                    break
-            
-            dt = times[k+1] - times[k]
-            factor = (self.current_time - times[k]) / dt if dt > 0 else 0.0
-            
-            if path == 'translation':
-                idx = k * 3
-                v0 = glm.vec3(values[idx], values[idx+1], values[idx+2])
-                idx = (k+1) * 3
-                v1 = glm.vec3(values[idx], values[idx+1], values[idx+2])
-                node.translation = glm.mix(v0, v1, factor)
-            elif path == 'rotation':
-                idx = k * 4
-                q0 = glm.quat(values[idx+3], values[idx], values[idx+1], values[idx+2])
-                idx = (k+1) * 4
-                q1 = glm.quat(values[idx+3], values[idx], values[idx+1], values[idx+2])
-                node.rotation = glm.slerp(q0, q1, factor)
-            elif path == 'scale':
-                idx = k * 3
-                v0 = glm.vec3(values[idx], values[idx+1], values[idx+2])
-                idx = (k+1) * 3
-                v1 = glm.vec3(values[idx], values[idx+1], values[idx+2])
-                node.scale = glm.mix(v0, v1, factor)
+    def bone_palette(self):
+        """ (MAX_BONES, 16) float32 coluna a coluna: global * inversa do bind de cada junta (resto = identidade). """
+        return self.skeleton.skinning_matrices(MAX_BONES)
 
-        self.update_hierarchy()
+    def bind_bones(self, shader):
+        """ Liga a textura de animação (ossos de todas as instâncias) deste modelo, se houver. """
+        if self.animation_texture is not None:
+            self.animation_texture.bind(shader)
+
+    def set_instances(self, matrices, animation=None):
+        """
+        Matrizes model das instâncias, float32 (N, 16) coluna a coluna. Chame de novo quando mudarem.
+        'animation' (N, 4) são os parâmetros por instância da animação assada
+        (AnimationTexture.instance_params).
+        """
+        matrices = np.ascontiguousarray(matrices, dtype=np.float32).reshape(-1, 16)
+        if animation is not None:
+            animation = np.ascontiguousarray(animation, dtype=np.float32).reshape(-1, 4)
+            if self.animation_vbo is None:
+                self.animation_vbo = glGenBuffers(1)
+                for mesh in self.meshes:
+                    mesh.set_animation_buffer(self.animation_vbo)
+            glBindBuffer(GL_ARRAY_BUFFER, self.animation_vbo)
+            glBufferData(GL_ARRAY_BUFFER, animation.nbytes, animation, GL_STATIC_DRAW)
+
+        if self.instance_vbo is None:
+            self.instance_vbo = glGenBuffers(1)
+            for mesh in self.meshes:
+                mesh.set_instance_buffer(self.instance_vbo)
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        glBufferData(GL_ARRAY_BUFFER, matrices.nbytes, matrices, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.instance_count = len(matrices)
 
     def update_hierarchy(self):
-        for node in self.nodes: node.update_local_transform()
-        for root in self.root_nodes: self.update_node_global(root, glm.mat4(1.0))
-
-    def update_node_global(self, node, parent_transform):
-        node.global_transform = parent_transform * node.local_transform
-        for child_idx in node.children:
-            self.update_node_global(self.nodes[child_idx], node.global_transform)
-
-    def draw(self, shader):
-        bone_matrices = []
-        if self.joints:
-            for joint_idx in self.joints:
-                node = self.nodes[joint_idx]
-                bone_matrices.append(node.global_transform * node.inverse_bind_matrix)
-            if len(bone_matrices) > 100: bone_matrices = bone_matrices[:100]
-            shader.set_uniform_mat4_array("u_finalBones", bone_matrices)
-        else:
-            # Envia Identidade se não tiver ossos, para o shader não bugar
-            shader.set_uniform_mat4_array("u_finalBones", [glm.mat4(1.0)] * 100)
+        """ Matrizes locais e globais de todos os nós (em lote, nível a nível). """
+        self.skeleton.update()
 
+    def draw(self, shader, bound=None):
+        """ Uma cópia com o uniform 'model' do shader (sem ossos: ex. o contorno por casco). """
+        self.bind_bones(shader)
         for mesh in self.meshes:
-            mesh.draw(shader)
+            mesh.draw(shader, bound)
 
-    def load_glb(self, path):
+    def draw_instanced(self, shader, bound=None):
+        """
+        Todas as instâncias de set_instances: uma chamada instanciada por malha.
+        'bound' (ver Mesh.bind_material) pode ser compartilhado entre os modelos de uma passada.
+        """
+        if self.instance_count == 0: return
+        self.bind_bones(shader)
+        for mesh in self.meshes:
+            mesh.draw_instanced(shader, self.instance_count, bound)
+
+    def gpu_bytes(self):
+        """ Memória de GPU do modelo: malhas, instâncias e textura de animação (sem as texturas compartilhadas). """
+        size = sum(mesh.vertices.nbytes + mesh.indices.nbytes for mesh in self.meshes)
+        size += self.instance_count * (64 + (16 if self.animation_vbo is not None else 0))
+        if self.animation_texture is not None:
+            size += self.animation_texture.bones * 4 * self.animation_texture.rows * 16
+        return size
+
+    def release(self):
+        """ Apaga os objetos do OpenGL do modelo e devolve as texturas ao registro. """
+        for mesh in self.meshes:
+            mesh.release()
+        buffers = [buffer for buffer in (self.instance_vbo, self.animation_vbo) if buffer is not None]
+        if buffers:
+            glDeleteBuffers(len(buffers), buffers)
+        if self.animation_texture is not None:
+            glDeleteTextures(1, [self.animation_texture.texture])
+        for texture in self.textures.values():
+            self.assets.release(texture)
+        self.meshes, self.textures = [], {}
+
+    def load_glb(self, path, arrays=None):
         print(f"Carregando: {path}...")
-        try:
-            gltf = GLTF2().load(path)
-            
-            # 1. Carregar Texturas (NOVO)
-            if gltf.images:
-                print(f"Processando {len(gltf.images)} texturas...")
-                for i, img_entry in enumerate(gltf.images):
-                    tex_id = self.process_texture(gltf, img_entry)
-                    if tex_id: self.textures[i] = tex_id
-
-            # 2. Nós e Hierarquia
-            for i, g_node in enumerate(gltf.nodes):
-                node = Node(i, g_node.name or f"Node_{i}")
-                if g_node.translation: node.translation = glm.vec3(*g_node.translation)
-                if g_node.rotation: node.rotation = glm.quat(g_node.rotation[3], g_node.rotation[0], g_node.rotation[1], g_node.rotation[2])
-                if g_node.scale: node.scale = glm.vec3(*g_node.scale)
-                node.children = g_node.children or []
-                self.nodes.append(node)
-            
-            children_ids = set()
-            for node in self.nodes:
-                for c in node.children: 
-                    self.nodes[c].parent = node
-                    children_ids.add(c)
-            self.root_nodes = [n for i, n in enumerate(self.nodes) if i not in children_ids]
-
-            # 3. Skins
-            if gltf.skins:
-                skin = gltf.skins[0]
-                self.joints = skin.joints
-                if skin.inverseBindMatrices is not None:
-                    data = self.get_data(gltf, skin.inverseBindMatrices, 16)
-                    for k, j_idx in enumerate(self.joints):
-                        raw_m = data[k]
-                        self.nodes[j_idx].inverse_bind_matrix = glm.make_mat4(raw_m.ctypes.data_as(ctypes.POINTER(ctypes.c_float)))
-
-            # 4. Malhas e Materiais
-            for gltf_mesh in gltf.meshes:
-                for prim in gltf_mesh.primitives:
-                    # Geometria
-                    pos = self.get_data(gltf, prim.attributes.POSITION, 3)
-                    norm = self.get_data(gltf, prim.attributes.NORMAL, 3)
-                    uv = self.get_data(gltf, prim.attributes.TEXCOORD_0, 2)
-                    joints = self.get_data(gltf, prim.attributes.JOINTS_0, 4, np.uint32)
-                    weights = self.get_data(gltf, prim.attributes.WEIGHTS_0, 4)
-                    indices = self.get_data(gltf, prim.indices, 1, np.uint32).flatten() if prim.indices is not None else np.array([], dtype=np.uint32)
-                    
-                    # Padding
-                    nv = len(pos)
-                    if len(norm)==0: norm=np.zeros((nv,3), np.float32)
-                    if len(uv)==0: uv=np.zeros((nv,2), np.float32)
-                    if len(joints)==0: joints=np.zeros((nv,4), np.uint32)
-                    if len(weights)==0: weights=np.zeros((nv,4), np.float32)
-
-                    data = np.column_stack((pos, norm, uv, joints.astype(np.float32), weights))
-                    v_data = data.flatten().astype(np.float32)
-                    
-                    # Descobrir Textura do Material
-                    tex_id = None
-                    if prim.material is not None:
-                        mat = gltf.materials[prim.material]
-                        if mat.pbrMetallicRoughness and mat.pbrMetallicRoughness.baseColorTexture:
-                            tex_idx = mat.pbrMetallicRoughness.baseColorTexture.index
-                            # O índice da textura aponta para uma 'source' (imagem)
-                            source_img_idx = gltf.textures[tex_idx].source
-                            tex_id = self.textures.get(source_img_idx)
-
-                    self.meshes.append(Mesh(v_data, indices, tex_id))
-
-            # 5. Animação
-            if gltf.animations:
-                for g_anim in gltf.animations:
-                    anim = {'channels': [], 'duration': 0.0}
-                    for ch in g_anim.channels:
-                        sampler = g_anim.samplers[ch.sampler]
-                        times = self.get_data(gltf, sampler.input, 1).flatten()
-                        vals = self.get_data(gltf, sampler.output, 4 if ch.target.path=='rotation' else 3).flatten()
-                        anim['channels'].append({'node_idx': ch.target.node, 'path': ch.target.path, 'times': times, 'values': vals})
-                        if len(times)>0: anim['duration'] = max(anim['duration'], times[-1])
-                    self.animations.append(anim)
-
-            print("Modelo carregado com sucesso!")
-        except Exception as e:
-            print(f"Erro GLB: {e}")
-            import traceback
-            traceback.print_exc()
-
-    def process_texture(self, gltf, img_entry):
-        try:
-            if img_entry.bufferView is None: return None
-            
-            bv = gltf.bufferViews[img_entry.bufferView]
-            offset = bv.byteOffset + (0)
-            blob = gltf.binary_blob()
-            img_data = blob[offset : offset + bv.byteLength]
-            
-            image = Image.open(io.BytesIO(img_data))
-            
-            # --- CORREÇÃO DE COR ---
-            # Removi o FLIP_TOP_BOTTOM. O GLB geralmente já vem correto.
-            # Se continuar errado, tente descomentar a linha abaixo:
-            # image = image.transpose(Image.FLIP_TOP_BOTTOM) 
-            
-            if image.mode != 'RGBA': image = image.convert('RGBA')
-            img_bytes = image.tobytes()
-            
-            tex_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, tex_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, image.width, image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, img_bytes)
-            glGenerateMipmap(GL_TEXTURE_2D)
-            return tex_id
-        except Exception as e:
-            print(f"Erro textura: {e}")
-            return None
-
-    def get_data(self, gltf, acc_idx, comp, dtype=np.float32):
-        if acc_idx is None: return np.array([])
-        acc = gltf.accessors[acc_idx]
-        bv = gltf.bufferViews[acc.bufferView]
-        off = bv.byteOffset + (acc.byteOffset or 0)
-        blob = gltf.binary_blob()
-        raw = blob[off : off + bv.byteLength]
-        
-        if acc.componentType==5126: arr = np.frombuffer(raw, dtype=np.float32)
-        elif acc.componentType==5123: arr = np.frombuffer(raw, dtype=np.uint16).astype(dtype)
-        elif acc.componentType==5125: arr = np.frombuffer(raw, dtype=np.uint32).astype(dtype)
-        elif acc.componentType==5121: arr = np.frombuffer(raw, dtype=np.uint8).astype(dtype)
-        else: return np.zeros((acc.count, comp), dtype=dtype)
-        
-        if comp > 1: return arr.reshape((-1, comp))
-        return arr
\ No newline at end of file
+        # Arrays prontos (bake em BAKE_CACHE_DIR, mapeado em memória) ou lidos do .glb na hora;
+        # podem já vir carregados de outra thread (loader.py), aí só falta o envio para a GPU
+        if arrays is None:
+            arrays = load_model_arrays(path)
+        if arrays is None:
+            return
+        self.upload(arrays)
+        print("Modelo carregado com sucesso!")
+
+    def upload(self, arrays):
+        """ Cria texturas, malhas, esqueleto e clipes a partir dos arrays de model_data.parse_glb. """
+        # 1. Texturas: cada imagem com a cadeia de mipmaps já decodificada (nível 0 vem primeiro);
+        # imagens com o mesmo conteúdo (neste ou em outro modelo) viram uma textura só. Com
+        # texture_arrays cada imagem vira uma camada da textura array do tamanho dela
+        pixels = arrays["texture_pixels"]
+        chains = {}
+        for image, level, width, height, offset in arrays["texture_levels"].tolist():
+            chains.setdefault(image, []).append((width, height, pixels[offset:offset + width * height * 4]))
+        for image, levels in chains.items():
+            name = f"{self.path} (imagem {image})"
+            if self.texture_arrays:
+                self.textures[image] = self.assets.texture_layer(levels, name)
+            else:
+                self.textures[image] = self.assets.texture(levels, name)
+
+        # 2. Esqueleto (nós, pose inicial e juntas da skin)
+        self.joints = arrays["skin_joints"].tolist()
+        self.skeleton = build_skeleton(arrays)
+
+        # 3. Malhas (fatias dos buffers concatenados)
+        vertices, indices = arrays["mesh_vertices"], arrays["mesh_indices"]
+        for v_offset, v_count, i_offset, i_count, image in arrays["mesh_table"].tolist():
+            mesh_vertices, mesh_indices = vertices[v_offset:v_offset + v_count], indices[i_offset:i_offset + i_count]
+            if self.texture_arrays:
+                self.meshes.append(Mesh(mesh_vertices, mesh_indices, texture_layer=self.textures.get(image, (None, -1))))
+            else:
+                self.meshes.append(Mesh(mesh_vertices, mesh_indices, self.textures.get(image)))
+
+        # 4. Animação (canais em arrays para amostrar de uma vez)
+        self.animations.extend(build_clips(arrays))
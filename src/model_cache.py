@@ -0,0 +1,114 @@
+import glob
+import hashlib
+import os
+import sys
+
+import settings
+from bake_cache import file_sha256, read_bake, write_bake
+from model_data import parse_glb
+
+# Aumente quando o formato dos arrays (model_data.py) mudar: invalida todos os caches antigos.
+MODEL_BAKE_VERSION = 1
+
+# Nome do arquivo: model_<nome do .glb>-<hash do caminho>_<chave>.bake. O hash do caminho
+# separa modelos de mesmo nome em pastas diferentes, e a chave tem sempre 16 dígitos
+# hexadecimais, então a busca de bakes antigos de "boss" não pega os de "boss_v2".
+KEY_PATTERN = "[0-9a-f]" * 16
+
+
+def model_cache_key(glb_path):
+    """ Chave do cache: hash do conteúdo do .glb + versão do formato. """
+    parts = [f"v{MODEL_BAKE_VERSION}", file_sha256(glb_path)]
+    return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()
+
+
+def _model_name(glb_path):
+    """ Nome do .glb + hash do caminho relativo normalizado (igual em qualquer sistema). """
+    relative = os.path.normcase(os.path.normpath(os.path.relpath(glb_path))).replace(os.sep, "/")
+    path_hash = hashlib.sha256(relative.encode('utf-8')).hexdigest()[:8]
+    return f"{os.path.splitext(os.path.basename(glb_path))[0]}-{path_hash}"
+
+
+def _bake_pattern(name):
+    """ Padrão do glob dos bakes do modelo 'name' (de _model_name; "*" = todos). """
+    name = "*" if name == "*" else glob.escape(name)
+    return os.path.join(settings.BAKE_CACHE_DIR, f"model_{name}_{KEY_PATTERN}.bake")
+
+
+def _cache_path(glb_path, key):
+    return os.path.join(settings.BAKE_CACHE_DIR, f"model_{_model_name(glb_path)}_{key[:16]}.bake")
+
+
+def load_model_bake(glb_path):
+    """ Devolve o dicionário de arrays (memmap) se houver um bake válido, senão None. """
+    if not settings.MODEL_CACHE_ENABLED or not os.path.isfile(glb_path):
+        return None
+
+    key = model_cache_key(glb_path)
+    path = _cache_path(glb_path, key)
+    baked = read_bake(path)
+    if baked is None:
+        print(f"Cache de modelo: MISS -> {path}")
+        return None
+
+    arrays, meta = baked
+    if meta.get("key") != key:
+        print(f"Cache de modelo: MISS (chave diferente) -> {path}")
+        return None
+
+    print(f"Cache de modelo: HIT <- {path}")
+    return arrays
+
+
+def store_model_bake(glb_path, arrays):
+    """ Grava o bake e apaga bakes antigos do mesmo modelo (versões anteriores do .glb). """
+    if not settings.MODEL_CACHE_ENABLED or not os.path.isfile(glb_path):
+        return
+
+    key = model_cache_key(glb_path)
+    path = _cache_path(glb_path, key)
+
+    for stale in glob.glob(_bake_pattern(_model_name(glb_path))):
+        if os.path.abspath(stale) != os.path.abspath(path):
+            os.remove(stale)
+
+    try:
+        write_bake(path, arrays, meta={"key": key, "source": glb_path})
+        print(f"Cache de modelo: gravado -> {path}")
+    except OSError as e:
+        print(f"AVISO: não foi possível gravar o cache de modelo: {e}")
+
+
+def load_model_arrays(glb_path):
+    """ Arrays do modelo: do bake se estiver válido, senão lendo o .glb (e gravando o bake). """
+    arrays = load_model_bake(glb_path)
+    if arrays is None:
+        arrays = parse_glb(glb_path)
+        if arrays is not None:
+            store_model_bake(glb_path, arrays)
+    return arrays
+
+
+def invalidate_model_cache(glb_path=None):
+    """ Remove os bakes de modelos (todos, ou só os do .glb dado). Devolve quantos foram apagados. """
+    removed = 0
+    for path in glob.glob(_bake_pattern(_model_name(glb_path) if glb_path else "*")):
+        os.remove(path)
+        removed += 1
+    print(f"Cache de modelo: {removed} arquivo(s) removido(s).")
+    return removed
+
+
+if __name__ == "__main__":
+    # python src/model_cache.py --assar    (rodar na raiz do projeto; não precisa de janela)
+    # python src/model_cache.py --limpar
+    if "--assar" in sys.argv:
+        for glb_path in sorted(glob.glob("assets/models/*.glb")):
+            if load_model_bake(glb_path) is None:
+                arrays = parse_glb(glb_path)
+                if arrays is not None:
+                    store_model_bake(glb_path, arrays)
+    elif "--limpar" in sys.argv:
+        invalidate_model_cache()
+    else:
+        print("Uso: python src/model_cache.py --assar | --limpar")
@@ -0,0 +1,191 @@
+import io
+
+import numpy as np
+from PIL import Image # Biblioteca para ler a textura
+from pygltflib import GLTF2
+
+# Leitura de um .glb para arrays prontos para a GPU (sem OpenGL): vértices
+# intercalados, índices, esqueleto, canais de animação e texturas já decodificadas
+# com a cadeia de mipmaps. Tudo em arrays planos + tabelas de offsets, então o
+# resultado pode ir direto para um arquivo bake (model_cache.py) e voltar mapeado.
+#
+#   mesh_table    (M, 5): offset e nº de floats dos vértices, offset e nº de índices, imagem (-1 = sem)
+#   channel_table (C, 7): clipe, nó, tipo (PATH_CODES), offset/nº de tempos, offset/nº de valores
+#   texture_levels (L, 5): imagem, nível, largura, altura, offset em texture_pixels
+
+PATH_CODES = {'translation': 0, 'rotation': 1, 'scale': 2}
+PATH_NAMES = {code: path for path, code in PATH_CODES.items()}
+
+
+def get_data(gltf, acc_idx, comp, dtype=np.float32):
+    if acc_idx is None: return np.array([])
+    acc = gltf.accessors[acc_idx]
+    bv = gltf.bufferViews[acc.bufferView]
+    off = bv.byteOffset + (acc.byteOffset or 0)
+    blob = gltf.binary_blob()
+    raw = blob[off : off + bv.byteLength]
+
+    if acc.componentType==5126: arr = np.frombuffer(raw, dtype=np.float32)
+    elif acc.componentType==5123: arr = np.frombuffer(raw, dtype=np.uint16).astype(dtype)
+    elif acc.componentType==5125: arr = np.frombuffer(raw, dtype=np.uint32).astype(dtype)
+    elif acc.componentType==5121: arr = np.frombuffer(raw, dtype=np.uint8).astype(dtype)
+    else: return np.zeros((acc.count, comp), dtype=dtype)
+
+    if comp > 1: return arr.reshape((-1, comp))
+    return arr
+
+
+def decode_texture(gltf, img_entry):
+    """ Imagem embutida -> lista de níveis RGBA8 (imagem original e mipmaps até 1x1), ou None. """
+    try:
+        if img_entry.bufferView is None: return None
+
+        bv = gltf.bufferViews[img_entry.bufferView]
+        blob = gltf.binary_blob()
+        img_data = blob[bv.byteOffset : bv.byteOffset + bv.byteLength]
+
+        image = Image.open(io.BytesIO(img_data))
+        # (Sem FLIP_TOP_BOTTOM: o GLB geralmente já vem correto)
+        if image.mode != 'RGBA': image = image.convert('RGBA')
+
+        levels = [image]
+        while image.width > 1 or image.height > 1:
+            image = image.resize((max(1, image.width // 2), max(1, image.height // 2)), Image.BOX)
+            levels.append(image)
+        return levels
+    except Exception as e:
+        print(f"Erro textura: {e}")
+        return None
+
+
+def parse_glb(path):
+    """ Lê o .glb e devolve o dicionário de arrays descrito no topo do módulo (None se falhar). """
+    try:
+        gltf = GLTF2().load(path)
+
+        # 1. Texturas: todos os níveis de todas as imagens num só buffer de bytes
+        pixels, levels = [], []
+        offset = 0
+        if gltf.images:
+            print(f"Processando {len(gltf.images)} texturas...")
+        for i, img_entry in enumerate(gltf.images or []):
+            chain = decode_texture(gltf, img_entry)
+            for level, image in enumerate(chain or []):
+                data = image.tobytes()
+                levels.append((i, level, image.width, image.height, offset))
+                pixels.append(np.frombuffer(data, dtype=np.uint8))
+                offset += len(data)
+
+        # 2. Nós e Hierarquia (pai de cada nó e pose inicial)
+        parents = np.full(len(gltf.nodes), -1, dtype=np.int64)
+        translations = np.zeros((len(gltf.nodes), 3))
+        rotations = np.tile([0.0, 0.0, 0.0, 1.0], (len(gltf.nodes), 1))
+        scales = np.ones((len(gltf.nodes), 3))
+        for i, g_node in enumerate(gltf.nodes):
+            if g_node.translation: translations[i] = g_node.translation
+            if g_node.rotation: rotations[i] = g_node.rotation # (x, y, z, w) como no glTF
+            if g_node.scale: scales[i] = g_node.scale
+            for c in g_node.children or []:
+                parents[c] = i
+
+        # 3. Skins
+        joints = np.zeros(0, dtype=np.int64)
+        inverse_binds = np.zeros((0, 4, 4))
+        if gltf.skins:
+            skin = gltf.skins[0]
+            joints = np.array(skin.joints, dtype=np.int64)
+            if skin.inverseBindMatrices is not None:
+                # Coluna a coluna no arquivo: transpõe para linha a linha
+                data = get_data(gltf, skin.inverseBindMatrices, 16)
+                inverse_binds = data[:len(joints)].reshape(-1, 4, 4).transpose(0, 2, 1).astype(np.float64)
+
+        # 4. Malhas e Materiais
+        vertices, indices, mesh_table = [], [], []
+        vertex_offset = index_offset = 0
+        for gltf_mesh in gltf.meshes:
+            for prim in gltf_mesh.primitives:
+                # Geometria
+                pos = get_data(gltf, prim.attributes.POSITION, 3)
+                norm = get_data(gltf, prim.attributes.NORMAL, 3)
+                uv = get_data(gltf, prim.attributes.TEXCOORD_0, 2)
+                bone_ids = get_data(gltf, prim.attributes.JOINTS_0, 4, np.uint32)
+                weights = get_data(gltf, prim.attributes.WEIGHTS_0, 4)
+                prim_indices = get_data(gltf, prim.indices, 1, np.uint32).flatten() if prim.indices is not None else np.array([], dtype=np.uint32)
+
+                # Padding
+                nv = len(pos)
+                if len(norm)==0: norm=np.zeros((nv,3), np.float32)
+                if len(uv)==0: uv=np.zeros((nv,2), np.float32)
+                if len(bone_ids)==0: bone_ids=np.zeros((nv,4), np.uint32)
+                if len(weights)==0: weights=np.zeros((nv,4), np.float32)
+
+                v_data = np.column_stack((pos, norm, uv, bone_ids.astype(np.float32), weights)).astype(np.float32).reshape(-1)
+
+                # Descobrir Textura do Material (o índice da textura aponta para uma 'source' (imagem))
+                image = -1
+                if prim.material is not None:
+                    mat = gltf.materials[prim.material]
+                    if mat.pbrMetallicRoughness and mat.pbrMetallicRoughness.baseColorTexture:
+                        tex_idx = mat.pbrMetallicRoughness.baseColorTexture.index
+                        image = gltf.textures[tex_idx].source
+
+                mesh_table.append((vertex_offset, len(v_data), index_offset, len(prim_indices), image))
+                vertices.append(v_data)
+                indices.append(prim_indices.astype(np.uint32))
+                vertex_offset += len(v_data)
+                index_offset += len(prim_indices)
+
+        # 5. Animação: tempos e valores de todos os canais de todos os clipes concatenados
+        times, values, channel_table, durations = [], [], [], []
+        time_offset = value_offset = 0
+        for clip, g_anim in enumerate(gltf.animations or []):
+            duration = 0.0
+            for ch in g_anim.channels:
+                if ch.target.path not in PATH_CODES: continue # Morph targets ('weights') não são usados
+                sampler = g_anim.samplers[ch.sampler]
+                channel_times = get_data(gltf, sampler.input, 1).flatten()
+                vals = get_data(gltf, sampler.output, 4 if ch.target.path=='rotation' else 3).flatten()
+                channel_table.append((clip, ch.target.node, PATH_CODES[ch.target.path],
+                                      time_offset, len(channel_times), value_offset, len(vals)))
+                times.append(channel_times.astype(np.float32))
+                values.append(vals.astype(np.float32))
+                time_offset += len(channel_times)
+                value_offset += len(vals)
+                if len(channel_times)>0: duration = max(duration, float(channel_times[-1]))
+            durations.append(duration)
+
+        def concat(parts, dtype):
+            return np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+
+        return {
+            "mesh_vertices": concat(vertices, np.float32),
+            "mesh_indices": concat(indices, np.uint32),
+            "mesh_table": np.array(mesh_table, dtype=np.int64).reshape(-1, 5),
+            "node_parents": parents,
+            "node_translations": translations,
+            "node_rotations": rotations,
+            "node_scales": scales,
+            "skin_joints": joints,
+            "skin_inverse_binds": inverse_binds,
+            "clip_durations": np.array(durations, dtype=np.float64),
+            "channel_table": np.array(channel_table, dtype=np.int64).reshape(-1, 7),
+            "channel_times": concat(times, np.float32),
+            "channel_values": concat(values, np.float32),
+            "texture_pixels": concat(pixels, np.uint8),
+            "texture_levels": np.array(levels, dtype=np.int64).reshape(-1, 5),
+        }
+    except Exception as e:
+        print(f"Erro GLB: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def unpack_clips(arrays):
+    """ Clipes no formato do Model ({'channels': [...], 'duration': ...}) a partir dos arrays. """
+    clips = [{'channels': [], 'duration': duration} for duration in arrays["clip_durations"].tolist()]
+    times, values = arrays["channel_times"], arrays["channel_values"]
+    for clip, node, path, t0, tn, v0, vn in arrays["channel_table"].tolist():
+        clips[clip]['channels'].append({'node_idx': node, 'path': PATH_NAMES[path],
+                                        'times': times[t0:t0 + tn], 'values': values[v0:v0 + vn]})
+    return clips
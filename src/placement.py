@@ -0,0 +1,120 @@
+import math
+
+import numpy as np
+
+# Posicionamento de objetos no terreno (árvores, personagens, ...) com "blue noise":
+# amostragem Poisson-disk (nenhum par mais perto que a distância mínima) feita em lote.
+#
+# A área é coberta por uma grade de fundo com células de lado r/sqrt(2), então cada
+# célula guarda no máximo um ponto. Em cada rodada as células são visitadas em 9 fases
+# (linha % 3, coluna % 3): células da mesma fase estão a 3 células uma da outra, longe
+# demais para dois candidatos da mesma fase conflitarem, então uma fase inteira é
+# testada de uma vez (um candidato por célula vazia) só contra os pontos já aceitos.
+
+ATTEMPTS = 12   # Rodadas (candidatos por célula); mais rodadas = preenchimento mais denso
+REJECTIONS_TO_SKIP = 3  # Recusas pelo terreno até a célula deixar de ser sorteada
+
+
+class PlacementLayer:
+    """ Regras de uma camada: espaçamento mínimo e faixa de altura/inclinação do chão aceitos. """
+
+    def __init__(self, name, min_distance, min_height=-math.inf, max_height=math.inf, max_slope=90.0):
+        self.name = name
+        self.min_distance = min_distance
+        self.min_height = min_height
+        self.max_height = max_height
+        self.max_slope = max_slope # Graus
+
+    def accepts(self, heights, slopes):
+        return (heights >= self.min_height) & (heights <= self.max_height) & (slopes <= self.max_slope)
+
+
+def poisson_disk(rng, min_distance, spawn_radius, min_radius=0.0, rule=None, attempts=ATTEMPTS):
+    """
+    Pontos (x, z) no anel min_radius..spawn_radius em volta da origem com espaçamento
+    >= min_distance. 'rule(xs, zs)' (opcional) recebe um lote de candidatos e devolve
+    (máscara de aceitos, valores extras por candidato). Devolve (xs, zs, extras).
+    """
+    cell = min_distance / math.sqrt(2.0)
+    side = int(math.ceil(2.0 * spawn_radius / cell))
+    origin = -spawn_radius
+    # Índice do ponto em cada célula (-1 = vazia), com 2 células de borda para
+    # a vizinhança nunca sair do array
+    padded = side + 4
+    grid = np.full(padded * padded, -1, dtype=np.int64)
+
+    # Células que encostam no anel, separadas nas 9 fases (índice plano na grade com borda)
+    rows, cols = np.indices((side, side))
+    center_distance = np.hypot(origin + (cols + 0.5) * cell, origin + (rows + 0.5) * cell)
+    in_domain = (center_distance <= spawn_radius + cell) & (center_distance >= min_radius - cell)
+    flat = (rows + 2) * padded + (cols + 2)
+    phases = [flat[in_domain & (rows % 3 == a) & (cols % 3 == b)] for a in range(3) for b in range(3)]
+
+    # Vizinhança 5x5 (um ponto a menos de r pode estar até 2 células de distância)
+    offsets = [di * padded + dj for di in range(-2, 3) for dj in range(-2, 3) if (di, dj) != (0, 0)]
+    capacity = int(in_domain.sum()) # No máximo um ponto por célula
+    xs, zs, extras = np.empty(capacity), np.empty(capacity), np.zeros(capacity)
+    rejections = np.zeros(padded * padded, dtype=np.int8) # Vezes que o terreno recusou a célula
+    count = 0
+    for _ in range(attempts):
+        for phase in rng.permutation(len(phases)):
+            # Células vazias; as que o terreno recusou várias vezes (água, picos) saem da lista
+            cells = phases[phase]
+            cells = cells[(grid[cells] < 0) & (rejections[cells] < REJECTIONS_TO_SKIP)]
+            phases[phase] = cells
+            if len(cells) == 0:
+                continue
+            ci, cj = np.divmod(cells, padded)
+            cx = origin + (cj - 2 + rng.random(len(cells))) * cell
+            cz = origin + (ci - 2 + rng.random(len(cells))) * cell
+
+            radius = np.hypot(cx, cz)
+            alive = np.flatnonzero((radius <= spawn_radius) & (radius >= min_radius))
+            for offset in offsets:
+                neighbor = grid[cells[alive] + offset]
+                has = neighbor >= 0
+                if has.any():
+                    dx = xs[neighbor[has]] - cx[alive[has]]
+                    dz = zs[neighbor[has]] - cz[alive[has]]
+                    too_close = np.zeros(len(alive), dtype=bool)
+                    too_close[has] = dx * dx + dz * dz < min_distance * min_distance
+                    alive = alive[~too_close]
+
+            keep = alive
+            if rule is not None and len(keep):
+                accepted, extra = rule(cx[keep], cz[keep])
+                rejections[cells[keep[~accepted]]] += 1
+                keep = keep[accepted]
+                extras[count:count + len(keep)] = extra[accepted]
+            if len(keep) == 0:
+                continue
+
+            new = slice(count, count + len(keep))
+            xs[new], zs[new] = cx[keep], cz[keep]
+            grid[cells[keep]] = np.arange(new.start, new.stop)
+            count += len(keep)
+
+    return xs[:count], zs[:count], extras[:count]
+
+
+def place(terrain, layer, count, spawn_radius, min_radius=0.0, seed=0, attempts=ATTEMPTS):
+    """
+    Até 'count' posições (xs, ys, zs) da camada no terreno: Poisson-disk no anel,
+    altura e inclinação checadas em lote com terrain.get_heights. Mesma semente =
+    mesmo resultado. Avisa quando a área não comporta 'count' pontos.
+    """
+    rng = np.random.default_rng(seed)
+
+    def rule(xs, zs):
+        heights, slopes = terrain.get_heights(xs, zs, with_slopes=True)
+        heights = np.asarray(heights, dtype=np.float64)
+        return layer.accepts(heights, np.asarray(slopes)), heights
+
+    xs, zs, ys = poisson_disk(rng, layer.min_distance, spawn_radius, min_radius, rule, attempts)
+
+    # Subconjunto aleatório do conjunto denso: continua respeitando o espaçamento
+    chosen = rng.permutation(len(xs))[:count]
+    if len(chosen) < count:
+        print(f"AVISO: só couberam {len(chosen)} de {count} ({layer.name}) com espaçamento de "
+              f"{layer.min_distance} m; diminua o espaçamento ou aumente a área.")
+    return xs[chosen], ys[chosen], zs[chosen]
@@ -1,53 +1,86 @@
 import glm
-import random
-import math
+import numpy as np
 from OpenGL.GL import *
-from settings import COLOR_SUN, COLOR_AMBIENT # Importar configurações globais
+from settings import COLOR_SUN, COLOR_AMBIENT, SPATIAL_GRID_CELL_SIZE # Importar configurações globais
+from settings import PLACEMENT_SEED, POPULATION_MIN_SPACING
+from settings import POPULATION_BAKED_ANIMATION, ANIMATION_BAKE_FPS
+from settings import ANIMATION_BUDGET_MS, ANIMATION_LOD_DISTANCES
+from animation_bake import AnimationTexture, bake_clips
+from animation_scheduler import AnimationScheduler, in_frustum
+from model import MAX_BONES
+from spatial_grid import SpatialGrid
+from placement import PlacementLayer, place
+
+CHARACTER_RADIUS = 0.5 # Raio aproximado de um personagem (m), para colisão
+CHARACTER_BOUNDS = (2.0, 2.0) # Esfera que envolve um personagem: (altura do centro, raio) em m
+
+# Validação: Não spawnar na água, em picos ou em encostas muito íngremes
+CHARACTER_LAYER = PlacementLayer("personagens", POPULATION_MIN_SPACING,
+                                 min_height=15, max_height=85, max_slope=30.0)
 
 class Population:
-    def __init__(self, terrain, models, count=80):
+    def __init__(self, terrain, models, assets, count=80):
         """
         terrain: Instância do terreno (para pegar altura)
         models: Lista com os 4 objetos Model carregados (character, abe, jackie, michelle)
+        assets: Registro de assets (assets.AssetRegistry) de onde vem o shader de sombra
         count: Total de personagens a espalhar (padrão 80)
         """
         self.terrain = terrain
         self.models = models
         self.count = count
-        self.instances = [] # Lista de dicionários {'model_idx': 0, 'matrix': mat4}
-        
+        self.instances = [] # Lista de dicionários {'model_idx': 0, 'matrix': mat4, 'animation': (clipe, fase, velocidade)}
+        self.baked = POPULATION_BAKED_ANIMATION
+        self.time = 0.0 # Relógio das animações assadas (u_time)
+
+        # Cada modelo ganha a textura com todos os clipes amostrados (se ainda não foi assado na carga)
+        if self.baked:
+            for model in self.models:
+                if model.animation_texture is None:
+                    model.animation_texture = AnimationTexture(*bake_clips(model, ANIMATION_BAKE_FPS))
+
         self.spawn_crowd()
+        if not self.baked:
+            self.setup_cpu_poses()
+
+        # Índice espacial dos personagens (posição XZ de cada instância, na mesma ordem)
+        self.grid = SpatialGrid(self.positions(), CHARACTER_RADIUS, SPATIAL_GRID_CELL_SIZE)
+
+        # Sombra com ossos e matriz por instância (o shader de sombra genérico é estático);
+        # nos dois modos a pose de cada personagem vem da textura de ossos
+        self.assets = assets
+        self.pass_shaders = {
+            "shadow": assets.shader("shaders/shadow_map.vert", "shaders/shadow_map.frag", defines={"SKINNED": 1}),
+        }
+        self.upload_instances()
 
     def spawn_crowd(self):
         print(f"Populando o mundo com {self.count} personagens...")
-        generated = 0
-        attempts = 0
         spawn_radius = 260 # Um pouco menos que as árvores para ficarem mais no centro
-        
-        while generated < self.count and attempts < self.count * 10:
-            attempts += 1
-            
-            # 1. Posição Aleatória (Circular)
-            angle = random.uniform(0, math.pi * 2)
-            dist = random.uniform(10, spawn_radius) # 10m min para não nascer EM CIMA da camera
-            x = math.cos(angle) * dist
-            z = math.sin(angle) * dist
-            
-            # 2. Altura do Terreno
-            try:
-                y = self.terrain.get_height(x, z)
-            except:
-                continue
-
-            # 3. Validação (Não spawnar na água ou em picos muito íngremes)
-            if y < 15 or y > 85:
-                continue
+
+        # 1-3. Posições Poisson-disk no anel (10m min para não nascer EM CIMA da camera),
+        # com altura e inclinação do terreno checadas em lote
+        xs, ys, zs = place(self.terrain, CHARACTER_LAYER, self.count, spawn_radius,
+                           min_radius=10, seed=PLACEMENT_SEED + 2)
+        rng = np.random.default_rng(PLACEMENT_SEED + 3)
+        model_indices = rng.integers(0, len(self.models), len(xs))
+        rotations = rng.uniform(0, 360, len(xs))
+        # Animação de cada um: clipe sorteado, ponto do ciclo e ritmo levemente diferentes
+        clip_draws = rng.random(len(xs))
+        phases = rng.random(len(xs))
+        speeds = rng.uniform(0.8, 1.2, len(xs))
+        # Só sorteia entre clipes que se mexem (se o modelo tiver algum)
+        playable = [[i for i, anim in enumerate(model.animations) if anim['duration'] > 0] or [0]
+                    for model in self.models]
+
+        for k in range(len(xs)):
+            x, y, z = float(xs[k]), float(ys[k]), float(zs[k])
                 
             # 4. Escolher modelo aleatório (0 a 3)
-            model_idx = random.randint(0, len(self.models) - 1)
+            model_idx = int(model_indices[k])
             
             # 5. Rotação aleatória (para não ficarem todos virados pro mesmo lado)
-            rot_y = random.uniform(0, 360)
+            rot_y = float(rotations[k])
             
             # 6. Criar Matriz de Modelo (Model Matrix)
             # Ordem: Translate -> Rotate -> Scale
@@ -56,18 +89,82 @@ class Population:
             mat = glm.rotate(mat, glm.radians(rot_y), glm.vec3(0, 1, 0))
             mat = glm.scale(mat, glm.vec3(2.0, 2.0, 2.0)) # Escala 2.0 igual usava no main
             
+            clips = playable[model_idx]
             self.instances.append({
                 'model_idx': model_idx,
-                'matrix': mat
+                'matrix': mat,
+                'animation': (clips[int(clip_draws[k] * len(clips))], float(phases[k]), float(speeds[k]))
             })
             
-            generated += 1
-            
-        print(f"Sucesso! {generated} personagens posicionados.")
+        print(f"Sucesso! {len(xs)} personagens posicionados.")
+
+    def setup_cpu_poses(self):
+        """
+        Animação na CPU: cada personagem tem uma linha de paleta na textura de ossos do
+        seu modelo e o agendador decide, a cada frame, quais linhas recalcular.
+        """
+        self.rest_poses = [model.skeleton.save_pose() for model in self.models]
+        counts = [0] * len(self.models)
+        for instance in self.instances:
+            instance['row'] = counts[instance['model_idx']]
+            counts[instance['model_idx']] += 1
+
+        self.pose_rows = [] # Por modelo: (personagens, ossos, 16) com a última pose de cada um
+        for model, count in zip(self.models, counts):
+            bones = max(1, min(len(model.joints), MAX_BONES))
+            rows = np.tile(model.bone_palette()[:bones], (max(count, 1), 1, 1))
+            self.pose_rows.append(rows)
+            model.animation_texture = AnimationTexture(rows, [])
+
+        # Relógio de cada personagem (começa na fase sorteada do clipe)
+        self.clip_times = np.zeros(len(self.instances))
+        for k, instance in enumerate(self.instances):
+            animations = self.models[instance['model_idx']].animations
+            if animations:
+                clip, phase, _ = instance['animation']
+                self.clip_times[k] = phase * animations[clip]['duration']
+        self.scheduler = AnimationScheduler(len(self.instances), ANIMATION_BUDGET_MS, ANIMATION_LOD_DISTANCES)
+        self.dirty = [False] * len(self.models)
+
+    def positions(self):
+        """ (N, 2) com (x, z) de cada personagem. """
+        return np.array([(instance['matrix'][3].x, instance['matrix'][3].z)
+                         for instance in self.instances]).reshape(-1, 2)
+
+    def upload_instances(self):
+        """ Envia as matrizes de cada modelo para o buffer de instâncias dele. """
+        # Centro da esfera de cada personagem (distância e visibilidade do agendador)
+        height, _ = CHARACTER_BOUNDS
+        self.centers = np.array([(instance['matrix'][3].x, instance['matrix'][3].y + height, instance['matrix'][3].z)
+                                 for instance in self.instances]).reshape(-1, 3)
+        for idx, model in enumerate(self.models):
+            chosen = [instance for instance in self.instances if instance['model_idx'] == idx]
+            if self.baked:
+                clips, phases, speeds = zip(*[instance['animation'] for instance in chosen]) if chosen else ((), (), ())
+                animation = model.animation_texture.instance_params(clips, phases, speeds)
+            else:
+                animation = AnimationTexture.row_params([instance['row'] for instance in chosen])
+            if chosen:
+                # np.array(mat4) sai linha a linha: transpõe para as colunas
+                matrices = np.array([instance['matrix'] for instance in chosen], dtype=np.float32)
+                model.set_instances(matrices.transpose(0, 2, 1), animation)
+            else:
+                model.set_instances(np.zeros((0, 16), dtype=np.float32), animation)
+
+    def pass_shader(self, kind, default):
+        """ Variante com ossos e instâncias do shader da passada 'shadow'. """
+        return self.pass_shaders.get(kind, default)
+
+    def release(self):
+        """ Devolve o shader de sombra ao registro de assets. """
+        for shader in self.pass_shaders.values():
+            self.assets.release(shader)
+        self.pass_shaders = {}
 
     def draw(self, shader, view, projection, sun_direction, light_space_matrix):
         """
-        Desenha todos os 80 personagens usando o shader fornecido.
+        Desenha todos os personagens: uma chamada instanciada por malha de cada modelo
+        (o shader precisa ser a variante INSTANCED do animated_model).
         """
         shader.use()
         
@@ -79,30 +176,78 @@ class Population:
         shader.set_uniform_vec3("u_ambient_color", COLOR_AMBIENT)
         shader.set_uniform_mat4("u_light_space_matrix", light_space_matrix)
         shader.set_uniform_int("u_shadow_map", 1) # Slot da textura de sombra
+        shader.set_uniform_float("u_time", self.time)
 
-        # Renderizar cada instância
-        for instance in self.instances:
-            idx = instance['model_idx']
-            model_matrix = instance['matrix']
-            
-            # Enviar matrix individual
-            shader.set_uniform_mat4("model", model_matrix)
-            
-            # Desenhar o modelo correspondente
-            self.models[idx].draw(shader)
-
-    def update_animations(self, delta_time):
-        # Atualiza a animação dos 4 modelos base
-        # (Como são instâncias, todos do mesmo tipo vão se mexer igual/sincronizado, 
-        #  o que é aceitável para performance em Python)
+        # Renderizar todas as instâncias de cada modelo de uma vez; com texturas array
+        # (TEXTURE_ARRAY) a textura é ligada uma vez para todos os modelos
+        bound = {}
         for model in self.models:
-            model.update_animation(delta_time)
+            model.draw_instanced(shader, bound)
+
+    def snap_to_terrain(self, rect):
+        """ Reapoia no chão os personagens dentro do retângulo (x0, z0, x1, z1) do mundo. """
+        x0, z0, x1, z1 = rect
+        inside = [instance for instance in self.instances
+                  if x0 <= instance['matrix'][3].x <= x1 and z0 <= instance['matrix'][3].z <= z1]
+        if not inside:
+            return
+
+        xs = np.array([instance['matrix'][3].x for instance in inside])
+        zs = np.array([instance['matrix'][3].z for instance in inside])
+        for instance, y in zip(inside, self.terrain.get_heights(xs, zs)):
+            instance['matrix'][3, 1] = float(y) # Linha Y da coluna de translação
+        self.upload_instances()
+
+    def update_animations(self, delta_time, camera_pos=None, view_projection=None):
+        """
+        Animação assada: a GPU calcula a pose de cada instância, aqui só avança o relógio.
+        Na CPU: o agendador escolhe quem atualiza (perto/visível todo frame, longe com menos
+        frequência, fora do frustum de projection * view congelado) dentro do orçamento.
+        """
+        self.time += delta_time
+        if self.baked:
+            return
+
+        count = len(self.instances)
+        distances = np.zeros(count)
+        if camera_pos is not None:
+            distances = np.linalg.norm(self.centers - np.array(camera_pos), axis=1)
+        visible = np.ones(count, dtype=bool)
+        if view_projection is not None:
+            visible = in_frustum(view_projection, self.centers, CHARACTER_BOUNDS[1])
+
+        order = self.scheduler.plan(delta_time, distances, visible)
+        self.scheduler.run(order, self.animate_instance)
+        for idx, model in enumerate(self.models):
+            if self.dirty[idx]:
+                model.animation_texture.update_rows(self.pose_rows[idx])
+                self.dirty[idx] = False
+
+    def animate_instance(self, index, elapsed):
+        """ Avança o relógio do personagem 'index' em 'elapsed' segundos e recalcula a linha de paleta dele. """
+        instance = self.instances[index]
+        idx = instance['model_idx']
+        model = self.models[idx]
+        if not model.animations:
+            return
+        clip, _, speed = instance['animation']
+        anim = model.animations[clip]
+        duration = anim['duration']
+        self.clip_times[index] = (self.clip_times[index] + elapsed * speed) % duration if duration > 0 else 0.0
+
+        # O esqueleto do modelo é compartilhado: cada personagem parte da pose de repouso
+        model.skeleton.restore_pose(self.rest_poses[idx])
+        model.apply_clip(anim, self.clip_times[index])
+        model.update_hierarchy()
+        rows = self.pose_rows[idx]
+        rows[instance['row']] = model.bone_palette()[:rows.shape[1]]
+        self.dirty[idx] = True
 
     # --- NOVO MÉTODO: Desenha sombra dos personagens ---
     def draw_shadow(self, shader):
-        # Renderiza a geometria de todos os personagens no mapa de sombra
-        for instance in self.instances:
-            idx = instance['model_idx']
-            model_matrix = instance['matrix']
-            shader.set_uniform_mat4("model", model_matrix)
-            self.models[idx].draw(shader)
\ No newline at end of file
+        # Renderiza a geometria de todos os personagens no mapa de sombra: 'shader' é a
+        # variante SKINNED (pass_shader("shadow")), já ativa e com a lightSpaceMatrix
+        shader.set_uniform_float("u_time", self.time)
+        bound = {}
+        for model in self.models:
+            model.draw_instanced(shader, bound)
\ No newline at end of file
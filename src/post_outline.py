@@ -0,0 +1,97 @@
+from OpenGL.GL import *
+
+import settings
+
+
+class ScreenOutline:
+    """
+    Contorno em pós-processamento: a cena é desenhada num framebuffer fora da
+    tela (cor + normal + profundidade) e uma passada de tela cheia acha as bordas.
+    O custo depende da resolução, não de quantos triângulos a cena tem.
+    """
+
+    def __init__(self, width, height, assets, near=0.1, far=1000.0):
+        self.assets = assets # Registro de assets (assets.AssetRegistry) de onde vem o shader da borda
+        self.width = width
+        self.height = height
+        self.near = near
+        self.far = far
+        self.previous_fbo = 0
+
+        self.fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+
+        # Cor (0) e normal do mundo (1); a profundidade vira textura para a passada de borda
+        self.color_texture = self._texture(GL_RGBA8, GL_RGBA, GL_UNSIGNED_BYTE)
+        self.normal_texture = self._texture(GL_RGBA8, GL_RGBA, GL_UNSIGNED_BYTE)
+        self.depth_texture = self._texture(GL_DEPTH_COMPONENT24, GL_DEPTH_COMPONENT, GL_FLOAT)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.color_texture, 0)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT1, GL_TEXTURE_2D, self.normal_texture, 0)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_TEXTURE_2D, self.depth_texture, 0)
+        glDrawBuffers(2, [GL_COLOR_ATTACHMENT0, GL_COLOR_ATTACHMENT1])
+
+        if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError("Erro: Framebuffer do contorno não está completo!")
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+        self.shader = assets.shader("shaders/post_outline.vert", "shaders/post_outline.frag")
+        self.vao = glGenVertexArrays(1) # Vazio: o triângulo de tela cheia vem do gl_VertexID
+
+    def _texture(self, internal_format, data_format, data_type):
+        texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, internal_format, self.width, self.height, 0, data_format, data_type, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        return texture
+
+    def release(self):
+        """ Devolve o shader da borda ao registro de assets. """
+        self.assets.release(self.shader)
+
+    def begin(self, sky_color):
+        """ Passa a desenhar no framebuffer do contorno e limpa cor (céu), normal (nenhuma) e profundidade. """
+        self.previous_fbo = glGetIntegerv(GL_FRAMEBUFFER_BINDING)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.width, self.height)
+        self.with_normals()
+        glClearBufferfv(GL_COLOR, 0, [sky_color[0], sky_color[1], sky_color[2], 1.0])
+        glClearBufferfv(GL_COLOR, 1, [0.0, 0.0, 0.0, 0.0])
+        glClear(GL_DEPTH_BUFFER_BIT)
+
+    def with_normals(self):
+        """ Próximos desenhos gravam cor e normal (shaders com 'out_normal' na location 1). """
+        glDrawBuffers(2, [GL_COLOR_ATTACHMENT0, GL_COLOR_ATTACHMENT1])
+
+    def color_only(self):
+        """ Próximos desenhos só gravam cor (água transparente, shaders sem normal): sem borda própria. """
+        glDrawBuffers(1, [GL_COLOR_ATTACHMENT0])
+
+    def finish(self):
+        """ Passada de bordas: escreve a cena contornada (e a profundidade) no framebuffer anterior. """
+        glBindFramebuffer(GL_FRAMEBUFFER, self.previous_fbo)
+        glViewport(0, 0, self.width, self.height)
+
+        self.shader.use()
+        for unit, (name, texture) in enumerate((("u_color", self.color_texture),
+                                                ("u_normal", self.normal_texture),
+                                                ("u_depth", self.depth_texture))):
+            glActiveTexture(GL_TEXTURE0 + unit)
+            glBindTexture(GL_TEXTURE_2D, texture)
+            self.shader.set_uniform_int(name, unit)
+        self.shader.set_uniform_float("u_near", self.near)
+        self.shader.set_uniform_float("u_far", self.far)
+        self.shader.set_uniform_float("u_thickness", settings.OUTLINE_SCREEN_THICKNESS)
+        self.shader.set_uniform_float("u_depth_threshold", settings.OUTLINE_DEPTH_THRESHOLD)
+        self.shader.set_uniform_float("u_normal_threshold", settings.OUTLINE_NORMAL_THRESHOLD)
+        self.shader.set_uniform_vec3("u_outline_color", (0.1, 0.1, 0.15)) # Mesma cor do contorno por casco
+
+        # A profundidade da cena é copiada junto (gl_FragDepth), então o teste passa sempre
+        glDepthFunc(GL_ALWAYS)
+        glBindVertexArray(self.vao)
+        glDrawArrays(GL_TRIANGLES, 0, 3)
+        glBindVertexArray(0)
+        glDepthFunc(GL_LESS)
+        glActiveTexture(GL_TEXTURE0)
@@ -21,6 +21,75 @@ CAMERA_SENSITIVITY = 0.1
 # Configurações do Terreno
 TERRAIN_SIZE = 300.0 # O PDF pede >= 300m (Regra 1.a)
 
+# Heightmap do terreno: .jpg/.png de 8 bits (256 degraus), .png de 16 bits,
+# .npy ou .r32 (float32 em metros, sem degraus). Os geradores gravam aqui por padrão.
+TERRAIN_HEIGHTMAP = "assets/textures/heightmap.jpg"
+
+# Cache de bake (malhas pré-geradas em disco, relativo à raiz do projeto)
+BAKE_CACHE_DIR = "cache"
+TERRAIN_CACHE_ENABLED = True # False força regerar o terreno a cada execução
+MODEL_CACHE_ENABLED = True   # False força ler os .glb (e decodificar as texturas) a cada execução
+
+# Carga em paralelo (loader.py): threads e processos (trabalho em Python puro, como ler os
+# .glb e assar os clipes) para leitura/decodificação/geração, e tempo por frame para os
+# envios à GPU na thread principal (ao menos um envio por frame). 0 processos = só threads.
+LOADER_WORKERS = 4
+LOADER_PROCESSES = 4
+LOADER_UPLOAD_BUDGET_MS = 8.0
+
+# Renderização do terreno: "full" (grade inteira), "lod" (quadtree CDLOD),
+# "tiled" (heightmap em tiles mapeado do disco, carregado em volta da câmera)
+# "pull" (textura de alturas + patch instanciado, posição montada no shader)
+# ou "adaptive" (triangulação RTIN: áreas planas viram poucos triângulos grandes)
+TERRAIN_RENDER_MODE = "lod"
+TERRAIN_LOD_CHUNK = 32          # Quads por lado de cada nó da quadtree (par)
+TERRAIN_LOD_BASE_RANGE = 25.0   # Alcance do nível mais detalhado (m); dobra a cada nível
+TERRAIN_LOD_MORPH_START = 0.66  # Fração do intervalo do nível onde começa o morph
+
+TERRAIN_PULL_PATCH = 64         # Quads por lado do patch instanciado (modo "pull")
+TERRAIN_RTIN_MAX_ERROR = 0.1    # Erro vertical máximo (m) da malha adaptativa (modo "adaptive")
+
+# Streaming de terreno em tiles (modo "tiled")
+TERRAIN_TILES_PATH = "assets/textures/heightmap.tiles" # Gerado do heightmap se não existir ou estiver desatualizado
+TERRAIN_TILE_SIZE = 256             # Amostras por lado de cada tile
+TERRAIN_STREAM_RADIUS = 300.0       # Raio (m) em volta da câmera com tiles carregados
+TERRAIN_STREAM_TILES_PER_FRAME = 2  # Quantos tiles novos sobem para a GPU por frame
+TERRAIN_STREAM_VRAM_MB = 256        # Orçamento de VRAM para malhas de tiles (LRU)
+TERRAIN_STREAM_RAM_MB = 64          # Orçamento de RAM para tiles decodificados (LRU)
+
+# Edição do terreno em tempo de execução (teclas R/F/G/H: subir/descer/nivelar/suavizar)
+TERRAIN_BRUSH_RADIUS = 12.0     # Raio do pincel (m)
+TERRAIN_BRUSH_STRENGTH = 6.0    # m/s para subir/descer; fração/s para nivelar/suavizar
+TERRAIN_BRUSH_DISTANCE = 25.0   # Distância do pincel à frente da câmera (m)
+
+# Nível de detalhe da vegetação: malha completa até a 1ª distância, malha reduzida
+# até a 2ª e depois impostor (quad com imagem do atlas)
+VEGETATION_LOD_DISTANCES = (60.0, 150.0)   # Metros
+VEGETATION_LOD_HYSTERESIS = 8.0            # Margem (m) para trocar de nível (evita piscar na fronteira)
+VEGETATION_IMPOSTOR_SIZE = 256             # Pixels por lado de cada célula do atlas de impostores
+
+# Índice espacial (grade uniforme em XZ) das árvores e personagens para colisão/vizinhança
+SPATIAL_GRID_CELL_SIZE = 8.0               # Lado da célula (m); ~ o dobro do maior raio consultado
+
+# Posicionamento de árvores e personagens (Poisson-disk: distância mínima entre vizinhos)
+PLACEMENT_SEED = 1                         # Mesma semente = mesmo mundo
+VEGETATION_MIN_SPACING = 5.0               # Metros entre árvores
+POPULATION_MIN_SPACING = 3.0               # Metros entre personagens
+
+# Animação dos personagens assada numa textura de ossos: cada instância toca o seu
+# clipe com fase e velocidade próprias na GPU (False = paleta única por modelo na CPU)
+POPULATION_BAKED_ANIMATION = True
+ANIMATION_BAKE_FPS = 30                    # Amostras por segundo de cada clipe
+
+# Animação na CPU (POPULATION_BAKED_ANIMATION = False): cada personagem tem a própria pose,
+# recalculada todo frame até a 1ª distância e a cada 2, 4, 8 frames nas faixas seguintes
+ANIMATION_BUDGET_MS = 2.0                  # Tempo de CPU por frame para atualizar esqueletos
+ANIMATION_LOD_DISTANCES = (25.0, 60.0, 120.0)   # Metros
+
+# Texturas dos personagens como camadas de texturas array (uma por tamanho de imagem):
+# a multidão inteira desenha com a textura ligada uma vez (False = uma textura por malha)
+CHARACTER_TEXTURE_ARRAYS = True
+
 # Cores Pastel (Refinadas)
 COLOR_DAY     = glm.vec3(0.53, 0.81, 0.92) # Sky Blue mais vivo (menos cinza)
 COLOR_SUNSET  = glm.vec3(0.96, 0.70, 0.65) # Salmão suave
@@ -33,3 +102,10 @@ COLOR_AMBIENT = glm.vec3(0.60, 0.60, 0.70) # Ambiente azulado e forte (sombras c
 # Configuraçõs de Sombra
 SHADOW_MAP_WIDTH = 2048
 SHADOW_MAP_HEIGHT = 2048
+
+# Contorno "toon": "screen" (bordas detectadas numa passada de tela cheia, custo fixo
+# por pixel) ou "hull" (redesenha terreno e vegetação expandidos pela normal)
+OUTLINE_MODE = "screen"
+OUTLINE_SCREEN_THICKNESS = 1.5    # Pixels
+OUTLINE_DEPTH_THRESHOLD = 0.05    # Desvio relativo da profundidade que vira borda
+OUTLINE_NORMAL_THRESHOLD = 0.6    # 1 - cos(ângulo) entre normais vizinhas que vira borda
@@ -1,9 +1,20 @@
 from OpenGL.GL import *
 import ctypes
 import glm
+import numpy as np
+
+def _inject_defines(source, defines):
+    """ Insere '#define NOME valor' logo depois da linha #version (variantes do mesmo shader). """
+    if not defines:
+        return source
+    lines = source.split('\n')
+    insert_at = 1 if lines and lines[0].strip().startswith('#version') else 0
+    define_lines = [f"#define {name} {value}" for name, value in defines.items()]
+    return '\n'.join(lines[:insert_at] + define_lines + lines[insert_at:])
+
 
 class Shader:
-    def __init__ (self, vertex_path, fragment_path):
+    def __init__ (self, vertex_path, fragment_path, defines=None):
 
         # Carregar o código fonte dos shaders
         try:
@@ -15,6 +26,10 @@ class Shader:
             print("Erro: Arquivo de shader não encontrado. {e}")
             raise
 
+        # Variantes (ex.: {"SHADOW_PASS": 1}) valem para os dois estágios
+        vertex_source = _inject_defines(vertex_source, defines)
+        fragment_source = _inject_defines(fragment_source, defines)
+
         # Compilar os Shaders
         vertex_shader = self._compile_shader(vertex_source, GL_VERTEX_SHADER)
         fragment_shader = self._compile_shader(fragment_source, GL_FRAGMENT_SHADER)
@@ -74,28 +89,26 @@ class Shader:
         glUniformMatrix4fv(location, 1, GL_FALSE, glm.value_ptr(matrix))
 
     def set_uniform_mat4_array(self, name, matrices):
-        # Verifica se a lista não está vazia
-        if not matrices or len(matrices) == 0:
+        """
+        Define um array de mat4. 'matrices' pode ser uma lista de glm.mat4 ou um
+        array float32 (N, 16)/(N, 4, 4) já coluna a coluna (layout do OpenGL).
+        """
+        if matrices is None or len(matrices) == 0:
+            return
+
+        location = self.get_uniform_location(name)
+        if location == -1:
             return
 
-        # Localiza a variável no shader
-        location = glGetUniformLocation(self.program_id, name)
-        
-        if location != -1:
-            # Prepara os dados para o OpenGL
-            # 1. Converte cada matriz GLM para uma lista plana de floats
-            # 2. Junta tudo num único array numpy gigante
-            import numpy as np # Garanta que numpy está importado no topo
-            
-            # Empilha todas as matrizes e achata para 1D
-            flat_data = np.array([np.array(m) for m in matrices], dtype=np.float32).flatten()
-            
-            # Envia para a GPU
-            # location: onde escrever
-            # len(matrices): quantas matrizes são (count)
-            # GL_FALSE: não transpor (GLM já está correto)
-            # flat_data: os dados em si
-            glUniformMatrix4fv(location, len(matrices), GL_FALSE, flat_data)
+        if isinstance(matrices, np.ndarray):
+            flat_data = np.ascontiguousarray(matrices, dtype=np.float32).reshape(-1)
+        else:
+            # Uma conversão só para a lista inteira; np.array(mat4) sai linha a
+            # linha, então transpõe para as colunas que o OpenGL espera
+            flat_data = np.ascontiguousarray(np.array(matrices, dtype=np.float32).transpose(0, 2, 1)).reshape(-1)
+
+        # GL_FALSE: não transpor (os dados já estão coluna a coluna)
+        glUniformMatrix4fv(location, len(flat_data) // 16, GL_FALSE, flat_data)
 
     def set_uniform_vec3(self, name, vector):
         """Define um uniform do tipo vec3 (vetor 3D)."""
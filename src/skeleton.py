@@ -0,0 +1,106 @@
+import numpy as np
+
+# Hierarquia de nós do glTF em arrays. Os nós são reordenados por profundidade
+# (raízes, depois os filhos delas, ...): cada nível ocupa uma faixa contínua e todo
+# pai vem antes dos filhos. As matrizes locais saem do TRS de todos os nós de uma vez
+# e as globais são propagadas nível a nível com um produto de matrizes em lote.
+# Matrizes em numpy "linha a linha" (M @ v), como no glTF depois de transpor.
+
+# Matriz de rotação de um quaternion (x, y, z, w) = identidade + combinação linear
+# dos produtos q_i * q_j: linha r = termos (i, j, peso) da entrada r da 3x3
+QUAT_TERMS = (((1, 1, -2), (2, 2, -2)), ((0, 1, 2), (3, 2, -2)), ((0, 2, 2), (3, 1, 2)),
+              ((0, 1, 2), (3, 2, 2)), ((0, 0, -2), (2, 2, -2)), ((1, 2, 2), (3, 0, -2)),
+              ((0, 2, 2), (3, 1, -2)), ((1, 2, 2), (3, 0, 2)), ((0, 0, -2), (1, 1, -2)))
+QUAT_TO_ROTATION = np.zeros((16, 9))
+for entry, terms in enumerate(QUAT_TERMS):
+    for i, j, weight in terms:
+        QUAT_TO_ROTATION[i * 4 + j, entry] = weight
+IDENTITY_3 = np.eye(3).reshape(9)
+
+
+class Skeleton:
+    def __init__(self, parents, translations=None, rotations=None, scales=None, joints=(), inverse_binds=None):
+        """
+        parents[i] = pai do nó i do glTF (-1 = raiz). TRS por nó (rotação em (x, y, z, w));
+        'joints' são os nós da skin e 'inverse_binds' (J, 4, 4) as inversas do bind deles.
+        """
+        parents = np.asarray(parents, dtype=np.int64).reshape(-1)
+        count = len(parents)
+
+        # Profundidade de cada nó (no máximo 'altura da árvore' passadas)
+        depth = np.zeros(count, dtype=np.int64)
+        for _ in range(count):
+            new_depth = np.where(parents >= 0, depth[np.maximum(parents, 0)] + 1, 0)
+            if np.array_equal(new_depth, depth):
+                break
+            depth = new_depth
+
+        # order[k] = nó do glTF na posição k; remap[nó do glTF] = posição
+        self.order = np.argsort(depth, kind='stable')
+        self.remap = np.empty(count, dtype=np.int64)
+        self.remap[self.order] = np.arange(count)
+        self.parents = np.where(parents[self.order] >= 0, self.remap[np.maximum(parents[self.order], 0)], -1)
+        bounds = np.searchsorted(depth[self.order], np.arange(int(depth.max(initial=0)) + 2))
+        self.levels = [slice(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        self.roots = self.levels[0] if self.levels else slice(0, 0)
+        self.steps = [(level, self.parents[level]) for level in self.levels[1:]] # (faixa, pais)
+
+        def per_node(values, width, default):
+            if values is None:
+                return np.tile(np.array(default, dtype=np.float64), (count, 1))
+            return np.asarray(values, dtype=np.float64).reshape(count, width)[self.order].copy()
+
+        self.translations = per_node(translations, 3, (0.0, 0.0, 0.0))
+        self.rotations = per_node(rotations, 4, (0.0, 0.0, 0.0, 1.0))
+        self.scales = per_node(scales, 3, (1.0, 1.0, 1.0))
+        self.locals = np.tile(np.eye(4), (count, 1, 1))
+        self.globals = np.tile(np.eye(4), (count, 1, 1))
+
+        self.joints = self.remap[np.asarray(joints, dtype=np.int64)]
+        if inverse_binds is None:
+            inverse_binds = np.tile(np.eye(4), (len(self.joints), 1, 1))
+        self.inverse_binds = np.asarray(inverse_binds, dtype=np.float64).reshape(-1, 4, 4)
+
+    def __len__(self):
+        return len(self.parents)
+
+    def apply_clip(self, packed, current_time):
+        """ Pose do clipe (animation.PackedClip) no instante 'current_time' nos nós que ele anima. """
+        values = packed.sample(current_time)
+        for path, rows, nodes in packed.groups:
+            index = self.remap[nodes]
+            if path == 'translation':
+                self.translations[index] = values[rows, :3]
+            elif path == 'rotation':
+                self.rotations[index] = values[rows]
+            elif path == 'scale':
+                self.scales[index] = values[rows, :3]
+
+    def save_pose(self):
+        return self.translations.copy(), self.rotations.copy(), self.scales.copy()
+
+    def restore_pose(self, pose):
+        self.translations[:], self.rotations[:], self.scales[:] = pose
+
+    def update(self):
+        """ Recalcula as matrizes locais (T * R * S) e globais de todos os nós. """
+        q = self.rotations
+        products = (q[:, :, None] * q[:, None, :]).reshape(-1, 16)
+        rotation = products @ QUAT_TO_ROTATION + IDENTITY_3
+        # Escala em cada coluna (T * R * S)
+        self.locals[:, :3, :3] = rotation.reshape(-1, 3, 3) * self.scales[:, None, :]
+        self.locals[:, :3, 3] = self.translations
+
+        # Raízes: global = local; cada nível seguinte usa as globais (já prontas) dos pais
+        self.globals[self.roots] = self.locals[self.roots]
+        for level, parents in self.steps:
+            np.matmul(self.globals[parents], self.locals[level], out=self.globals[level])
+
+    def skinning_matrices(self, max_bones):
+        """ (max_bones, 16) float32 coluna a coluna: global * inversa do bind de cada junta (resto = identidade). """
+        palette = np.tile(np.eye(4, dtype=np.float32).reshape(16), (max_bones, 1))
+        count = min(len(self.joints), max_bones)
+        if count:
+            bones = self.globals[self.joints[:count]] @ self.inverse_binds[:count]
+            palette[:count] = bones.transpose(0, 2, 1).reshape(-1, 16)
+        return palette
@@ -0,0 +1,143 @@
+import numpy as np
+
+# Índice espacial de grade uniforme no plano XZ (árvores, personagens, ...).
+# Os itens ficam ordenados por célula num único array (formato CSR): a célula c
+# tem os itens order[cell_start[c]:cell_start[c + 1]]. Uma consulta só olha as
+# células que o círculo toca, então o custo não depende do total de itens.
+
+
+class SpatialGrid:
+    def __init__(self, positions, radii=None, cell_size=8.0):
+        """
+        positions: (N, 2) com (x, z) de cada item; radii: raio de cada item
+        (escalar ou (N,)), usado nas consultas que contam o tamanho do item.
+        """
+        self.cell_size = float(cell_size)
+        self.build(positions, radii)
+
+    def build(self, positions, radii=None):
+        """ (Re)constrói o índice inteiro de uma vez (para itens que se movem, chame a cada passo). """
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        count = len(self.positions)
+        if radii is None:
+            radii = 0.0
+        self.radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), (count,)).copy()
+        self.max_radius = float(self.radii.max()) if count else 0.0
+
+        if count == 0:
+            self.origin = np.zeros(2, dtype=np.int64)
+            self.shape = np.zeros(2, dtype=np.int64)
+            self.order = np.zeros(0, dtype=np.int64)
+            self.cell_start = np.zeros(1, dtype=np.int64)
+            return
+
+        cells = np.floor(self.positions / self.cell_size).astype(np.int64)
+        self.origin = cells.min(axis=0)
+        self.shape = cells.max(axis=0) - self.origin + 1   # células em (x, z)
+        keys = self._keys(cells)
+
+        self.order = np.argsort(keys, kind='stable')
+        counts = np.bincount(keys, minlength=int(self.shape[0] * self.shape[1]))
+        self.cell_start = np.concatenate(([0], np.cumsum(counts)))
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _keys(self, cells):
+        local = cells - self.origin
+        return local[..., 1] * self.shape[0] + local[..., 0]
+
+    def _cell_range(self, x, z, reach):
+        """ Faixa de células (já recortada na grade) que cobre o quadrado de lado 2*reach. """
+        low = np.floor((np.array([x, z]) - reach) / self.cell_size).astype(np.int64) - self.origin
+        high = np.floor((np.array([x, z]) + reach) / self.cell_size).astype(np.int64) - self.origin
+        return np.maximum(low, 0), np.minimum(high, self.shape - 1)
+
+    def _candidates(self, x, z, reach):
+        """ Índices dos itens nas células que o círculo de raio 'reach' toca. """
+        if len(self.positions) == 0:
+            return self.order
+        low, high = self._cell_range(x, z, reach)
+        if (low > high).any():
+            return self.order[:0]
+        # Uma fatia contínua do CSR por linha de células
+        parts = []
+        for row in range(low[1], high[1] + 1):
+            first = row * self.shape[0]
+            parts.append(self.order[self.cell_start[first + low[0]]:self.cell_start[first + high[0] + 1]])
+        return np.concatenate(parts)
+
+    def query_radius(self, x, z, radius, include_item_radius=False):
+        """
+        Índices dos itens a até 'radius' de (x, z). Com include_item_radius o
+        item conta se o círculo dele encostar no círculo da consulta.
+        """
+        reach = radius + (self.max_radius if include_item_radius else 0.0)
+        candidates = self._candidates(x, z, reach)
+        offset = self.positions[candidates] - (x, z)
+        limit = radius + self.radii[candidates] if include_item_radius else radius
+        return candidates[(offset * offset).sum(axis=1) <= limit * limit]
+
+    def nearest(self, x, z, k=1, max_radius=np.inf):
+        """ Até k índices mais próximos de (x, z) (do mais perto ao mais longe), dentro de max_radius. """
+        if len(self.positions) == 0:
+            return self.order[:0]
+        # Com esse raio a busca já cobre a grade inteira (canto mais distante)
+        low = self.origin * self.cell_size
+        high = (self.origin + self.shape) * self.cell_size
+        farthest = np.hypot(max(x - low[0], high[0] - x), max(z - low[1], high[1] - z))
+        reach = self.cell_size
+        while True:
+            search = min(reach, max_radius)
+            candidates = self._candidates(x, z, search)
+            offset = self.positions[candidates] - (x, z)
+            distance = np.sqrt((offset * offset).sum(axis=1))
+            inside = distance <= search
+            candidates, distance = candidates[inside], distance[inside]
+            # Com k achados dentro do raio buscado, ninguém de fora pode estar mais perto
+            if len(candidates) >= k or search >= max_radius or search >= farthest:
+                closest = np.argsort(distance, kind='stable')[:k]
+                return candidates[closest]
+            reach *= 2.0
+
+    def query_radius_batch(self, xs, zs, radius):
+        """
+        Consulta de raio para vários pontos de uma vez. Devolve (offsets, indices)
+        em CSR: os vizinhos do ponto i são indices[offsets[i]:offsets[i + 1]],
+        em ordem crescente de índice.
+        """
+        points = np.stack([np.asarray(xs, dtype=np.float64), np.asarray(zs, dtype=np.float64)], axis=1).reshape(-1, 2)
+        if len(self.positions) == 0 or len(points) == 0:
+            return np.zeros(len(points) + 1, dtype=np.int64), self.order[:0]
+
+        # A mesma janela de células (relativa) serve para todos os pontos
+        span = int(np.ceil(radius / self.cell_size))
+        cells = np.floor(points / self.cell_size).astype(np.int64) - self.origin
+        query_ids, item_ids = [], []
+        for dz in range(-span, span + 1):
+            for dx in range(-span, span + 1):
+                cx, cz = cells[:, 0] + dx, cells[:, 1] + dz
+                valid = np.flatnonzero((cx >= 0) & (cx < self.shape[0]) & (cz >= 0) & (cz < self.shape[1]))
+                key = cz[valid] * self.shape[0] + cx[valid]
+                starts = self.cell_start[key]
+                lengths = self.cell_start[key + 1] - starts
+                total = int(lengths.sum())
+                if total == 0:
+                    continue
+                # Expande cada célula na lista dos seus itens, sem laço por ponto
+                owners = np.repeat(valid, lengths)
+                within = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+                query_ids.append(owners)
+                item_ids.append(self.order[np.repeat(starts, lengths) + within])
+
+        if not query_ids:
+            return np.zeros(len(points) + 1, dtype=np.int64), self.order[:0]
+        query_ids = np.concatenate(query_ids)
+        item_ids = np.concatenate(item_ids)
+        offset = self.positions[item_ids] - points[query_ids]
+        keep = (offset * offset).sum(axis=1) <= radius * radius
+        query_ids, item_ids = query_ids[keep], item_ids[keep]
+
+        sort = np.lexsort((item_ids, query_ids))
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(query_ids, minlength=len(points)))))
+        return offsets, item_ids[sort]
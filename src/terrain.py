@@ -1,107 +1,138 @@
 import numpy as np
 from OpenGL.GL import *
-from PIL import Image
 import glm
 import settings
+from terrain_cache import load_terrain_bake, store_terrain_bake
+from heightmap_io import load_heightmap
+from terrain_mesh import build_terrain_mesh, compute_normals, sample_height_grid
+from terrain_lod import TerrainLOD, load_cdlod
+from terrain_tiles import TiledHeightmap, TerrainStreamer, convert_to_tiles, tiles_key, tiles_match
+from terrain_pull import TerrainVertexPull
+from terrain_rtin import build_rtin_mesh
+from terrain_sculpt import apply_brush_heights, build_region_vertices, expand_rect, update_normals_region
+
+# Vertex shader de cada modo de renderização do terreno (o fragment é sempre terrain.frag)
+TERRAIN_VERTEX_SHADERS = {
+    "full": "shaders/terrain.vert",
+    "lod": "shaders/terrain_lod.vert",
+    "tiled": "shaders/terrain.vert",
+    "pull": "shaders/terrain_pull.vert",
+    "adaptive": "shaders/terrain.vert",
+}
+
+
+def terrain_vertex_shader_path(render_mode=None):
+    return TERRAIN_VERTEX_SHADERS[render_mode or settings.TERRAIN_RENDER_MODE]
+
+
+def load_terrain_data(heightmap_path, render_mode=None):
+    """
+    Parte da carga do terreno que não usa OpenGL (pode rodar fora da thread principal):
+    alturas e malhas do modo de renderização, do bake em disco ou geradas na hora.
+    """
+    render_mode = render_mode or settings.TERRAIN_RENDER_MODE
+    if render_mode == "lod":
+        # A quadtree tem seu próprio bake; as alturas ficam para a física
+        heights = load_heightmap(heightmap_path)
+        return {"heights": heights, "cdlod": load_cdlod(heights, heightmap_path, settings.TERRAIN_LOD_CHUNK)}
+
+    if render_mode == "pull":
+        # Só a textura de alturas vai para a GPU
+        return {"heights": load_heightmap(heightmap_path)}
+
+    if render_mode == "tiled":
+        # Nada é carregado inteiro: alturas e malhas vêm dos tiles sob demanda. O arquivo
+        # é refeito se faltar, for de um formato antigo ou de outro heightmap/configuração
+        key = tiles_key(heightmap_path)
+        if not tiles_match(settings.TERRAIN_TILES_PATH, key):
+            print(f"Convertendo {heightmap_path} para tiles (arquivo ausente ou desatualizado)...")
+            convert_to_tiles(load_heightmap(heightmap_path), settings.TERRAIN_TILES_PATH, key=key)
+        return {}
+
+    # "full" e "adaptive" usam o mesmo VBO (pos + normal); só muda a triangulação
+    if render_mode == "adaptive":
+        kind, params = "rtin", {"max_error": float(settings.TERRAIN_RTIN_MAX_ERROR)}
+    else:
+        kind, params = "mesh", None
+
+    # Tentar o bake em disco primeiro (arrays mapeados direto do arquivo)
+    baked = load_terrain_bake(heightmap_path, kind, params)
+    if baked is not None:
+        return {"heights": baked["heights"], "vertices": baked["vertices"], "indices": baked["indices"]}
+
+    # Carregar imagem já como matriz de alturas (float32, em metros)
+    heights = load_heightmap(heightmap_path)
+    if kind == "rtin":
+        print("Gerando terreno adaptativo (RTIN)... aguarde.")
+        vertex_data_np, index_data_np = build_rtin_mesh(heights)
+    else:
+        print("Gerando terreno (vetorizado)... aguarde.")
+        vertex_data_np, index_data_np = build_terrain_mesh(heights)
+    data = {"vertices": vertex_data_np, "indices": index_data_np, "heights": heights}
+    store_terrain_bake(heightmap_path, kind, data, params)
+    return data
+
 
 class Terrain:
-    def __init__(self, shader):
+    def __init__(self, shader, assets, data=None):
         self.shader = shader
+        self.assets = assets # Variantes de shader dos modos "lod" e "pull" (assets.AssetRegistry)
         self.vertex_count = 0
         self.width = 0
         self.depth = 0
-        self.heights = [] # Para física futura
+        self.heights = None # Matriz float32 [Z, X] para física
+        self.render_mode = settings.TERRAIN_RENDER_MODE
+        self.lod = None # TerrainLOD quando render_mode == "lod"
+        self.streamer = None # TerrainStreamer quando render_mode == "tiled"
+        self.pull = None # TerrainVertexPull quando render_mode == "pull"
+        self.terrain_size = settings.TERRAIN_SIZE
+        self.normals = None # Normais [Z, X, 3] na CPU, criadas na primeira edição
+
+        # Estatísticas (triângulos por passada e somados no frame)
+        self.triangles_per_pass = 0
+        self.frame_triangles = 0
         
         # VAO/VBO Handles
         self.vao = glGenVertexArrays(1)
         self.vbo = glGenBuffers(1)
         self.ebo = glGenBuffers(1)
         
-        # Carregar e Gerar
-        self.generate_terrain("assets/textures/heightmap.jpg")
-
-    def generate_terrain(self, heightmap_path):
-        # Carregar imagem
-        try:
-            image = Image.open(heightmap_path).convert('L')
-        except Exception as e:
-            print(f"ERRO: Não encontrei {heightmap_path}. Usando plano chato.")
-            image = Image.new('L', (2, 2), color=0)
-
-        self.width, self.depth = image.size
-        pixels = image.load()
-        
-        self.heights = [[0.0 for _ in range(self.depth)] for _ in range(self.width)]
-        
-        # Listas para armazenar dados ---
-        vertices_pos = [] # Armazena Posições (temporário)
-        normals = []      # Armazena Normais (temporário)
-        indices = []      # Armazena Índices
-        
-        # Array final que será enviado à GPU
-        interleaved_data = [] 
+        # Carregar e Gerar ('data' = load_terrain_data, se já veio pronto de outra thread)
+        self.generate_terrain(settings.TERRAIN_HEIGHTMAP, data)
 
-        start_x = -settings.TERRAIN_SIZE / 2.0
-        start_z = -settings.TERRAIN_SIZE / 2.0
-        step_x = settings.TERRAIN_SIZE / float(self.width - 1)
-        step_z = settings.TERRAIN_SIZE / float(self.depth - 1)
+    def generate_terrain(self, heightmap_path, data=None):
+        if data is None:
+            data = load_terrain_data(heightmap_path, self.render_mode)
 
-        print("Gerando terreno (Posições e Alturas)... aguarde.")
-        
-        # Gerar Posições de Vértices e armazenar alturas
-        for i in range(self.depth):     # Z
-            for j in range(self.width): # X
-                x = start_x + (j * step_x)
-                z = start_z + (i * step_z)
-                y = (pixels[j, i] / 255.0) * settings.MAX_TERRAIN_HEIGHT
-                
-                self.heights[j][i] = y
-                vertices_pos.append(glm.vec3(x, y, z)) # Adiciona Posição
-
-        print("Calculando Normais...")
-        
-        # Helper para pegar altura de forma segura
-        def get_height_safe(j, i):
-            j_safe = max(0, min(j, self.width - 1))
-            i_safe = max(0, min(i, self.depth - 1))
-            return self.heights[j_safe][i_safe]
-
-        for i in range(self.depth):
-            for j in range(self.width):
-                height_l = get_height_safe(j - 1, i)
-                height_r = get_height_safe(j + 1, i)
-                height_t = get_height_safe(j, i - 1)
-                height_b = get_height_safe(j, i + 1)
-                
-                normal = glm.vec3(height_l - height_r, 2.0, height_t - height_b)
-                normals.append(glm.normalize(normal)) # Adiciona Normal
-
-        # Gerar Índices
-        for i in range(self.depth - 1):
-            for j in range(self.width - 1):
-                top_left = (i * self.width) + j
-                top_right = top_left + 1
-                bottom_left = ((i + 1) * self.width) + j
-                bottom_right = bottom_left + 1
-                indices.extend([top_left, bottom_left, top_right])
-                indices.extend([top_right, bottom_left, bottom_right])
-
-        self.indices_count = len(indices)
-
-        # Combinar Posições e Normais no array final
-        # Verifique se os vértices foram realmente gerados
-        if not vertices_pos or not normals:
-             print("ERRO: Vértices ou normais não foram gerados.")
-             return # Impede de continuar com 0 vértices
-
-        for i in range(len(vertices_pos)):
-            interleaved_data.extend([vertices_pos[i].x, vertices_pos[i].y, vertices_pos[i].z])
-            interleaved_data.extend([normals[i].x, normals[i].y, normals[i].z])
-            
-        # Enviar para GPU
-        vertex_data_np = np.array(interleaved_data, dtype=np.float32)
-        index_data_np = np.array(indices, dtype=np.uint32)
+        if self.render_mode == "lod":
+            self.heights = data["heights"]
+            self.depth, self.width = self.heights.shape
+            self.lod = TerrainLOD(self.heights, heightmap_path, self.assets, arrays=data["cdlod"])
+            return
 
+        if self.render_mode == "pull":
+            self.heights = data["heights"]
+            self.depth, self.width = self.heights.shape
+            self.pull = TerrainVertexPull(self.heights, self.assets)
+            return
+
+        if self.render_mode == "tiled":
+            self.heights = TiledHeightmap(settings.TERRAIN_TILES_PATH)
+            self.depth, self.width = self.heights.shape
+            self.terrain_size = self.heights.terrain_size
+            self.streamer = TerrainStreamer(self.heights)
+            print(f"Terreno em tiles: {self.width}x{self.depth} ({self.heights.tiles_x}x{self.heights.tiles_z} tiles)")
+            return
+
+        heights = data["heights"]
+        vertex_data_np = data["vertices"]
+        index_data_np = data["indices"]
+
+        self.depth, self.width = heights.shape
+        self.heights = heights
+        self.indices_count = len(index_data_np)
+
+        # Enviar para GPU
         glBindVertexArray(self.vao)
 
         glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
@@ -122,7 +153,40 @@ class Terrain:
 
         glBindVertexArray(0)
         
-        print(f"Terreno gerado com {len(vertices_pos)} vértices.")
+        print(f"Terreno gerado com {len(vertex_data_np) // 6} vértices e {self.indices_count // 3} triângulos.")
+
+    def update(self, camera_pos):
+        """ Chamado uma vez por frame, antes das passadas: escolhe o LOD e zera as estatísticas. """
+        if self.lod is not None:
+            self.lod.select(camera_pos)
+            self.triangles_per_pass = self.lod.selected_triangles
+        elif self.streamer is not None:
+            self.streamer.update(camera_pos)
+            self.triangles_per_pass = self.streamer.triangles_visible()
+        elif self.pull is not None:
+            self.triangles_per_pass = self.pull.triangles_per_draw()
+        else:
+            self.triangles_per_pass = self.indices_count // 3
+        self.frame_triangles = 0
+
+    def pass_shader(self, kind, default):
+        """
+        Shader que o terreno precisa na passada 'shadow' ou 'outline'.
+        No modo "pull" a posição vem da textura e no "lod" os vértices fazem morph,
+        então o terreno tem suas próprias variantes; nos outros modos vale o shader
+        genérico passado em 'default'.
+        """
+        if self.pull is not None:
+            return self.pull.pass_shaders[kind]
+        if self.lod is not None:
+            return self.lod.pass_shaders[kind]
+        return default
+
+    def release(self):
+        """ Devolve ao registro as variantes de shader dos modos "lod" e "pull" (o shader principal é de quem criou o terreno). """
+        for mode in (self.lod, self.pull):
+            if mode is not None:
+                mode.release()
 
     # Atualizado para suportar shader de sombra (Shadow Mapping)
     def draw(self, camera, projection, sun_direction, override_shader=None):
@@ -140,27 +204,89 @@ class Terrain:
             shader_to_use.set_uniform_vec3("u_sun_direction", sun_direction)
             shader_to_use.set_uniform_vec3("u_sun_color", settings.COLOR_SUN)
             shader_to_use.set_uniform_vec3("u_ambient_color", settings.COLOR_AMBIENT)
+            shader_to_use.set_uniform_vec3("u_camera_pos", camera.pos)
         
         # Desenhar
+        if self.lod is not None:
+            # Todas as passadas fazem o morph (sombra e contorno com as variantes de pass_shader)
+            self.frame_triangles += self.lod.draw(shader_to_use)
+            return
+        if self.streamer is not None:
+            self.frame_triangles += self.streamer.draw()
+            return
+        if self.pull is not None:
+            self.frame_triangles += self.pull.draw(shader_to_use)
+            return
+
         glBindVertexArray(self.vao)
         glDrawElements(GL_TRIANGLES, self.indices_count, GL_UNSIGNED_INT, None)
         glBindVertexArray(0)
+        self.frame_triangles += self.indices_count // 3
 
-    def get_height(self, world_x, world_z):
-        """ Converte coordenadas do mundo em altura do terreno. """
+    # --- Edição em tempo de execução ---
+
+    @property
+    def can_edit(self):
+        # "tiled" é só leitura (arquivo mapeado) e "adaptive" exigiria refazer a triangulação
+        return self.render_mode in ("full", "lod", "pull")
+
+    def apply_brush(self, kind, x, z, radius, strength):
+        """
+        Aplica um pincel (raise/lower/flatten/smooth, ver terrain_sculpt) em (x, z).
+        Só o retângulo do pincel é recalculado e só ele vai para a GPU.
+        Devolve o retângulo do mundo afetado (x0, z0, x1, z1), para reposicionar
+        vegetação e personagens, ou None se nada mudou.
+        """
+        if not self.can_edit:
+            return None
+
+        if not self.heights.flags.writeable:
+            # Alturas vindas do bake (memmap somente-leitura): a primeira edição copia para a RAM
+            self.heights = np.array(self.heights, dtype=np.float32)
+        if self.normals is None and self.pull is None:
+            self.normals = compute_normals(self.heights)
 
-        # Converter coordenada do mundo (ex: -150 a +150) para 0.0-1.0
-        percent_x = (world_x + (settings.TERRAIN_SIZE / 2.0)) / settings.TERRAIN_SIZE
-        percent_z = (world_z + (settings.TERRAIN_SIZE / 2.0)) / settings.TERRAIN_SIZE
+        rect = apply_brush_heights(self.heights, kind, x, z, radius, strength, self.terrain_size)
+        if rect is None:
+            return None
 
-        # Converter 0.0-1.0 para índice do array (ex: 0 a 1023)
-        map_j = int(percent_x * (self.width - 1)) # Coluna
-        map_i = int(percent_z * (self.depth - 1)) # Linha
+        # As normais (e a altura interpolada) dependem de 1 texel de vizinhança
+        changed = expand_rect(rect, self.heights.shape)
+        if self.pull is not None:
+            # Normais saem da textura no shader: basta reenviar as alturas
+            self.pull.upload_region(self.heights, *rect)
+        else:
+            update_normals_region(self.heights, self.normals, changed)
+            if self.lod is not None:
+                self.lod.update_region(self.heights, self.normals, changed)
+            else:
+                self._upload_rows(changed)
 
-        # Verificar limites
-        map_j = max(0, min(self.width - 2, map_j))
-        map_i = max(0, min(self.depth - 2, map_i))
+        i0, i1, j0, j1 = changed
+        start = -self.terrain_size / 2.0
+        step_x = self.terrain_size / float(self.width - 1)
+        step_z = self.terrain_size / float(self.depth - 1)
+        return (start + j0 * step_x, start + i0 * step_z, start + (j1 - 1) * step_x, start + (i1 - 1) * step_z)
 
-        # Retornar altura armazenada
+    def _upload_rows(self, rect):
+        """ Modo "full": um glBufferSubData por linha do retângulo (linhas são contíguas no VBO). """
+        i0, i1, j0, j1 = rect
+        vertices = build_region_vertices(self.heights, self.normals, rect, self.terrain_size)
+        row_bytes = (j1 - j0) * 6 * 4
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        for row, i in enumerate(range(i0, i1)):
+            glBufferSubData(GL_ARRAY_BUFFER, (i * self.width + j0) * 6 * 4, row_bytes, vertices[row])
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def get_heights(self, xs, zs, with_normals=False, with_slopes=False):
+        """
+        Consulta vetorizada: alturas do chão (interpolação bilinear) para arrays de X/Z.
+        Com with_normals/with_slopes devolve a tupla (alturas[, normais][, inclinações em graus]).
+        """
+        # self.heights pode ser a matriz ou o TiledHeightmap (mesma interface de indexação)
+        return sample_height_grid(self.heights, xs, zs, self.terrain_size, with_normals, with_slopes)
+
+    def get_height(self, world_x, world_z):
+        """ Converte coordenadas do mundo em altura do terreno (atalho escalar de get_heights). """
         # (Adicionamos um 'buffer' de 0.2m para evitar que a câmera entre no chão)
-        return self.heights[map_j][map_i] + 0.2
\ No newline at end of file
+        return float(self.get_heights(world_x, world_z)) + 0.2
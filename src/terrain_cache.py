@@ -0,0 +1,90 @@
+import glob
+import hashlib
+import os
+import sys
+
+import settings
+from bake_cache import file_sha256, read_bake, write_bake
+
+# Aumente quando o formato/algoritmo da malha mudar: invalida todos os caches antigos.
+TERRAIN_BAKE_VERSION = 1
+
+
+def terrain_cache_key(heightmap_path, kind, params=None):
+    """
+    Chave do cache: hash do conteúdo do heightmap + configurações que mudam a malha.
+    'kind' separa os tipos de bake (malha completa, LOD, ...) e 'params' permite
+    que cada tipo inclua suas próprias configurações na chave.
+    """
+    parts = [
+        f"v{TERRAIN_BAKE_VERSION}",
+        kind,
+        file_sha256(heightmap_path),
+        repr(float(settings.TERRAIN_SIZE)),
+        repr(float(settings.MAX_TERRAIN_HEIGHT)),
+    ]
+    if params:
+        parts.extend(f"{k}={params[k]!r}" for k in sorted(params))
+    return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()
+
+
+def _cache_path(kind, key):
+    return os.path.join(settings.BAKE_CACHE_DIR, f"terrain_{kind}_{key[:16]}.bake")
+
+
+def load_terrain_bake(heightmap_path, kind, params=None):
+    """ Devolve o dicionário de arrays (memmap) se houver um bake válido, senão None. """
+    if not settings.TERRAIN_CACHE_ENABLED or not os.path.isfile(heightmap_path):
+        return None
+
+    key = terrain_cache_key(heightmap_path, kind, params)
+    path = _cache_path(kind, key)
+    baked = read_bake(path)
+    if baked is None:
+        print(f"Cache de terreno: MISS ({kind}) -> {path}")
+        return None
+
+    arrays, meta = baked
+    if meta.get("key") != key:
+        print(f"Cache de terreno: MISS ({kind}, chave diferente) -> {path}")
+        return None
+
+    print(f"Cache de terreno: HIT ({kind}) <- {path}")
+    return arrays
+
+
+def store_terrain_bake(heightmap_path, kind, arrays, params=None):
+    """ Grava o bake e apaga bakes antigos do mesmo tipo (heightmap/config anteriores). """
+    if not settings.TERRAIN_CACHE_ENABLED or not os.path.isfile(heightmap_path):
+        return
+
+    key = terrain_cache_key(heightmap_path, kind, params)
+    path = _cache_path(kind, key)
+
+    for stale in glob.glob(os.path.join(settings.BAKE_CACHE_DIR, f"terrain_{kind}_*.bake")):
+        if os.path.abspath(stale) != os.path.abspath(path):
+            os.remove(stale)
+
+    try:
+        write_bake(path, arrays, meta={"key": key, "heightmap": heightmap_path, "kind": kind})
+        print(f"Cache de terreno: gravado ({kind}) -> {path}")
+    except OSError as e:
+        print(f"AVISO: não foi possível gravar o cache de terreno: {e}")
+
+
+def invalidate_terrain_cache(kind="*"):
+    """ Remove os bakes de terreno (todos, ou só de um tipo). Devolve quantos foram apagados. """
+    removed = 0
+    for path in glob.glob(os.path.join(settings.BAKE_CACHE_DIR, f"terrain_{kind}_*.bake")):
+        os.remove(path)
+        removed += 1
+    print(f"Cache de terreno: {removed} arquivo(s) removido(s).")
+    return removed
+
+
+if __name__ == "__main__":
+    # python src/terrain_cache.py --limpar   (rodar na raiz do projeto)
+    if "--limpar" in sys.argv:
+        invalidate_terrain_cache()
+    else:
+        print("Uso: python src/terrain_cache.py --limpar")
@@ -0,0 +1,337 @@
+import ctypes
+import math
+
+import numpy as np
+from OpenGL.GL import *
+
+import settings
+from terrain_cache import load_terrain_bake, store_terrain_bake
+from terrain_mesh import compute_normals
+
+# CDLOD (Continuous Distance-Dependent LOD):
+# - O terreno é dividido numa quadtree. Todo nó, em qualquer nível, é uma grade de
+#   CHUNK x CHUNK quads; no nível 0 (folhas) o passo é 1 texel, no nível L é 2^L texels.
+# - Todos os nós compartilham o mesmo EBO (um "patch"), então cada nó é só um
+#   bloco de vértices no VBO e é desenhado com glDrawElementsBaseVertex.
+# - O EBO é ordenado por quadrante, para um nó poder desenhar só 1/4 de si mesmo
+#   quando o filho daquela região não entrou na seleção.
+# - Cada vértice guarda também o seu "alvo de morph": a posição que ele teria na
+#   malha do nível seguinte (vértices ímpares colapsam no vizinho par). O shader
+#   interpola até esse alvo conforme a distância, então na fronteira entre níveis
+#   os vértices coincidem e não há rachaduras. As passadas de sombra e contorno usam
+#   variantes do mesmo vertex shader, com o mesmo morph (e a câmera da seleção).
+
+VERTEX_FLOATS = 9 # pos.xyz + normal.xyz + morph.xyz
+VERTEX_SHADER = "shaders/terrain_lod.vert"
+
+
+def lod_level_count(width, depth, chunk):
+    quads = max(width, depth) - 1
+    levels = 1
+    while chunk * (2 ** (levels - 1)) < quads:
+        levels += 1
+    return levels
+
+
+def build_patch_indices(chunk):
+    """ Índices de um patch CHUNK x CHUNK, agrupados por quadrante (q = qz * 2 + qx). """
+    half = chunk // 2
+    row = chunk + 1
+    quadrants = []
+    for qz in range(2):
+        for qx in range(2):
+            i = np.arange(qz * half, (qz + 1) * half, dtype=np.uint32)[:, None]
+            j = np.arange(qx * half, (qx + 1) * half, dtype=np.uint32)[None, :]
+            top_left = i * row + j
+            quad = np.empty((half, half, 6), dtype=np.uint32)
+            quad[..., 0] = top_left
+            quad[..., 1] = top_left + row
+            quad[..., 2] = top_left + 1
+            quad[..., 3] = top_left + 1
+            quad[..., 4] = top_left + row
+            quad[..., 5] = top_left + row + 1
+            quadrants.append(quad.reshape(-1))
+    return np.concatenate(quadrants)
+
+
+def build_node_vertices(heights, normals, chunk, level, node_xs, node_zs, terrain_size):
+    """
+    Vértices dos nós (node_zs x node_xs) de um nível.
+    Devolve (verts [nz, nx, C+1, C+1, VERTEX_FLOATS], gx, gz) onde gx/gz são as
+    colunas/linhas (texel) de cada vértice de cada nó.
+    """
+    depth, width = heights.shape
+    start = -terrain_size / 2.0
+    step_x = terrain_size / float(width - 1)
+    step_z = terrain_size / float(depth - 1)
+    step = 2 ** level
+
+    local = np.arange(chunk + 1)
+    local_even = local - (local % 2) # vértice ímpar colapsa no vizinho par anterior
+
+    # Coordenadas globais (texel) de cada vértice, presas à borda do mapa
+    gx = np.minimum((node_xs[:, None] * chunk + local[None, :]) * step, width - 1)
+    gz = np.minimum((node_zs[:, None] * chunk + local[None, :]) * step, depth - 1)
+    mx = np.minimum((node_xs[:, None] * chunk + local_even[None, :]) * step, width - 1)
+    mz = np.minimum((node_zs[:, None] * chunk + local_even[None, :]) * step, depth - 1)
+
+    # Broadcast para [nó_z, nó_x, vértice_z, vértice_x]
+    GZ, GX = gz[:, None, :, None], gx[None, :, None, :]
+    MZ, MX = mz[:, None, :, None], mx[None, :, None, :]
+    shape = (len(node_zs), len(node_xs), chunk + 1, chunk + 1)
+
+    verts = np.empty(shape + (VERTEX_FLOATS,), dtype=np.float32)
+    verts[..., 0] = start + GX * step_x
+    verts[..., 1] = heights[GZ, GX]
+    verts[..., 2] = start + GZ * step_z
+    verts[..., 3:6] = normals[GZ, GX]
+    verts[..., 6] = start + MX * step_x
+    verts[..., 7] = heights[MZ, MX]
+    verts[..., 8] = start + MZ * step_z
+    return verts, gx, gz
+
+
+def build_cdlod(heights, chunk, terrain_size):
+    """
+    Gera os vértices de todos os nós de todos os níveis (vetorizado por nível).
+    Devolve (vertices, nodes, bounds, levels):
+      nodes  -> int32 [N, 4]   (nível, nó_x, nó_z, base_vertex)
+      bounds -> float32 [N, 6] (min_x, min_y, min_z, max_x, max_y, max_z)
+      levels -> int32 [L, 3]   (primeiro nó do nível, nós em X, nós em Z)
+    """
+    depth, width = heights.shape
+    level_count = lod_level_count(width, depth, chunk)
+    normals = compute_normals(heights)
+
+    start = -terrain_size / 2.0
+    step_x = terrain_size / float(width - 1)
+    step_z = terrain_size / float(depth - 1)
+    patch_vertices = (chunk + 1) ** 2
+
+    vertex_blocks, node_blocks, bound_blocks, level_info = [], [], [], []
+    node_count = 0
+
+    for level in range(level_count):
+        span = chunk * 2 ** level
+        nodes_x = max(1, math.ceil((width - 1) / span))
+        nodes_z = max(1, math.ceil((depth - 1) / span))
+
+        verts, gx, gz = build_node_vertices(heights, normals, chunk, level,
+                                            np.arange(nodes_x), np.arange(nodes_z), terrain_size)
+        y = verts[..., 1]
+        vertex_blocks.append(verts.reshape(-1, VERTEX_FLOATS))
+
+        # Tabela de nós e caixas envolventes
+        count = nodes_x * nodes_z
+        node_z, node_x = np.divmod(np.arange(count), nodes_x)
+        nodes = np.empty((count, 4), dtype=np.int32)
+        nodes[:, 0] = level
+        nodes[:, 1] = node_x
+        nodes[:, 2] = node_z
+        nodes[:, 3] = (node_count + np.arange(count)) * patch_vertices
+        node_blocks.append(nodes)
+
+        bounds = np.empty((nodes_z, nodes_x, 6), dtype=np.float32)
+        bounds[..., 0] = (start + gx[:, 0] * step_x)[None, :]
+        bounds[..., 1] = y.min(axis=(2, 3))
+        bounds[..., 2] = (start + gz[:, 0] * step_z)[:, None]
+        bounds[..., 3] = (start + gx[:, -1] * step_x)[None, :]
+        bounds[..., 4] = y.max(axis=(2, 3))
+        bounds[..., 5] = (start + gz[:, -1] * step_z)[:, None]
+        bound_blocks.append(bounds.reshape(-1, 6))
+
+        level_info.append((node_count, nodes_x, nodes_z))
+        node_count += count
+
+    return (np.concatenate(vertex_blocks).reshape(-1),
+            np.concatenate(node_blocks),
+            np.concatenate(bound_blocks),
+            np.array(level_info, dtype=np.int32))
+
+
+def load_cdlod(heights, heightmap_path, chunk):
+    """ (vertices, nodes, bounds, levels) do bake em disco, ou gerados com build_cdlod (e gravados). """
+    params = {"chunk": chunk}
+    baked = load_terrain_bake(heightmap_path, "cdlod", params)
+    if baked is not None:
+        return baked["vertices"], baked["nodes"], baked["bounds"], baked["levels"]
+
+    print("Gerando quadtree CDLOD do terreno...")
+    vertices, nodes, bounds, levels = build_cdlod(heights, chunk, settings.TERRAIN_SIZE)
+    store_terrain_bake(heightmap_path, "cdlod", {
+        "vertices": vertices, "nodes": nodes, "bounds": bounds, "levels": levels,
+    }, params)
+    return vertices, nodes, bounds, levels
+
+
+class TerrainLOD:
+    def __init__(self, heights, heightmap_path, assets, chunk=None, arrays=None):
+        """ 'arrays' = resultado de load_cdlod, se já foi carregado (ex.: em outra thread). """
+        self.chunk = chunk or settings.TERRAIN_LOD_CHUNK
+        if self.chunk % 2:
+            raise ValueError("TERRAIN_LOD_CHUNK precisa ser par (quadrantes do patch).")
+
+        if arrays is None:
+            arrays = load_cdlod(heights, heightmap_path, self.chunk)
+        vertices, nodes, bounds, levels = arrays
+
+        # Tabelas pequenas ficam na RAM (consultadas todo frame na seleção)
+        self.nodes = np.array(nodes)
+        self.bounds = np.array(bounds)
+        self.levels = np.array(levels)
+        self.level_count = len(self.levels)
+
+        # Distâncias de cada nível: nível L cobre até base * 2^L metros
+        base = settings.TERRAIN_LOD_BASE_RANGE
+        self.ranges = [base * (2 ** level) for level in range(self.level_count)]
+        self.morph_ranges = []
+        for level, end in enumerate(self.ranges):
+            previous = self.ranges[level - 1] if level > 0 else 0.0
+            self.morph_ranges.append((previous + (end - previous) * settings.TERRAIN_LOD_MORPH_START, end))
+
+        indices = build_patch_indices(self.chunk)
+        self.quadrant_index_count = len(indices) // 4
+        self.selection = []
+        self.selected_triangles = 0
+        self.camera_pos = np.zeros(3, dtype=np.float32) # Câmera da última seleção (centro do morph em todas as passadas)
+
+        self.vao = glGenVertexArrays(1)
+        self.vbo = glGenBuffers(1)
+        self.ebo = glGenBuffers(1)
+
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+
+        stride = VERTEX_FLOATS * 4
+        # Atributo 0: Posição, 1: Normal, 3: Alvo do morph
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(3 * 4))
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(3, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(6 * 4))
+        glEnableVertexAttribArray(3)
+        glBindVertexArray(0)
+
+        # Variantes do mesmo vertex shader (com morph) para as passadas de sombra e contorno (do registro de assets)
+        self.assets = assets
+        self.pass_shaders = {
+            "shadow": assets.shader(VERTEX_SHADER, "shaders/shadow_map.frag", defines={"SHADOW_PASS": 1}),
+            "outline": assets.shader(VERTEX_SHADER, "shaders/outline.frag", defines={"OUTLINE_PASS": 1}),
+        }
+
+        print(f"CDLOD: {len(self.nodes)} nós em {self.level_count} níveis "
+              f"({len(vertices) // VERTEX_FLOATS} vértices).")
+
+    # --- Edição (pincéis de terrain_sculpt) ---
+
+    def release(self):
+        """ Devolve as variantes de shader ao registro de assets. """
+        for shader in self.pass_shaders.values():
+            self.assets.release(shader)
+        self.pass_shaders = {}
+
+    def update_region(self, heights, normals, rect):
+        """
+        Refaz só os nós (de todos os níveis) que leem algum texel do retângulo
+        (i0, i1, j0, j1) e reenvia cada bloco com glBufferSubData.
+        """
+        i0, i1, j0, j1 = rect
+        block_bytes = (self.chunk + 1) ** 2 * VERTEX_FLOATS * 4
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        for level in range(self.level_count):
+            first, nodes_x, nodes_z = (int(v) for v in self.levels[level])
+            span = self.chunk * 2 ** level
+            # O texel k é lido pelo nó k // span e, na fronteira, também pelo anterior
+            node_xs = np.arange(max(0, (j0 - 1) // span), min(nodes_x, (j1 - 1) // span + 1))
+            node_zs = np.arange(max(0, (i0 - 1) // span), min(nodes_z, (i1 - 1) // span + 1))
+            if len(node_xs) == 0 or len(node_zs) == 0:
+                continue
+
+            verts, _, _ = build_node_vertices(heights, normals, self.chunk, level,
+                                              node_xs, node_zs, settings.TERRAIN_SIZE)
+            for a, node_z in enumerate(node_zs):
+                for b, node_x in enumerate(node_xs):
+                    node_id = first + int(node_z) * nodes_x + int(node_x)
+                    block = verts[a, b]
+                    glBufferSubData(GL_ARRAY_BUFFER, int(self.nodes[node_id, 3]) * VERTEX_FLOATS * 4,
+                                    block_bytes, block)
+                    self.bounds[node_id, 1] = block[..., 1].min()
+                    self.bounds[node_id, 4] = block[..., 1].max()
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    # --- Seleção (CPU, uma vez por frame) ---
+
+    def _node_id(self, level, node_x, node_z):
+        first, nodes_x, nodes_z = self.levels[level]
+        if node_x >= nodes_x or node_z >= nodes_z:
+            return -1
+        return int(first + node_z * nodes_x + node_x)
+
+    def _in_range(self, node_id, camera_pos, radius):
+        """ Esfera (câmera, raio) x caixa do nó. """
+        b = self.bounds[node_id]
+        dx = max(b[0] - camera_pos[0], 0.0, camera_pos[0] - b[3])
+        dy = max(b[1] - camera_pos[1], 0.0, camera_pos[1] - b[4])
+        dz = max(b[2] - camera_pos[2], 0.0, camera_pos[2] - b[5])
+        return dx * dx + dy * dy + dz * dz <= radius * radius
+
+    def _select_node(self, level, node_x, node_z, camera_pos):
+        node_id = self._node_id(level, node_x, node_z)
+        if node_id < 0:
+            return True # Fora do mapa: nada a desenhar
+
+        if not self._in_range(node_id, camera_pos, self.ranges[level]):
+            return False # O pai desenha esta região
+
+        if level == 0 or not self._in_range(node_id, camera_pos, self.ranges[level - 1]):
+            self.selection.append((level, node_id, -1))
+            return True
+
+        for quadrant in range(4):
+            child_x = node_x * 2 + (quadrant % 2)
+            child_z = node_z * 2 + (quadrant // 2)
+            if not self._select_node(level - 1, child_x, child_z, camera_pos):
+                self.selection.append((level, node_id, quadrant))
+        return True
+
+    def select(self, camera_pos):
+        """ Escolhe os nós (ou quadrantes de nós) a desenhar a partir da posição da câmera. """
+        self.selection = []
+        pos = (float(camera_pos[0]), float(camera_pos[1]), float(camera_pos[2]))
+        self.camera_pos = np.array(pos, dtype=np.float32)
+        root = self.level_count - 1
+        first, nodes_x, nodes_z = self.levels[root]
+        for node_z in range(nodes_z):
+            for node_x in range(nodes_x):
+                if not self._select_node(root, node_x, node_z, pos):
+                    self.selection.append((root, self._node_id(root, node_x, node_z), -1))
+
+        # Agrupar por nível para trocar o uniform de morph poucas vezes
+        self.selection.sort()
+        quadrant_triangles = self.quadrant_index_count // 3
+        self.selected_triangles = sum(quadrant_triangles * (4 if q < 0 else 1) for _, _, q in self.selection)
+
+    # --- Desenho ---
+
+    def draw(self, shader):
+        """ Desenha a seleção atual (com qualquer variante do terrain_lod.vert). Devolve quantos triângulos foram enviados. """
+        shader.set_uniform_vec3("u_camera_pos", self.camera_pos)
+        glBindVertexArray(self.vao)
+        current_level = -1
+        for level, node_id, quadrant in self.selection:
+            if level != current_level:
+                current_level = level
+                shader.set_uniform_float("u_morph_start", self.morph_ranges[level][0])
+                shader.set_uniform_float("u_morph_end", self.morph_ranges[level][1])
+
+            base_vertex = int(self.nodes[node_id, 3])
+            if quadrant < 0:
+                count, offset = self.quadrant_index_count * 4, 0
+            else:
+                count, offset = self.quadrant_index_count, self.quadrant_index_count * quadrant * 4
+            glDrawElementsBaseVertex(GL_TRIANGLES, count, GL_UNSIGNED_INT, ctypes.c_void_p(offset), base_vertex)
+        glBindVertexArray(0)
+        return self.selected_triangles
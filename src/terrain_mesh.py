@@ -0,0 +1,113 @@
+import numpy as np
+import settings
+
+# Funções puras (só NumPy) para montar a malha do terreno.
+# Ficam fora de terrain.py para poderem ser usadas sem contexto OpenGL
+# (benchmarks, bakes, LOD) e sem import circular. A leitura do heightmap fica em heightmap_io.py.
+
+
+def compute_normals(heights, out=None):
+    """
+    Normais por diferença central em toda a grade de uma vez.
+    Mesma fórmula do laço antigo: normalize(h_esq - h_dir, 2.0, h_cima - h_baixo),
+    repetindo a borda (equivalente ao antigo get_height_safe).
+    """
+    padded = np.pad(heights, 1, mode='edge')
+    nx = padded[1:-1, :-2] - padded[1:-1, 2:]   # esquerda - direita (eixo X)
+    nz = padded[:-2, 1:-1] - padded[2:, 1:-1]   # cima - baixo (eixo Z)
+    inv_len = 1.0 / np.sqrt(nx * nx + 4.0 + nz * nz)
+
+    if out is None:
+        out = np.empty(heights.shape + (3,), dtype=np.float32)
+    out[..., 0] = nx * inv_len
+    out[..., 1] = 2.0 * inv_len
+    out[..., 2] = nz * inv_len
+    return out
+
+
+def build_grid_indices(width, depth):
+    """ Índices da grade (2 triângulos por quad), na mesma ordem do laço original. """
+    rows = np.arange(depth - 1, dtype=np.uint32)[:, None] * np.uint32(width)
+    cols = np.arange(width - 1, dtype=np.uint32)[None, :]
+
+    indices = np.empty((depth - 1, width - 1, 6), dtype=np.uint32)
+    top_left = rows + cols
+    indices[..., 0] = top_left                # top_left
+    indices[..., 1] = top_left + width        # bottom_left
+    indices[..., 2] = top_left + 1            # top_right
+    indices[..., 3] = top_left + 1            # top_right
+    indices[..., 4] = top_left + width        # bottom_left
+    indices[..., 5] = top_left + width + 1    # bottom_right
+    return indices.reshape(-1)
+
+
+def build_terrain_mesh(heights, terrain_size=None):
+    """
+    Monta o VBO intercalado (pos.xyz + normal.xyz) e o EBO da grade inteira
+    com operações de array, escrevendo direto num único buffer pré-alocado.
+    """
+    if terrain_size is None:
+        terrain_size = settings.TERRAIN_SIZE
+    depth, width = heights.shape
+
+    start = -terrain_size / 2.0
+    step_x = terrain_size / float(width - 1)
+    step_z = terrain_size / float(depth - 1)
+
+    vertices = np.empty((depth, width, 6), dtype=np.float32)
+    vertices[..., 0] = (start + np.arange(width) * step_x)[None, :]
+    vertices[..., 1] = heights
+    vertices[..., 2] = (start + np.arange(depth) * step_z)[:, None]
+    compute_normals(heights, out=vertices[..., 3:6])
+
+    return vertices.reshape(-1), build_grid_indices(width, depth)
+
+
+def sample_height_grid(heights, xs, zs, terrain_size=None, with_normals=False, with_slopes=False):
+    """
+    Consulta em lote: alturas interpoladas (bilinear) em posições do mundo.
+    xs/zs podem ser escalares ou arrays NumPy de qualquer formato.
+    Devolve 'heights' ou, se pedido, a tupla (heights[, normals][, slopes]):
+      normals -> [..., 3] normal da superfície bilinear
+      slopes  -> inclinação em graus (0 = plano)
+    """
+    if terrain_size is None:
+        terrain_size = settings.TERRAIN_SIZE
+    depth, width = heights.shape
+
+    xs = np.asarray(xs, dtype=np.float64)
+    zs = np.asarray(zs, dtype=np.float64)
+    step_x = terrain_size / float(width - 1)
+    step_z = terrain_size / float(depth - 1)
+
+    # Mundo -> coordenada contínua da grade (presa às bordas do mapa)
+    u = np.clip((xs + terrain_size / 2.0) / step_x, 0.0, width - 1)
+    v = np.clip((zs + terrain_size / 2.0) / step_z, 0.0, depth - 1)
+    j0 = np.minimum(u.astype(np.intp), width - 2)
+    i0 = np.minimum(v.astype(np.intp), depth - 2)
+    fx = u - j0
+    fz = v - i0
+
+    h00 = heights[i0, j0]
+    h01 = heights[i0, j0 + 1]
+    h10 = heights[i0 + 1, j0]
+    h11 = heights[i0 + 1, j0 + 1]
+
+    top = h00 + (h01 - h00) * fx
+    bottom = h10 + (h11 - h10) * fx
+    result_heights = top + (bottom - top) * fz
+
+    if not (with_normals or with_slopes):
+        return result_heights
+
+    # Derivadas da superfície bilinear (em metros por metro)
+    dh_dx = ((h01 - h00) * (1.0 - fz) + (h11 - h10) * fz) / step_x
+    dh_dz = (bottom - top) / step_z
+
+    result = [result_heights]
+    if with_normals:
+        inv_len = 1.0 / np.sqrt(dh_dx * dh_dx + 1.0 + dh_dz * dh_dz)
+        result.append(np.stack((-dh_dx * inv_len, inv_len, -dh_dz * inv_len), axis=-1))
+    if with_slopes:
+        result.append(np.degrees(np.arctan(np.sqrt(dh_dx * dh_dx + dh_dz * dh_dz))))
+    return tuple(result)
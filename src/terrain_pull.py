@@ -0,0 +1,97 @@
+import math
+
+import numpy as np
+from OpenGL.GL import *
+
+import settings
+from terrain_mesh import build_grid_indices
+
+# Unidade de textura da textura de alturas (0 = personagens, 1 = mapa de sombra)
+HEIGHT_MAP_UNIT = 2
+VERTEX_SHADER = "shaders/terrain_pull.vert"
+
+
+class TerrainVertexPull:
+    """
+    Terreno desenhado a partir de uma textura de alturas.
+    Na GPU ficam só a textura (4 bytes por texel) e o EBO de um patch pequeno;
+    posição e normal são reconstruídas no vertex shader. Editar o terreno vira
+    um glTexSubImage2D da região alterada.
+    """
+
+    def __init__(self, heights, assets, terrain_size=None):
+        self.terrain_size = terrain_size or settings.TERRAIN_SIZE
+        self.depth, self.width = heights.shape
+        self.patch_quads = settings.TERRAIN_PULL_PATCH
+        self.patches_x = math.ceil((self.width - 1) / self.patch_quads)
+        self.patches_z = math.ceil((self.depth - 1) / self.patch_quads)
+        self.instance_count = self.patches_x * self.patches_z
+
+        # Textura de alturas (float, sem filtro: o shader usa texelFetch)
+        self.height_texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.height_texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_R32F, self.width, self.depth, 0, GL_RED, GL_FLOAT,
+                     np.ascontiguousarray(heights, dtype=np.float32))
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+        # VAO sem atributos: só o EBO do patch (gl_VertexID vira a coordenada local)
+        indices = build_grid_indices(self.patch_quads + 1, self.patch_quads + 1)
+        self.index_count = len(indices)
+        self.vao = glGenVertexArrays(1)
+        self.ebo = glGenBuffers(1)
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindVertexArray(0)
+
+        # Variantes do mesmo vertex shader para as passadas de sombra e contorno (do registro de assets)
+        self.assets = assets
+        self.pass_shaders = {
+            "shadow": assets.shader(VERTEX_SHADER, "shaders/shadow_map.frag", defines={"SHADOW_PASS": 1}),
+            "outline": assets.shader(VERTEX_SHADER, "shaders/outline.frag", defines={"OUTLINE_PASS": 1}),
+        }
+
+        gpu_bytes = self.width * self.depth * 4 + indices.nbytes
+        mesh_bytes = self.width * self.depth * 24 + (self.width - 1) * (self.depth - 1) * 6 * 4
+        print(f"Terreno (vertex pulling): {gpu_bytes / 1e6:.1f} MB na GPU "
+              f"(a malha completa ocuparia {mesh_bytes / 1e6:.1f} MB), {self.instance_count} patches.")
+
+    def release(self):
+        """ Devolve as variantes de shader ao registro de assets. """
+        for shader in self.pass_shaders.values():
+            self.assets.release(shader)
+        self.pass_shaders = {}
+
+    def upload_region(self, heights, i0, i1, j0, j1):
+        """ Reenvia só as linhas [i0, i1) e colunas [j0, j1) da textura de alturas. """
+        region = np.ascontiguousarray(heights[i0:i1, j0:j1], dtype=np.float32)
+        glBindTexture(GL_TEXTURE_2D, self.height_texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, j0, i0, j1 - j0, i1 - i0, GL_RED, GL_FLOAT, region)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def draw(self, shader):
+        """ Uma chamada instanciada para o mapa inteiro. Devolve os triângulos enviados. """
+        shader.set_uniform_int("u_height_map", HEIGHT_MAP_UNIT)
+        shader.set_uniform_int("u_patch_quads", self.patch_quads)
+        shader.set_uniform_int("u_patches_x", self.patches_x)
+        glUniform2i(shader.get_uniform_location("u_grid_size"), self.width, self.depth)
+        glUniform2f(shader.get_uniform_location("u_terrain_origin"), -self.terrain_size / 2.0, -self.terrain_size / 2.0)
+        glUniform2f(shader.get_uniform_location("u_grid_step"),
+                    self.terrain_size / float(self.width - 1), self.terrain_size / float(self.depth - 1))
+
+        glActiveTexture(GL_TEXTURE0 + HEIGHT_MAP_UNIT)
+        glBindTexture(GL_TEXTURE_2D, self.height_texture)
+        glBindVertexArray(self.vao)
+        glDrawElementsInstanced(GL_TRIANGLES, self.index_count, GL_UNSIGNED_INT, None, self.instance_count)
+        glBindVertexArray(0)
+        glActiveTexture(GL_TEXTURE0)
+        return self.triangles_per_draw()
+
+    def triangles_per_draw(self):
+        return self.instance_count * self.index_count // 3
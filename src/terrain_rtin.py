@@ -0,0 +1,149 @@
+import time
+
+import numpy as np
+
+import settings
+from terrain_mesh import compute_normals, sample_height_grid
+
+# RTIN (Right-Triangulated Irregular Network), no estilo da biblioteca "Martini":
+# - A grade precisa ter 2^k + 1 amostras por lado (o heightmap é reamostrado).
+# - Cada triângulo retângulo (a, b, c) com hipotenusa a-b se divide no ponto médio m
+#   da hipotenusa em (c, a, m) e (b, c, m).
+# - errors[m] guarda o maior erro vertical do vértice m e de toda a sua descendência,
+#   então decidir "dividir ou não" é só comparar errors[m] com o erro máximo, e a
+#   malha resultante não tem rachaduras.
+# Aqui o laço triângulo a triângulo do Martini vira operações por nível da árvore:
+# todos os triângulos de um nível são independentes entre si.
+
+
+def rtin_grid_size(width, depth):
+    size = 2
+    while size + 1 < max(width, depth):
+        size *= 2
+    return size + 1
+
+
+def resample_for_rtin(heights, terrain_size=None):
+    """ Reamostra (bilinear) o heightmap para uma grade (2^k + 1)² cobrindo o mesmo terreno. """
+    terrain_size = terrain_size or settings.TERRAIN_SIZE
+    depth, width = heights.shape
+    size = rtin_grid_size(width, depth)
+    if size == width == depth:
+        return np.asarray(heights, dtype=np.float32)
+
+    coords = np.linspace(-terrain_size / 2.0, terrain_size / 2.0, size)
+    return sample_height_grid(heights, coords[None, :], coords[:, None], terrain_size).astype(np.float32)
+
+
+def _children(a, b, c, size):
+    """ Filhos de cada triângulo (índices planos y * size + x). """
+    m = _midpoint(a, b, size)
+    return np.concatenate((c, b)), np.concatenate((a, c)), np.concatenate((m, m))
+
+
+def _midpoint(p, q, size):
+    py, px = np.divmod(p, size)
+    qy, qx = np.divmod(q, size)
+    return ((py + qy) >> 1) * size + ((px + qx) >> 1)
+
+
+def compute_rtin_errors(grid):
+    """ Erro acumulado por vértice (mesmo resultado do passo de erros do Martini). """
+    size = grid.shape[0]
+    tile = size - 1
+    heights = grid.reshape(-1)
+    errors = np.zeros(size * size, dtype=np.float32)
+
+    # Gerar os níveis da raiz até o penúltimo (triângulos com catetos de 1 texel não têm
+    # ponto médio inteiro e não precisam de erro)
+    a = np.array([0, tile * size + tile], dtype=np.int64)
+    b = np.array([tile * size + tile, 0], dtype=np.int64)
+    c = np.array([tile, tile * size], dtype=np.int64)
+    levels = []
+    while True:
+        cy, cx = np.divmod(c[:1], size)
+        ay, ax = np.divmod(a[:1], size)
+        if abs(int(ax[0] - cx[0])) + abs(int(ay[0] - cy[0])) <= 1:
+            break
+        levels.append((a, b, c))
+        a, b, c = _children(a, b, c, size)
+
+    # Do nível mais fino para a raiz
+    for depth_index in range(len(levels) - 1, -1, -1):
+        a, b, c = levels[depth_index]
+        m = _midpoint(a, b, size)
+        middle_error = np.abs((heights[a] + heights[b]) * 0.5 - heights[m])
+        if depth_index < len(levels) - 1:
+            # Herdar o erro dos filhos (pontos médios de c-a e b-c)
+            child_error = np.maximum(errors[_midpoint(c, a, size)], errors[_midpoint(b, c, size)])
+            middle_error = np.maximum(middle_error, child_error)
+        np.maximum.at(errors, m, middle_error.astype(np.float32))
+    return errors
+
+
+def extract_rtin_mesh(grid, errors, max_error):
+    """ Percorre a árvore de cima para baixo e emite os triângulos com erro <= max_error. """
+    size = grid.shape[0]
+    tile = size - 1
+    a = np.array([0, tile * size + tile], dtype=np.int64)
+    b = np.array([tile * size + tile, 0], dtype=np.int64)
+    c = np.array([tile, tile * size], dtype=np.int64)
+
+    emitted = []
+    while len(a):
+        ay, ax = np.divmod(a, size)
+        cy, cx = np.divmod(c, size)
+        can_split = (np.abs(ax - cx) + np.abs(ay - cy)) > 1
+        split = can_split.copy()
+        split[can_split] = errors[_midpoint(a[can_split], b[can_split], size)] > max_error
+
+        keep = ~split
+        emitted.append(np.stack((a[keep], b[keep], c[keep]), axis=1))
+        a, b, c = _children(a[split], b[split], c[split], size)
+
+    triangles = np.concatenate(emitted)
+
+    # Mesmo sentido de giro da grade regular (tl, bl, tr)
+    ty, tx = np.divmod(triangles, size)
+    cross = (tx[:, 1] - tx[:, 0]) * (ty[:, 2] - ty[:, 0]) - (ty[:, 1] - ty[:, 0]) * (tx[:, 2] - tx[:, 0])
+    flip = cross > 0
+    triangles[flip, 1], triangles[flip, 2] = triangles[flip, 2], triangles[flip, 1].copy()
+    return triangles
+
+
+def build_rtin_mesh(heights, max_error=None, terrain_size=None):
+    """
+    Malha adaptativa com erro vertical máximo 'max_error' (metros).
+    Devolve (vertices intercalados pos+normal, índices uint32) no mesmo formato
+    de build_terrain_mesh, e imprime a contagem antes/depois.
+    """
+    max_error = settings.TERRAIN_RTIN_MAX_ERROR if max_error is None else max_error
+    terrain_size = terrain_size or settings.TERRAIN_SIZE
+    t0 = time.perf_counter()
+
+    grid = resample_for_rtin(heights, terrain_size)
+    size = grid.shape[0]
+    errors = compute_rtin_errors(grid)
+    triangles = extract_rtin_mesh(grid, errors, max_error)
+
+    # Só os vértices usados, renumerados
+    used, remap = np.unique(triangles, return_inverse=True)
+    indices = remap.reshape(-1).astype(np.uint32)
+
+    rows, cols = np.divmod(used, size)
+    step = terrain_size / float(size - 1)
+    normals = compute_normals(grid).reshape(-1, 3)
+
+    vertices = np.empty((len(used), 6), dtype=np.float32)
+    vertices[:, 0] = -terrain_size / 2.0 + cols * step
+    vertices[:, 1] = grid.reshape(-1)[used]
+    vertices[:, 2] = -terrain_size / 2.0 + rows * step
+    vertices[:, 3:6] = normals[used]
+
+    depth, width = heights.shape
+    full_vertices = width * depth
+    full_triangles = 2 * (width - 1) * (depth - 1)
+    print(f"RTIN (erro máx. {max_error} m): {full_vertices} -> {len(used)} vértices, "
+          f"{full_triangles} -> {len(triangles)} triângulos "
+          f"({full_triangles / max(len(triangles), 1):.1f}x menos) em {time.perf_counter() - t0:.2f} s")
+    return vertices.reshape(-1), indices
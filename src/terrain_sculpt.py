@@ -0,0 +1,99 @@
+import numpy as np
+
+import settings
+from terrain_mesh import compute_normals, sample_height_grid
+
+# Pincéis de edição do terreno (só NumPy, sem OpenGL).
+# Tudo trabalha no retângulo de texels coberto pelo pincel, nunca no mapa inteiro:
+# o custo depende do raio do pincel, não do tamanho do heightmap.
+
+BRUSH_KINDS = ("raise", "lower", "flatten", "smooth")
+
+
+def brush_rect(shape, x, z, radius, terrain_size=None):
+    """ Retângulo de texels (i0, i1, j0, j1) coberto por um pincel em (x, z) no mundo. """
+    terrain_size = terrain_size or settings.TERRAIN_SIZE
+    depth, width = shape
+    step_x = terrain_size / float(width - 1)
+    step_z = terrain_size / float(depth - 1)
+    start = -terrain_size / 2.0
+
+    j0 = max(0, int(np.floor((x - radius - start) / step_x)))
+    j1 = min(width, int(np.ceil((x + radius - start) / step_x)) + 1)
+    i0 = max(0, int(np.floor((z - radius - start) / step_z)))
+    i1 = min(depth, int(np.ceil((z + radius - start) / step_z)) + 1)
+    return i0, i1, j0, j1
+
+
+def expand_rect(rect, shape, margin=1):
+    """ Aumenta o retângulo (ex.: as normais dependem dos vizinhos de cada texel). """
+    i0, i1, j0, j1 = rect
+    depth, width = shape
+    return max(0, i0 - margin), min(depth, i1 + margin), max(0, j0 - margin), min(width, j1 + margin)
+
+
+def apply_brush_heights(heights, kind, x, z, radius, strength, terrain_size=None):
+    """
+    Aplica o pincel direto na matriz de alturas (in-place).
+      raise/lower   -> sobe/desce até 'strength' metros no centro
+      flatten       -> puxa para a altura do centro (strength = fração 0..1 por aplicação)
+      smooth        -> média 3x3 (strength = fração 0..1 por aplicação)
+    O peso cai suavemente (smoothstep) do centro até a borda do raio.
+    Devolve o retângulo (i0, i1, j0, j1) alterado, ou None se o pincel caiu fora do mapa.
+    """
+    if kind not in BRUSH_KINDS:
+        raise ValueError(f"Pincel desconhecido: {kind} (use {', '.join(BRUSH_KINDS)})")
+    terrain_size = terrain_size or settings.TERRAIN_SIZE
+    depth, width = heights.shape
+    i0, i1, j0, j1 = brush_rect(heights.shape, x, z, radius, terrain_size)
+    if i0 >= i1 or j0 >= j1:
+        return None
+
+    start = -terrain_size / 2.0
+    xs = start + np.arange(j0, j1) * (terrain_size / float(width - 1))
+    zs = start + np.arange(i0, i1) * (terrain_size / float(depth - 1))
+    dist = np.sqrt((xs[None, :] - x) ** 2 + (zs[:, None] - z) ** 2)
+    weight = np.clip(1.0 - dist / radius, 0.0, 1.0)
+    weight = (weight * weight * (3.0 - 2.0 * weight)).astype(np.float32)
+
+    region = heights[i0:i1, j0:j1]
+    if kind == "raise":
+        region += weight * strength
+    elif kind == "lower":
+        region -= weight * strength
+    elif kind == "flatten":
+        target = float(sample_height_grid(heights, x, z, terrain_size))
+        region += (target - region) * np.clip(weight * strength, 0.0, 1.0)
+    else:
+        # Média 3x3 com 1 texel de borda (repetida na beira do mapa)
+        pi0, pi1, pj0, pj1 = expand_rect((i0, i1, j0, j1), heights.shape)
+        padded = np.pad(heights[pi0:pi1, pj0:pj1],
+                        ((1 - (i0 - pi0), 1 - (pi1 - i1)), (1 - (j0 - pj0), 1 - (pj1 - j1))), mode='edge')
+        rows, cols = region.shape
+        blurred = sum(padded[di:di + rows, dj:dj + cols] for di in range(3) for dj in range(3)) / 9.0
+        region += (blurred - region) * np.clip(weight * strength, 0.0, 1.0)
+    return i0, i1, j0, j1
+
+
+def update_normals_region(heights, normals, rect):
+    """ Recalcula normals[rect] (mesma fórmula de compute_normals, lendo 1 texel de borda). """
+    i0, i1, j0, j1 = rect
+    pi0, pi1, pj0, pj1 = expand_rect(rect, heights.shape)
+    # Na beira do mapa o np.pad de compute_normals repete a borda, igual à grade inteira
+    block = compute_normals(heights[pi0:pi1, pj0:pj1])
+    normals[i0:i1, j0:j1] = block[i0 - pi0:i1 - pi0, j0 - pj0:j1 - pj0]
+
+
+def build_region_vertices(heights, normals, rect, terrain_size=None):
+    """ Vértices pos + normal (formato de build_terrain_mesh) das linhas/colunas do retângulo. """
+    terrain_size = terrain_size or settings.TERRAIN_SIZE
+    i0, i1, j0, j1 = rect
+    depth, width = heights.shape
+    start = -terrain_size / 2.0
+
+    vertices = np.empty((i1 - i0, j1 - j0, 6), dtype=np.float32)
+    vertices[..., 0] = (start + np.arange(j0, j1) * (terrain_size / float(width - 1)))[None, :]
+    vertices[..., 1] = heights[i0:i1, j0:j1]
+    vertices[..., 2] = (start + np.arange(i0, i1) * (terrain_size / float(depth - 1)))[:, None]
+    vertices[..., 3:6] = normals[i0:i1, j0:j1]
+    return vertices
@@ -0,0 +1,283 @@
+import argparse
+import ctypes
+import math
+import time
+from collections import OrderedDict
+
+import numpy as np
+from OpenGL.GL import *
+
+import settings
+from bake_cache import allocate_bake, finalize_bake, read_bake
+from heightmap_io import load_heightmap
+from terrain_cache import terrain_cache_key
+from terrain_mesh import build_grid_indices, compute_normals
+
+# Heightmap em tiles (arquivo .tiles, no formato de bake_cache):
+#   array "tiles" [tiles_z, tiles_x, T, T] com as alturas já em metros (float16 ou float32).
+# Cada tile é contíguo no arquivo, então ler/subir um tile toca só as páginas dele.
+# O arquivo é aberto com memmap: a RAM usada é só a das páginas acessadas.
+# O meta guarda a chave (tiles_key) do heightmap e das configurações de origem, para
+# o terreno saber quando o arquivo ficou velho e precisa ser convertido de novo.
+
+
+def tiles_key(heightmap_path, tile_size=None, dtype=np.float16, terrain_size=None):
+    """ Chave do .tiles: hash do heightmap + configurações (como terrain_cache.terrain_cache_key). """
+    return terrain_cache_key(heightmap_path, "tiles", {
+        "tile_size": int(tile_size or settings.TERRAIN_TILE_SIZE),
+        "dtype": np.dtype(dtype).str,
+        "terrain_size": float(terrain_size or settings.TERRAIN_SIZE),
+    })
+
+
+def tiles_match(path, key):
+    """ True se 'path' é um .tiles legível (formato atual) gerado com a chave 'key'. """
+    baked = read_bake(path)
+    return baked is not None and baked[1].get("key") == key
+
+
+def convert_to_tiles(heights, path, tile_size=None, dtype=np.float16, terrain_size=None, key=None):
+    """
+    Converte uma matriz de alturas [Z, X] (pode ser um memmap) para o formato em tiles.
+    'key' (tiles_key do heightmap de origem) vai para o meta do arquivo.
+    """
+    tile_size = tile_size or settings.TERRAIN_TILE_SIZE
+    terrain_size = terrain_size or settings.TERRAIN_SIZE
+    depth, width = heights.shape
+    tiles_x = math.ceil(width / tile_size)
+    tiles_z = math.ceil(depth / tile_size)
+
+    arrays = allocate_bake(path, {"tiles": (dtype, (tiles_z, tiles_x, tile_size, tile_size))}, meta={
+        "width": width, "depth": depth, "tile_size": tile_size, "terrain_size": terrain_size, "key": key,
+    })
+    tiles = arrays["tiles"]
+
+    # Uma faixa de tiles por vez: a RAM usada fica em tile_size linhas do mapa
+    for tz in range(tiles_z):
+        rows = np.arange(tz * tile_size, (tz + 1) * tile_size).clip(max=depth - 1)
+        cols = np.arange(tiles_x * tile_size).clip(max=width - 1) # borda repetida
+        band = np.asarray(heights[rows][:, cols], dtype=np.float32)
+        tiles[tz] = band.reshape(tile_size, tiles_x, tile_size).transpose(1, 0, 2)
+    tiles.flush()
+    del tiles, arrays # Fecha o memmap antes de renomear (no Windows o arquivo aberto não pode ser substituído)
+    finalize_bake(path)
+    print(f"Heightmap em tiles gravado: {path} ({width}x{depth}, {tiles_x}x{tiles_z} tiles de {tile_size}²)")
+
+
+class TiledHeightmap:
+    """
+    Heightmap em tiles mapeado do disco.
+    Se comporta como a matriz de alturas [Z, X] para consultas com índices inteiros
+    (h[i, j] com arrays), então sample_height_grid funciona igual, inclusive
+    nas fronteiras entre tiles.
+    """
+
+    def __init__(self, path):
+        baked = read_bake(path)
+        if baked is None:
+            raise FileNotFoundError(f"Heightmap em tiles inválido ou inexistente: {path}")
+        arrays, meta = baked
+        self.path = path
+        self.tiles = arrays["tiles"]
+        self.width = meta["width"]
+        self.depth = meta["depth"]
+        self.tile_size = meta["tile_size"]
+        self.terrain_size = meta["terrain_size"]
+        self.tiles_z, self.tiles_x = self.tiles.shape[:2]
+
+        # LRU de tiles convertidos para float32 (usados para montar malhas)
+        self.ram_budget = settings.TERRAIN_STREAM_RAM_MB * 1024 * 1024
+        self.cached_tiles = OrderedDict()
+        self.cached_bytes = 0
+
+    @property
+    def shape(self):
+        return (self.depth, self.width)
+
+    def __getitem__(self, index):
+        i, j = index
+        i = np.clip(i, 0, self.depth - 1)
+        j = np.clip(j, 0, self.width - 1)
+        t = self.tile_size
+        return self.tiles[i // t, j // t, i % t, j % t].astype(np.float32)
+
+    def get_tile(self, tx, tz):
+        """ Tile em float32, com LRU limitado por settings.TERRAIN_STREAM_RAM_MB. """
+        key = (tx, tz)
+        tile = self.cached_tiles.get(key)
+        if tile is not None:
+            self.cached_tiles.move_to_end(key)
+            return tile
+
+        tile = np.asarray(self.tiles[tz, tx], dtype=np.float32)
+        self.cached_tiles[key] = tile
+        self.cached_bytes += tile.nbytes
+        while self.cached_bytes > self.ram_budget and len(self.cached_tiles) > 1:
+            _, evicted = self.cached_tiles.popitem(last=False)
+            self.cached_bytes -= evicted.nbytes
+        return tile
+
+    def read_region(self, i0, i1, j0, j1):
+        """ Alturas das linhas [i0, i1) e colunas [j0, j1), montadas a partir dos tiles (borda repetida). """
+        t = self.tile_size
+        rows = np.clip(np.arange(i0, i1), 0, self.depth - 1)
+        cols = np.clip(np.arange(j0, j1), 0, self.width - 1)
+        region = np.empty((len(rows), len(cols)), dtype=np.float32)
+
+        row_tiles = rows // t
+        col_tiles = cols // t
+        for tz in np.unique(row_tiles):
+            row_mask = row_tiles == tz
+            for tx in np.unique(col_tiles):
+                col_mask = col_tiles == tx
+                tile = self.get_tile(int(tx), int(tz))
+                region[np.ix_(row_mask, col_mask)] = tile[np.ix_(rows[row_mask] % t, cols[col_mask] % t)]
+        return region
+
+
+class TerrainStreamer:
+    """
+    Mantém na GPU só as malhas dos tiles perto da câmera.
+    Tiles novos entram sob demanda (poucos por frame) e os que saem do raio
+    são descartados em ordem LRU quando a VRAM passa do orçamento.
+    """
+
+    def __init__(self, heightmap):
+        self.heightmap = heightmap
+        self.tile_size = heightmap.tile_size
+        self.step_x = heightmap.terrain_size / float(heightmap.width - 1)
+        self.step_z = heightmap.terrain_size / float(heightmap.depth - 1)
+        self.start = -heightmap.terrain_size / 2.0
+
+        self.vram_budget = settings.TERRAIN_STREAM_VRAM_MB * 1024 * 1024
+        self.resident = OrderedDict() # (tx, tz) -> (vao, vbo, bytes)
+        self.resident_bytes = 0
+        self.visible = []
+
+        # Todos os tiles têm a mesma topologia: (T+1)² vértices, um EBO compartilhado
+        indices = build_grid_indices(self.tile_size + 1, self.tile_size + 1)
+        self.index_count = len(indices)
+        self.ebo = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+        self.loads_last_frame = 0
+        self.evictions_total = 0
+
+    def build_tile_vertices(self, tx, tz):
+        """ VBO intercalado (pos + normal) do tile, com 1 vértice de sobreposição com o vizinho. """
+        t = self.tile_size
+        i0, j0 = tz * t, tx * t
+        # +1 de borda em cada lado para as normais por diferença central
+        region = self.heightmap.read_region(i0 - 1, i0 + t + 2, j0 - 1, j0 + t + 2)
+        heights = region[1:-1, 1:-1]
+
+        rows = np.minimum(np.arange(i0, i0 + t + 1), self.heightmap.depth - 1)
+        cols = np.minimum(np.arange(j0, j0 + t + 1), self.heightmap.width - 1)
+
+        vertices = np.empty((t + 1, t + 1, 6), dtype=np.float32)
+        vertices[..., 0] = (self.start + cols * self.step_x)[None, :]
+        vertices[..., 1] = heights
+        vertices[..., 2] = (self.start + rows * self.step_z)[:, None]
+        vertices[..., 3:6] = compute_normals(region)[1:-1, 1:-1]
+        return vertices.reshape(-1)
+
+    def _upload_tile(self, key):
+        vertices = self.build_tile_vertices(*key)
+        vao = glGenVertexArrays(1)
+        vbo = glGenBuffers(1)
+        glBindVertexArray(vao)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        stride = 6 * 4
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(3 * 4))
+        glEnableVertexAttribArray(1)
+        glBindVertexArray(0)
+        self.resident[key] = (vao, vbo, vertices.nbytes)
+        self.resident_bytes += vertices.nbytes
+
+    def _evict(self, keep):
+        """ Descarta tiles fora do raio (mais antigos primeiro) até caber no orçamento. """
+        for key in list(self.resident.keys()):
+            if self.resident_bytes <= self.vram_budget:
+                break
+            if key in keep:
+                continue
+            vao, vbo, nbytes = self.resident.pop(key)
+            glDeleteVertexArrays(1, [vao])
+            glDeleteBuffers(1, [vbo])
+            self.resident_bytes -= nbytes
+            self.evictions_total += 1
+
+    def update(self, camera_pos):
+        """ Decide os tiles desejados em volta da câmera e sobe alguns por frame. """
+        tile_world_x = self.tile_size * self.step_x
+        tile_world_z = self.tile_size * self.step_z
+        radius = settings.TERRAIN_STREAM_RADIUS
+
+        cx = (camera_pos[0] - self.start) / tile_world_x
+        cz = (camera_pos[2] - self.start) / tile_world_z
+        rx = radius / tile_world_x
+        rz = radius / tile_world_z
+
+        wanted = []
+        for tz in range(max(0, int(cz - rz)), min(self.heightmap.tiles_z, int(cz + rz) + 1)):
+            for tx in range(max(0, int(cx - rx)), min(self.heightmap.tiles_x, int(cx + rx) + 1)):
+                # Distância da câmera até o retângulo do tile (em tiles)
+                dx = max(tx - cx, 0.0, cx - (tx + 1)) * tile_world_x
+                dz = max(tz - cz, 0.0, cz - (tz + 1)) * tile_world_z
+                dist2 = dx * dx + dz * dz
+                if dist2 <= radius * radius:
+                    wanted.append((dist2, (tx, tz)))
+        wanted.sort()
+        wanted_keys = {key for _, key in wanted}
+
+        self.loads_last_frame = 0
+        self.visible = []
+        for _, key in wanted:
+            if key in self.resident:
+                self.resident.move_to_end(key)
+            elif self.loads_last_frame < settings.TERRAIN_STREAM_TILES_PER_FRAME:
+                self._upload_tile(key)
+                self.loads_last_frame += 1
+            else:
+                continue # Fica para os próximos frames (mais perto primeiro)
+            self.visible.append(key)
+
+        self._evict(wanted_keys)
+
+    def draw(self):
+        """ Desenha os tiles residentes dentro do raio. Devolve os triângulos enviados. """
+        for key in self.visible:
+            glBindVertexArray(self.resident[key][0])
+            glDrawElements(GL_TRIANGLES, self.index_count, GL_UNSIGNED_INT, None)
+        glBindVertexArray(0)
+        return self.triangles_visible()
+
+    def triangles_visible(self):
+        return len(self.visible) * self.index_count // 3
+
+
+if __name__ == "__main__":
+    # Exemplo (na raiz do projeto):
+    #   python src/terrain_tiles.py assets/textures/heightmap.png assets/textures/heightmap.tiles --tile 256
+    # (a entrada pode ser qualquer formato de heightmap_io: .jpg, .png de 16 bits, .npy, .r32)
+    parser = argparse.ArgumentParser(description="Converte um heightmap para o formato em tiles (.tiles).")
+    parser.add_argument("entrada")
+    parser.add_argument("saida")
+    parser.add_argument("--tile", type=int, default=settings.TERRAIN_TILE_SIZE)
+    parser.add_argument("--float32", action="store_true", help="Grava float32 (padrão: float16)")
+    parser.add_argument("--tamanho-mundo", type=float, default=settings.TERRAIN_SIZE,
+                        help="Largura do terreno em metros")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    source = load_heightmap(args.entrada)
+    dtype = np.float32 if args.float32 else np.float16
+    convert_to_tiles(source, args.saida, args.tile, dtype, args.tamanho_mundo,
+                     key=tiles_key(args.entrada, args.tile, dtype, args.tamanho_mundo))
+    print(f"Conversão em {time.perf_counter() - t0:.2f} s")
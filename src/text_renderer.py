@@ -3,20 +3,35 @@ import freetype
 from OpenGL.GL import *
 import numpy as np
 
-class TextRenderer:
-    def __init__(self, font_path, size):
-        font_path = os.path.normpath(font_path)
-        print("Carregando fonte:", font_path)
+def rasterize_glyphs(font_path, size):
+    """ Bitmaps dos 128 primeiros caracteres (sem OpenGL): caractere -> (pixels, tamanho, bearing, advance). """
+    font_path = os.path.normpath(font_path)
+    print("Carregando fonte:", font_path)
+
+    if not os.path.isfile(font_path):
+        raise FileNotFoundError(f"Arquivo de fonte não encontrado: {font_path}")
+
+    # Carrega a fonte
+    face = freetype.Face(font_path)
+    face.set_pixel_sizes(0, size)
 
-        if not os.path.isfile(font_path):
-            raise FileNotFoundError(f"Arquivo de fonte não encontrado: {font_path}")
+    glyphs = {}
+    for c in range(128):
+        face.load_char(chr(c))
+        bitmap = face.glyph.bitmap
+        glyphs[chr(c)] = (np.array(bitmap.buffer, dtype=np.uint8), (bitmap.width, bitmap.rows),
+                          (face.glyph.bitmap_left, face.glyph.bitmap_top), face.glyph.advance.x)
+    return glyphs
 
-        # Carrega a fonte
-        self.face = freetype.Face(font_path)
-        self.face.set_pixel_sizes(0, size)
+
+class TextRenderer:
+    def __init__(self, font_path, size, glyphs=None):
+        # 'glyphs' (de rasterize_glyphs) pode vir pronto de outra thread; só as texturas são criadas aqui
+        if glyphs is None:
+            glyphs = rasterize_glyphs(font_path, size)
 
         self.chars = {}
-        self._load_characters()
+        self._load_characters(glyphs)
 
         # Prepara VAO/VBO
         self.vao = glGenVertexArrays(1)
@@ -34,11 +49,8 @@ class TextRenderer:
         glBindBuffer(GL_ARRAY_BUFFER, 0)
         glBindVertexArray(0)
 
-    def _load_characters(self):
-        for c in range(128):  
-            self.face.load_char(chr(c))
-            bitmap = self.face.glyph.bitmap
-
+    def _load_characters(self, glyphs):
+        for char, (pixels, (width, rows), bearing, advance) in glyphs.items():
             tex_id = glGenTextures(1)
             glBindTexture(GL_TEXTURE_2D, tex_id)
             glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
@@ -47,12 +59,12 @@ class TextRenderer:
                 GL_TEXTURE_2D,
                 0,
                 GL_RED,
-                bitmap.width,
-                bitmap.rows,
+                width,
+                rows,
                 0,
                 GL_RED,
                 GL_UNSIGNED_BYTE,
-                bitmap.buffer
+                pixels
             )
 
             glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
@@ -60,11 +72,11 @@ class TextRenderer:
             glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
             glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
 
-            self.chars[chr(c)] = {
+            self.chars[char] = {
                 "texture": tex_id,
-                "size": (bitmap.width, bitmap.rows),
-                "bearing": (self.face.glyph.bitmap_left, self.face.glyph.bitmap_top),
-                "advance": self.face.glyph.advance.x
+                "size": (width, rows),
+                "bearing": bearing,
+                "advance": advance
             }
 
     def render_text(self, shader, text, x, y, scale=1.0, color=(1,1,1)):
@@ -1,87 +1,148 @@
 import glm
-import random
 import math
 import ctypes
 from OpenGL.GL import *
 import numpy as np
-from shader import Shader  # Importação corrigida (sem 'src.')
+import settings
+from spatial_grid import SpatialGrid
+from placement import PlacementLayer, place
+from vegetation_impostor import ImpostorAtlas
+
+# Malhas-modelo da vegetação: cada uma existe uma vez só na GPU e é desenhada
+# com instâncias (uma chamada por modelo e nível de detalhe, não importa quantas árvores existam)
+TEMPLATES = ("trunk", "canopy", "stone")
+INSTANCE_FLOATS = 16 + 3 # matriz model (mat4, coluna a coluna) + tint (vec3)
+WHITE = [1.0, 1.0, 1.0]
+
+# Níveis de detalhe por árvore: 0 = malha completa, 1 = malha reduzida ("<modelo>_low"), 2 = impostor
+LOD_LEVELS = 3
+# Célula do atlas que cada modelo usa como impostor (None = some no nível 2; a copa vem junto no "tree")
+IMPOSTOR_CELLS = {"trunk": "tree", "canopy": None, "stone": "stone"}
+IMPOSTOR_GROUPS = [("tree", ["trunk", "canopy"]), ("stone", ["stone"])]
+
+# Regras de Spawn: Evitar água, picos muito altos e encostas íngremes
+TREE_LAYER = PlacementLayer("arvores", settings.VEGETATION_MIN_SPACING,
+                            min_height=15, max_height=80, max_slope=40.0)
 
 class Vegetation:
-    def __init__(self, terrain, count=150):
+    def __init__(self, terrain, assets, count=150, upload=True):
+        """
+        upload=False gera só a floresta na CPU (pode rodar fora da thread do OpenGL); chame upload() depois.
+        'assets' (assets.AssetRegistry) entrega os shaders no upload.
+        """
+        self.assets = assets
         self.tree_positions = [] # <--- NOVO: Lista de posições (x, z, raio)
+        self.tree_bases = [] # Altura do chão onde cada árvore foi plantada
         self.terrain = terrain
         self.count = count
-        self.vertices = []
-        
-        # Shader dedicado para vegetação
-        self.shader = Shader("shaders/vegetation.vert", "shaders/vegetation.frag")
-        
+        self.vertices = [] # Só os vértices das malhas-modelo
+        self.templates = {} # nome -> (primeiro vértice, nº de vértices)
+        self.instances = {name: [] for name in TEMPLATES} # nome -> [(matriz, tint, árvore)]
+        self.tree_lod = None # Nível de detalhe atual de cada árvore
+        self.lod_counts = np.zeros(LOD_LEVELS, dtype=np.int64) # Árvores em cada nível (HUD)
+        self.sky_color = settings.COLOR_DAY # Cor do fog dos impostores (a malha usa o uniform do shader)
+
+        self.build_templates()
         self.generate_forest()
+        if upload:
+            self.upload()
+
+    def upload(self):
+        """ Shaders, buffers de instâncias e atlas de impostores (thread do OpenGL). """
+        # Shader dedicado para vegetação
+        self.shader = self.assets.shader("shaders/vegetation.vert", "shaders/vegetation.frag")
+        self.impostor_shader = self.assets.shader("shaders/vegetation_impostor.vert", "shaders/vegetation_impostor.frag")
+
+        # Variantes instanciadas dos shaders genéricos de sombra e contorno
+        self.pass_shaders = {
+            "shadow": self.assets.shader("shaders/shadow_map.vert", "shaders/shadow_map.frag", defines={"INSTANCED": 1}),
+            "outline": self.assets.shader("shaders/outline.vert", "shaders/outline.frag", defines={"INSTANCED": 1}),
+        }
+
         self.setup_buffers()
 
-    def generate_forest(self):
-        print(f"Gerando {self.count} arvores low-poly...")
-        generated = 0
-        attempts = 0
-        
-        spawn_radius = 280 
-        
-        while generated < self.count and attempts < self.count * 10:
-            
-            attempts += 1
-            
-            # Posição Aleatória
-            angle = random.uniform(0, math.pi * 2)
-            dist = random.uniform(0, spawn_radius)
-            x = math.cos(angle) * dist
-            z = math.sin(angle) * dist
-            
-            # Pegar altura do terreno nesta posição
-            # Usa o método get_height do seu terrain.py
-            try:
-                y = self.terrain.get_height(x, z)
-            except:
-                y = 0 # Fallback caso dê erro
-            
-            # Regras de Spawn: Evitar água e picos muito altos
-            if y < 15 or y > 80:
-                continue
-                
-            self.add_tree(x, y, z)
-            generated += 1
-
-            # Adicione isso logo após o loop das árvores
-            for _ in range(100):
-    
-                # Desenhe uma "Pedra Low Poly" (Um cone achatado cinza)
-                stone_color = [0.6, 0.6, 0.65] # Cinza azulado
-                self.add_cone(x, y, z, radius=random.uniform(1.0, 2.0), height=random.uniform(0.5, 1.0), color=stone_color)
-
-    def add_tree(self, x, y, z):
+        self.impostors = ImpostorAtlas(settings.VEGETATION_IMPOSTOR_SIZE)
+        self.impostors.bake(self.shader, self.vbo, self.vertices, self.templates, IMPOSTOR_GROUPS)
+
+    def add_template(self, name, build):
+        first = len(self.vertices) // 9
+        build()
+        self.templates[name] = (first, len(self.vertices) // 9 - first)
+
+    def build_templates(self):
+        """ Malhas-modelo na origem e em escala 1: posição, escala e cor vêm de cada instância. """
         # Cores Pastel
         trunk_color = [0.55, 0.45, 0.40] # Marrom acinzentado
         leaf_color  = [0.48, 0.77, 0.63] # Verde menta
-        
-        scale = random.uniform(1.2, 2.5)
-        
+
         # 1. TRONCO (Mais grosso e curto)
-        self.add_cylinder(x, y, z, 0.5 * scale, 2.0 * scale, trunk_color)
-        
+        self.add_template("trunk", lambda: self.add_cylinder(0.0, 0.0, 0.0, 0.5, 2.0, trunk_color))
+
         # 2. COPA (Estilo "Nuvem" - 2 Icosaedros achatados)
-        # Copa Base
-        self.add_cone(x, y + 1.5*scale, z, 2.5*scale, 2.0*scale, leaf_color)
-        # Copa Topo (rotacionada ou deslocada para parecer orgânico)
-        self.add_cone(x, y + 3.0*scale, z, 1.8*scale, 1.5*scale, leaf_color)
-        
+        def canopy():
+            self.add_cone(0.0, 1.5, 0.0, 2.5, 2.0, leaf_color) # Copa Base
+            self.add_cone(0.0, 3.0, 0.0, 1.8, 1.5, leaf_color) # Copa Topo
+        self.add_template("canopy", canopy)
+
+        # 3. PEDRA (cone de raio e altura 1; a cor vem do tint)
+        self.add_template("stone", lambda: self.add_cone(0.0, 0.0, 0.0, 1.0, 1.0, WHITE))
+
+        # Versões reduzidas (nível 1): menos lados, copa num cone só com a mesma silhueta
+        self.add_template("trunk_low", lambda: self.add_cylinder(0.0, 0.0, 0.0, 0.5, 2.0, trunk_color, segments=3))
+        self.add_template("canopy_low", lambda: self.add_cone(0.0, 1.5, 0.0, 2.5, 3.0, leaf_color, segments=4))
+        self.add_template("stone_low", lambda: self.add_cone(0.0, 0.0, 0.0, 1.0, 1.0, WHITE, segments=4))
+
+    def generate_forest(self):
+        print(f"Gerando {self.count} arvores low-poly...")
+        spawn_radius = 280
+
+        # Poisson-disk com alturas/inclinações em lote (mesma semente = mesma floresta)
+        seed = settings.PLACEMENT_SEED
+        xs, ys, zs = place(self.terrain, TREE_LAYER, self.count, spawn_radius, seed=seed)
+        rng = np.random.default_rng(seed + 1)
+        scales = rng.uniform(1.2, 2.5, len(xs))
+        small_stones = rng.random(len(xs)) > 0.7
+
+        stone_color = [0.6, 0.6, 0.65] # Cinza azulado
+        for k in range(len(xs)):
+            x, y, z = float(xs[k]), float(ys[k]), float(zs[k])
+            tree = self.add_tree(x, y, z, float(scales[k]), bool(small_stones[k]))
+
+            # Pedra "Low Poly" na base (um cone achatado cinza). Antes eram 100 cones
+            # concêntricos com raio 1-2 e altura 0.5-1 sorteados; a união deles é
+            # praticamente o cone com os valores máximos, então fica uma instância só.
+            self.add_stone(x, y, z, 2.0, 1.0, stone_color, tree)
+
+    def add_tree(self, x, y, z, scale, small_stone=False):
+        """ Registra as instâncias de uma árvore e devolve o índice dela. """
+        tree = len(self.tree_positions)
+
+        # Tronco e copa usam a mesma matriz (a malha-modelo já tem as alturas relativas)
+        model = glm.translate(glm.mat4(1.0), glm.vec3(x, y, z))
+        model = glm.scale(model, glm.vec3(scale, scale, scale))
+        self.add_instance("trunk", model, WHITE, tree)
+        self.add_instance("canopy", model, WHITE, tree)
+
         # Opcional: Adicionar uma pedra pequena na base
-        if random.random() > 0.7:
-            self.add_cone(x + 1.0, y, z + 0.5, 0.8, 0.6, [0.5, 0.5, 0.6]) # Pedra cinza
+        if small_stone:
+            self.add_stone(x + 1.0, y, z + 0.5, 0.8, 0.6, [0.5, 0.5, 0.6], tree) # Pedra cinza
 
         # Guardar posição para colisão (x, z e raio do tronco aprox 1.0)
         self.tree_positions.append((x, z, 1.0))
-   
-    def add_cylinder(self, cx, cy, cz, radius, height, color):
-        segments = 6 # Hexagonal (Low Poly)
+        self.tree_bases.append(y)
+        return tree
+
+    def add_stone(self, x, y, z, radius, height, color, tree):
+        model = glm.translate(glm.mat4(1.0), glm.vec3(x, y, z))
+        model = glm.scale(model, glm.vec3(radius, height, radius))
+        self.add_instance("stone", model, color, tree)
+
+    def add_instance(self, template, model, tint, tree):
+        # to_list() devolve as colunas: é o layout que o atributo mat4 espera
+        matrix = [value for column in model.to_list() for value in column]
+        self.instances[template].append((matrix, list(tint), tree))
+
+    def add_cylinder(self, cx, cy, cz, radius, height, color, segments=6): # 6 = Hexagonal (Low Poly)
         angle_step = (math.pi * 2) / segments
         
         for i in range(segments):
@@ -107,8 +168,7 @@ class Vegetation:
             self.vertices.extend([x2, cy, z2] + color + [nx, 0, nz])
             self.vertices.extend([x2, cy+height, z2] + color + [nx, 0, nz])
 
-    def add_cone(self, cx, cy, cz, radius, height, color):
-        segments = 6 
+    def add_cone(self, cx, cy, cz, radius, height, color, segments=6):
         angle_step = (math.pi * 2) / segments
         
         top_point = [cx, cy + height, cz]
@@ -140,48 +200,236 @@ class Vegetation:
 
     def setup_buffers(self):
         self.vertices = np.array(self.vertices, dtype=np.float32)
-        
-        self.vao = glGenVertexArrays(1)
+
+        # Instâncias na ordem de registro (por modelo); a ordem no buffer vem de update_lod
+        records, owners, kinds = [], [], []
+        for index, name in enumerate(TEMPLATES):
+            for matrix, tint, tree in self.instances[name]:
+                records.append(matrix + tint)
+                owners.append(tree)
+                kinds.append(index)
+        self.instance_data = np.array(records, dtype=np.float32).reshape(-1, INSTANCE_FLOATS)
+        self.instance_owner = np.array(owners, dtype=np.int32) # árvore dona de cada instância
+        self.instance_template = np.array(kinds, dtype=np.int32) # índice em TEMPLATES
+        self.tree_bases = np.array(self.tree_bases, dtype=np.float32)
+        self.tree_xz = np.array([(x, z) for x, z, _ in self.tree_positions], dtype=np.float32).reshape(-1, 2)
+
+        # Colisão e vizinhança consultam só as células perto do ponto (não a lista inteira)
+        self.grid = SpatialGrid(self.tree_xz, [r for _, _, r in self.tree_positions], settings.SPATIAL_GRID_CELL_SIZE)
+
         self.vbo = glGenBuffers(1)
-        
-        glBindVertexArray(self.vao)
         glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
         glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, GL_STATIC_DRAW)
-        
-        stride = 9 * 4 
-        
+
+        self.instance_vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.instance_data.nbytes, None, GL_DYNAMIC_DRAW)
+
+        # VAO das malhas: posição, cor e normal (loc 0 a 2)
+        self.mesh_vao = glGenVertexArrays(1)
+        glBindVertexArray(self.mesh_vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        stride = 9 * 4
+
         # Position (loc 0)
         glEnableVertexAttribArray(0)
         glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
-        
+
         # Color (loc 1)
         glEnableVertexAttribArray(1)
         glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(12))
-        
+
         # Normal (loc 2)
         glEnableVertexAttribArray(2)
         glVertexAttribPointer(2, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(24))
+        self.enable_instance_attributes()
+
+        # VAO do impostor: quad (canto x em -0.5..0.5, y em 0..1) com os mesmos atributos de instância
+        quad = np.array([-0.5, 0.0, 0.5, 0.0, 0.5, 1.0, -0.5, 0.0, 0.5, 1.0, -0.5, 1.0], dtype=np.float32)
+        self.quad_vbo = glGenBuffers(1)
+        self.impostor_vao = glGenVertexArrays(1)
+        glBindVertexArray(self.impostor_vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.quad_vbo)
+        glBufferData(GL_ARRAY_BUFFER, quad.nbytes, quad, GL_STATIC_DRAW)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 2 * 4, ctypes.c_void_p(0))
+        self.enable_instance_attributes()
+        glBindVertexArray(0)
+
+        # Sem câmera ainda: tudo no nível completo até o primeiro update_lod
+        self.apply_lod(np.zeros(len(self.tree_positions), dtype=np.int32))
+        self.tree_lod = None
+
+        print(f"Vegetação: {len(self.instance_data)} instâncias de {len(TEMPLATES)} modelos "
+              f"({self.vertices.nbytes / 1024:.0f} KB de malha + {self.instance_data.nbytes / 1024:.0f} KB de instâncias)")
+
+    def enable_instance_attributes(self):
+        """ Matriz da instância (loc 3 a 6, uma coluna por atributo) e tint (loc 7), divisor 1. """
+        for location in range(3, 8):
+            glEnableVertexAttribArray(location)
+            glVertexAttribDivisor(location, 1)
+        self.point_instances(0)
+
+    def point_instances(self, first):
+        """ Aponta os atributos de instância do VAO ativo para o registro 'first' do buffer. """
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        instance_stride = INSTANCE_FLOATS * 4
+        base = first * instance_stride
+        for column in range(4):
+            glVertexAttribPointer(3 + column, 4, GL_FLOAT, GL_FALSE, instance_stride,
+                                  ctypes.c_void_p(base + column * 16))
+        glVertexAttribPointer(7, 3, GL_FLOAT, GL_FALSE, instance_stride, ctypes.c_void_p(base + 64))
+
+    def update_lod(self, camera_pos):
+        """
+        Escolhe o nível de detalhe de cada árvore pela distância à câmera, com
+        histerese (a árvore só troca de nível depois de passar do limite por
+        VEGETATION_LOD_HYSTERESIS metros). Só reordena o buffer quando algo muda.
+        """
+        if len(self.tree_positions) == 0:
+            return
+        dx = self.tree_xz[:, 0] - camera_pos[0]
+        dy = self.tree_bases - camera_pos[1]
+        dz = self.tree_xz[:, 1] - camera_pos[2]
+        distance = np.sqrt(dx * dx + dy * dy + dz * dz)
 
-    def draw(self, view, projection, sun_direction, sun_color, ambient_color):
+        limits = np.asarray(settings.VEGETATION_LOD_DISTANCES, dtype=np.float32)
+        hysteresis = settings.VEGETATION_LOD_HYSTERESIS
+        lod = self.tree_lod
+        if lod is None:
+            lod = np.searchsorted(limits, distance).astype(np.int32)
+        else:
+            # Limite para subir a partir do nível L e para descer a partir dele
+            up = np.append(limits + hysteresis, np.inf)
+            down = np.insert(limits - hysteresis, 0, -np.inf)
+            for _ in range(LOD_LEVELS - 1): # Um salto grande (teleporte) atravessa vários níveis
+                lod = lod + (distance > up[lod]) - (distance < down[lod])
+
+        if not np.array_equal(lod, self.tree_lod):
+            self.apply_lod(lod.astype(np.int32))
+
+    def apply_lod(self, tree_lod):
+        """ Reordena as instâncias por (modelo, nível) e sobe o buffer; cada par vira um trecho contíguo. """
+        self.tree_lod = tree_lod
+        self.lod_counts = np.bincount(tree_lod, minlength=LOD_LEVELS)
+
+        instance_lod = tree_lod[self.instance_owner]
+        self.instance_order = np.lexsort((instance_lod, self.instance_template))
+        counts = np.bincount(self.instance_template * LOD_LEVELS + instance_lod,
+                             minlength=len(TEMPLATES) * LOD_LEVELS)
+        firsts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        self.batches = {} # (modelo, nível) -> (primeira instância, quantidade)
+        for index, name in enumerate(TEMPLATES):
+            for level in range(LOD_LEVELS):
+                slot = index * LOD_LEVELS + level
+                self.batches[(name, level)] = (int(firsts[slot]), int(counts[slot]))
+        self.upload_instances()
+
+    def upload_instances(self):
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, self.instance_data.nbytes, self.instance_data[self.instance_order])
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def pass_shader(self, kind, default):
+        """ Variante instanciada do shader da passada 'shadow' ou 'outline'. """
+        return self.pass_shaders.get(kind, default)
+
+    def release(self):
+        """ Devolve os shaders da floresta ao registro de assets. """
+        for shader in [self.shader, self.impostor_shader] + list(self.pass_shaders.values()):
+            self.assets.release(shader)
+        self.pass_shaders = {}
+
+    def draw_instances(self):
+        """
+        Malhas dos níveis 0 e 1 (uma chamada instanciada por modelo e nível) com o
+        shader já ativo. Os impostores ficam de fora: é o que sombra e contorno usam.
+        """
+        glBindVertexArray(self.mesh_vao)
+        for name in TEMPLATES:
+            for level, mesh in ((0, name), (1, name + "_low")):
+                first, count = self.batches[(name, level)]
+                if count == 0:
+                    continue
+                first_vertex, vertex_count = self.templates[mesh]
+                self.point_instances(first)
+                glDrawArraysInstanced(GL_TRIANGLES, first_vertex, vertex_count, count)
+        glBindVertexArray(0)
+
+    def draw_impostors(self, view, projection, sun_color, ambient_color):
+        """ Quads com a imagem do atlas para as árvores no nível 2 (uma chamada por tipo). """
+        # Direita da câmera no plano XZ (primeira linha da rotação da view): o quad só gira em Y
+        right = glm.vec3(view[0][0], 0.0, view[2][0])
+        right = glm.normalize(right) if glm.length(right) > 1e-6 else glm.vec3(1.0, 0.0, 0.0)
+
+        shader = self.impostor_shader
+        shader.use()
+        shader.set_uniform_mat4("view", view)
+        shader.set_uniform_mat4("projection", projection)
+        shader.set_uniform_vec3("u_camera_right", right)
+        shader.set_uniform_vec3("u_sun_color", sun_color)
+        shader.set_uniform_vec3("u_ambient_color", ambient_color)
+        shader.set_uniform_vec3("u_sky_color", self.sky_color)
+        shader.set_uniform_int("u_atlas", 0)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.impostors.texture)
+
+        glBindVertexArray(self.impostor_vao)
+        for name in TEMPLATES:
+            cell = IMPOSTOR_CELLS[name]
+            first, count = self.batches[(name, 2)]
+            if cell is None or count == 0:
+                continue
+            rect, box = self.impostors.cells[cell]
+            glUniform4f(shader.get_uniform_location("u_atlas_rect"), *rect)
+            shader.set_uniform_vec3("u_impostor_box", box)
+            self.point_instances(first)
+            glDrawArraysInstanced(GL_TRIANGLES, 0, 6, count)
+        glBindVertexArray(0)
+
+    def draw(self, view, projection, sun_direction, sun_color, ambient_color, sky_color=None):
         self.shader.use()
-        
+
         # Usando os nomes corretos do seu shader.py (set_uniform_mat4 em vez de set_mat4)
         self.shader.set_uniform_mat4("view", view)
         self.shader.set_uniform_mat4("projection", projection)
-        self.shader.set_uniform_mat4("model", glm.mat4(1.0)) 
-        
+
         # Usando os métodos corretos para vetores (set_uniform_vec3)
         self.shader.set_uniform_vec3("u_sun_direction", sun_direction)
         self.shader.set_uniform_vec3("u_sun_color", sun_color)
         self.shader.set_uniform_vec3("u_ambient_color", ambient_color)
-        
-        glBindVertexArray(self.vao)
-        glDrawArrays(GL_TRIANGLES, 0, len(self.vertices) // 9)
+        if sky_color is not None:
+            self.sky_color = sky_color
+            self.shader.set_uniform_vec3("u_sky_color", sky_color)
+
+        self.draw_instances()
+        self.draw_impostors(view, projection, sun_color, ambient_color)
 
     # --- NOVO MÉTODO: Desenha sombra ---
     def draw_shadow(self, shader):
-        # Para sombra, precisamos apenas da geometria.
-        # A vegetação é estática no mundo (model = identidade)
-        shader.set_uniform_mat4("model", glm.mat4(1.0))
-        glBindVertexArray(self.vao)
-        glDrawArrays(GL_TRIANGLES, 0, len(self.vertices) // 9)
\ No newline at end of file
+        # Para sombra, precisamos apenas da geometria: 'shader' é a variante
+        # instanciada (pass_shader("shadow")), já ativa e com a lightSpaceMatrix
+        self.draw_instances()
+
+    def snap_to_terrain(self, rect):
+        """
+        Reapoia no chão as árvores (com suas pedras) dentro do retângulo (x0, z0, x1, z1)
+        do mundo, depois de uma edição do terreno. Só muda a translação das instâncias.
+        """
+        x0, z0, x1, z1 = rect
+        positions = self.tree_xz
+        inside = np.flatnonzero((positions[:, 0] >= x0) & (positions[:, 0] <= x1) &
+                                (positions[:, 1] >= z0) & (positions[:, 1] <= z1))
+        if len(inside) == 0:
+            return
+
+        new_heights = self.terrain.get_heights(positions[inside, 0], positions[inside, 1])
+        offsets = np.zeros(len(self.tree_positions), dtype=np.float32)
+        offsets[inside] = new_heights - self.tree_bases[inside]
+        if not offsets.any():
+            return
+        self.tree_bases[inside] = new_heights
+
+        # Elemento 13 = linha Y da coluna de translação (matriz coluna a coluna)
+        self.instance_data[:, 13] += offsets[self.instance_owner]
+        self.upload_instances()
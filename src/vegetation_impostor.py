@@ -0,0 +1,102 @@
+import ctypes
+
+import glm
+import numpy as np
+from OpenGL.GL import *
+
+
+class ImpostorAtlas:
+    """
+    Atlas de impostores: cada tipo de árvore/pedra é renderizado uma vez (vista
+    lateral, ortográfica, sem luz) numa célula de uma textura RGBA. De longe a
+    malha é trocada por um quad com essa imagem.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}   # nome -> (uv da célula (x, y, largura, altura), caixa (largura, altura, base Y))
+        self.texture = None
+
+    def bake(self, shader, vbo, vertices, templates, groups):
+        """
+        'groups' = [(nome da célula, [modelos da malha]), ...]. 'templates' é o
+        dicionário nome -> (primeiro vértice, nº de vértices); 'vertices' é a
+        malha (posição, cor, normal) que está em 'vbo'. Restaura o framebuffer e o viewport.
+        """
+        size = self.cell_size
+        width = size * len(groups)
+
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, width, size, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+
+        depth = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, depth)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, size)
+
+        previous_fbo = glGetIntegerv(GL_FRAMEBUFFER_BINDING)
+        previous_viewport = glGetIntegerv(GL_VIEWPORT)
+        fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, depth)
+        if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+            print("ERRO: Framebuffer do atlas de impostores incompleto!")
+
+        glViewport(0, 0, width, size)
+        glClearColor(0.0, 0.0, 0.0, 0.0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        # VAO só com a malha: os atributos de instância ficam desligados e
+        # valem o valor constante abaixo (matriz identidade, tint branco)
+        vao = glGenVertexArrays(1)
+        glBindVertexArray(vao)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        stride = 9 * 4
+        for location, offset in ((0, 0), (1, 12), (2, 24)):
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(offset))
+        for column in range(4):
+            glVertexAttrib4f(3 + column, *[1.0 if row == column else 0.0 for row in range(4)])
+        glVertexAttrib3f(7, 1.0, 1.0, 1.0)
+
+        # Cor pura (sem sol, ambiente 1): a luz é aplicada no shader do impostor
+        shader.use()
+        shader.set_uniform_mat4("view", glm.mat4(1.0))
+        shader.set_uniform_vec3("u_sun_direction", (0.0, 1.0, 0.0))
+        shader.set_uniform_vec3("u_sun_color", (0.0, 0.0, 0.0))
+        shader.set_uniform_vec3("u_ambient_color", (1.0, 1.0, 1.0))
+        shader.set_uniform_vec3("u_sky_color", (0.0, 0.0, 0.0))
+
+        vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 9)
+        for index, (name, parts) in enumerate(groups):
+            ranges = [templates[part] for part in parts]
+            positions = np.concatenate([vertices[first:first + count, :3] for first, count in ranges])
+            radius = float(np.sqrt(positions[:, 0] ** 2 + positions[:, 2] ** 2).max())
+            bottom = float(positions[:, 1].min())
+            top = float(positions[:, 1].max())
+
+            # Vista de frente (olhando para -Z), caixa justa na malha
+            shader.set_uniform_mat4("projection", glm.ortho(-radius, radius, bottom, top, -radius - 1.0, radius + 1.0))
+            glViewport(index * size, 0, size, size)
+            for first, count in ranges:
+                glDrawArrays(GL_TRIANGLES, first, count)
+
+            self.cells[name] = ((index / len(groups), 0.0, 1.0 / len(groups), 1.0),
+                                (2.0 * radius, top - bottom, bottom))
+
+        glBindVertexArray(0)
+        glDeleteVertexArrays(1, [vao])
+        glBindFramebuffer(GL_FRAMEBUFFER, previous_fbo)
+        glDeleteFramebuffers(1, [fbo])
+        glDeleteRenderbuffers(1, [depth])
+        glViewport(*previous_viewport)
+
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glGenerateMipmap(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        print(f"Atlas de impostores: {len(groups)} tipos em {width}x{size}")
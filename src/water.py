@@ -2,14 +2,14 @@ from OpenGL.GL import *
 import ctypes
 import numpy as np
 import glm
-from shader import Shader
 
 class Water:
-    def __init__(self, size=1000, height=12.0):
+    def __init__(self, assets, size=1000, height=12.0):
         self.height = height
         
-        # Shader simples para água (usa cor sólida + transparência)
-        self.shader = Shader("shaders/water.vert", "shaders/water.frag")
+        # Shader simples para água (usa cor sólida + transparência), do registro de assets
+        self.assets = assets
+        self.shader = assets.shader("shaders/water.vert", "shaders/water.frag")
         
         # Cria um quadrado gigante (2 triângulos)
         # x, y, z
@@ -36,6 +36,10 @@ class Water:
         glEnableVertexAttribArray(0)
         glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 3 * 4, ctypes.c_void_p(0))
         
+    def release(self):
+        """ Devolve o shader da água ao registro de assets. """
+        self.assets.release(self.shader)
+
     def draw(self, view, projection, sky_color):
         glEnable(GL_BLEND)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)